@@ -0,0 +1,83 @@
+"""
+Compare JSON team commands (cattrs.unstructure + send_json) with the packed command_codec record
+
+Cost of one tick for one team of TEAM_ROBOTS_MAX_COUNT robots, sent into a local PAIR socket.
+
+python -m bench.command_bench
+"""
+
+import timeit
+
+import numpy as np
+import zmq
+from zmq.utils import jsonapi
+
+from bridge import const
+from bridge.auxiliary import command_codec
+
+REPEAT = 5000
+
+
+def make_team() -> command_codec.DecoderTeamCommand:
+    """Team command like CommandSink sends in the game"""
+    commands = [
+        command_codec.DecoderCommand(
+            robot_id=r_id,
+            kick_up=False,
+            kick_forward=r_id == 1,
+            auto_kick_up=False,
+            auto_kick_forward=False,
+            kicker_setting=8,
+            dribbler_setting=15,
+            forward_vel=277.49 + r_id,
+            left_vel=-351.63 + r_id,
+            angular_vel=-1.518 + r_id * 0.1,
+        )
+        for r_id in range(const.TEAM_ROBOTS_MAX_COUNT)
+    ]
+    return command_codec.DecoderTeamCommand(robot_commands=commands, isteamyellow=False)
+
+
+def main() -> None:
+    """Run the benchmark"""
+    team = make_team()
+    record = np.zeros(1, dtype=command_codec.TEAM_DTYPE)
+    assert command_codec.decode(command_codec.encode(team)) == team
+
+    context = zmq.Context()
+    sender = context.socket(zmq.PAIR)
+    sender.bind("inproc://command_bench")
+    receiver = context.socket(zmq.PAIR)
+    receiver.connect("inproc://command_bench")
+    command_sender = command_codec.CommandSender()
+
+    def send_json() -> None:
+        sender.send_json({"control": "actuate_robot", "data": command_codec.unstructure_team(team)})
+        receiver.recv()
+
+    def send_binary() -> None:
+        command_sender.send(sender, team)
+        receiver.recv()
+
+    def encode_json() -> bytes:
+        return jsonapi.dumps({"control": "actuate_robot", "data": command_codec.unstructure_team(team)})
+
+    json_size = len(encode_json())
+    json_encode = timeit.timeit(encode_json, number=REPEAT) / REPEAT
+    json_send = timeit.timeit(send_json, number=REPEAT) / REPEAT
+    binary_size = command_codec.message_size(len(team.robot_commands))
+    binary_encode = timeit.timeit(lambda: command_codec.encode(team, record), number=REPEAT) / REPEAT
+    binary_send = timeit.timeit(send_binary, number=REPEAT) / REPEAT
+
+    print(f"{'':12}{'size, B':>10}{'encode, us':>12}{'tick, us':>12}")
+    row = "{:12}{:>10}{:>12.1f}{:>12.1f}"
+    print(row.format("json", json_size, json_encode * 1e6, json_send * 1e6))
+    print(row.format("binary", binary_size, binary_encode * 1e6, binary_send * 1e6))
+
+    sender.close()
+    receiver.close()
+    context.term()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Offline run of the router (Action.process -> commands_from_values) on recorded inputs
+
+The log of router inputs is written by CommandSink(record_path=...) in the game, or from a match log:
+
+python -m bench.router_bench record match.ssllog router.log [--state RUN]
+python -m bench.router_bench run router.log [--repeat 3] [--team-controller]
+
+run evaluates every tick as fast as possible without ZMQ and prints ticks per second,
+cost of every robot and checksums of the commands, so two versions of the router
+can be compared on identical inputs.
+"""
+
+import argparse
+import hashlib
+import time
+from typing import Any, Optional
+
+import numpy as np
+from strategy_bridge.bus import DataBus
+from strategy_bridge.processors import BaseProcessor
+
+from bridge import const
+from bridge.auxiliary import clock, fld, rbt, router_log, telemetry
+from bridge.processors.field_creator import FieldCreator
+from bridge.processors.python_controller import SSLController
+from bridge.processors.router_processor import CommandSink, TeamRouter
+from bridge.router.action import Action, ActionValues
+
+
+def record(match_path: str, log_path: str, state: Optional[str] = None, ticks: Optional[int] = None) -> None:
+    """Replay the match log through FieldCreator and SSLController and write the router log"""
+    if state is None:
+        field_creator = FieldCreator(replay_path=match_path, replay_speed=0)
+    else:
+        field_creator = FieldCreator(
+            replay_path=match_path, replay_speed=0, debug_mode=True, debug_game_state=const.State[state]
+        )
+    processors: list[BaseProcessor] = [
+        field_creator,
+        SSLController(ally_color=const.COLOR),
+        CommandSink(control_endpoint="inproc://router_bench", record_path=log_path),
+    ]
+    data_bus = DataBus()
+    for processor in processors:
+        processor.initialize(data_bus)
+
+    tick = 0
+    while not field_creator.replay.is_finished() and (ticks is None or tick < ticks):
+        for processor in processors:
+            processor.process()
+        tick += 1
+    for processor in processors:
+        processor.finalize()
+    print(f"{tick} ticks of {match_path} -> {log_path}")
+
+
+class TimedRouter(TeamRouter):
+    """TeamRouter that measures evaluation of every robot"""
+
+    def __init__(self, fields: dict[const.Color, fld.Field], **options: Any) -> None:
+        super().__init__(fields, **options)
+        self.costs: dict[tuple[const.Color, int], list[float]] = {}  # [s] process_robot of every tick
+
+    def process_robot(self, field: fld.Field, robot: rbt.Robot, action: Action) -> ActionValues:
+        start = time.perf_counter()
+        values = super().process_robot(field, robot, action)
+        self.costs.setdefault((robot.color, robot.r_id), []).append(time.perf_counter() - start)
+        return values
+
+
+class RouterRun:
+    """State of the router for one run: fields of the routed teams, the router and checksums of commands"""
+
+    def __init__(self, colors: tuple[const.Color, ...], options: dict) -> None:
+        self.world = fld.World()
+        self.field = {color: fld.Field(color, self.world) for color in colors}
+        self.router = TimedRouter(self.field, **options)
+        self.command_log = telemetry.CommandLog()
+        self.checksum = hashlib.md5()
+        self.robot_checksums: dict[tuple[const.Color, int], "hashlib._Hash"] = {}
+
+    def tick(self, tick: router_log.RouterTick) -> None:
+        """Same as one CommandSink.process with the options of the log"""
+        if tick.field is not None:
+            self.world.update_field(tick.field)
+        for command in tick.commands:
+            self.router.update_command(command)
+
+        self.command_log.clear()
+        for color, field in self.field.items():
+            for cmd in self.router.process_team(color):
+                self.command_log.append(color, cmd)
+        for field in self.field.values():
+            field.clear_images()
+
+        rows = self.command_log.snapshot()
+        self.checksum.update(rows.tobytes())
+        for row in rows:
+            color = const.Color.YELLOW if row["isteamyellow"] else const.Color.BLUE
+            key = (color, int(row["robot_id"]))
+            self.robot_checksums.setdefault(key, hashlib.md5()).update(row.tobytes())
+
+
+def run(log_path: str, repeat: int = 1, team_controller: bool = False) -> None:
+    """
+    Evaluate the router log repeat times, print the speed of the best run and the costs of the robots
+
+    The router has the options it had when the log was written, team_controller=True turns TeamController on
+    """
+    colors, start_time, options = router_log.read_header(log_path)
+    if team_controller:
+        options = dict(options, team_controller=True)
+    best: Optional[tuple[float, RouterRun, int]] = None
+    for _ in range(repeat):
+        ticks = list(router_log.read_ticks(log_path))  # actions are changed in place, so new ones every run
+        sim_clock = clock.SimClock(start_time)  # robots take the time of their creation
+        clock.set_clock(sim_clock)
+        router = RouterRun(colors, options)
+
+        start = time.perf_counter()
+        for tick in ticks:
+            sim_clock.set(tick.t)
+            router.tick(tick)
+        elapsed = time.perf_counter() - start
+        router.router.close()
+        if best is not None and best[1].checksum.hexdigest() != router.checksum.hexdigest():
+            print("WARNING: commands differ between runs")
+        if best is None or elapsed < best[0]:
+            best = (elapsed, router, len(ticks))
+
+    assert best is not None
+    elapsed, router, count = best
+    print(f"{count} ticks in {elapsed:.3f} s -> {count / max(elapsed, 1e-9):.0f} ticks/s")
+    print(f"commands md5 {router.checksum.hexdigest()}")
+    print(f"{'robot':8}{'ticks':>8}{'mean, us':>10}{'p50, us':>10}{'p99, us':>10}{'max, us':>10}  md5")
+    for (color, r_id), costs in sorted(router.router.costs.items(), key=lambda item: (item[0][0].value, item[0][1])):
+        values = np.array(costs) * 1e6
+        checksum = router.robot_checksums[(color, r_id)].hexdigest() if (color, r_id) in router.robot_checksums else "-"
+        print(
+            f"{color.name[0] + str(r_id):8}{len(values):>8}{values.mean():>10.1f}{np.percentile(values, 50):>10.1f}"
+            f"{np.percentile(values, 99):>10.1f}{values.max():>10.1f}  {checksum}"
+        )
+
+
+def main() -> None:
+    """Parse the arguments"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="write the router log from a match log")
+    record_parser.add_argument("match_log")
+    record_parser.add_argument("router_log")
+    record_parser.add_argument("--state", choices=[state.name for state in const.State], help="ignore referee")
+    record_parser.add_argument("--ticks", type=int, help="stop after that many ticks")
+    run_parser = commands.add_parser("run", help="evaluate the router log")
+    run_parser.add_argument("router_log")
+    run_parser.add_argument("--repeat", type=int, default=1, help="runs, the fastest one is printed")
+    run_parser.add_argument(
+        "--team-controller", action="store_true", help="regulators in rbt.TeamController even if the game had none"
+    )
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.match_log, args.router_log, args.state, args.ticks)
+    else:
+        run(args.router_log, args.repeat, args.team_controller)
+
+
+if __name__ == "__main__":
+    main()
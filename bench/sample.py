@@ -0,0 +1,27 @@
+"""
+Synthetic game situations for benchmarks
+"""
+
+import math
+
+from bridge import const
+from bridge.auxiliary import aux, fld
+
+
+def make_field(robots_per_team: int = const.TEAM_ROBOTS_MAX_COUNT, frames: int = 5) -> fld.Field:
+    """Field with moving ball and robots_per_team robots of each color, as FieldCreator builds it"""
+    field = fld.Field(const.COLOR)
+    for frame in range(frames):
+        t = 1.0 + frame * const.Ts
+        field.update_ball(aux.Point(500 * math.cos(t), 300 * math.sin(t)), t)
+        for r_id in range(robots_per_team):
+            angle = 0.1 * r_id + t
+            field.update_blu_robot(r_id, aux.Point(-300 - 120 * r_id, 150 * r_id - 900), angle, t)
+            field.update_yel_robot(r_id, aux.Point(300 + 120 * r_id, 900 - 150 * r_id), -angle, t)
+    for robot in field.all_bots[:robots_per_team] + field.y_team[:robots_per_team]:
+        robot.used(1)
+    field.world.update_roster()
+    field.update_ball_history()
+    field.last_update = 1.0 + frames * const.Ts
+    field.frame_id = frames
+    return field
@@ -0,0 +1,47 @@
+"""
+Compare pickled LiteField with the packed wire format
+
+Decode alternates two different frames (every robot changed), "same frame" is a repeated one.
+
+python -m bench.wire_bench
+"""
+
+import itertools
+import pickle
+import timeit
+
+from bench import sample
+from bridge import const
+from bridge.auxiliary import fld, wire
+
+REPEAT = 2000
+
+
+def main() -> None:
+    """Run the benchmark"""
+    fields = [sample.make_field(frames=5), sample.make_field(frames=6)]
+    field = fields[0]
+    consumer = fld.Field(const.COLOR)
+
+    lite_frames = [pickle.dumps(fld.LiteField(frame)) for frame in fields]
+    record = wire.encode(field)
+    wire_frames = [wire.encode(frame).tobytes() for frame in fields]
+
+    lite_encode = timeit.timeit(lambda: pickle.dumps(fld.LiteField(field)), number=REPEAT) / REPEAT
+    lite_cycle = itertools.cycle(lite_frames)
+    lite_decode = timeit.timeit(lambda: consumer.update_field(pickle.loads(next(lite_cycle))), number=REPEAT) / REPEAT
+    lite_same = timeit.timeit(lambda: consumer.update_field(pickle.loads(lite_frames[0])), number=REPEAT) / REPEAT
+
+    wire_encode = timeit.timeit(lambda: wire.encode(field, record), number=REPEAT) / REPEAT
+    wire_cycle = itertools.cycle(wire_frames)
+    wire_decode = timeit.timeit(lambda: wire.update_field(consumer, wire.decode(next(wire_cycle))), number=REPEAT) / REPEAT
+    wire_same = timeit.timeit(lambda: wire.update_field(consumer, wire.decode(wire_frames[0])), number=REPEAT) / REPEAT
+
+    print(f"{'':12}{'size, B':>10}{'encode, us':>12}{'decode, us':>12}{'same frame, us':>16}")
+    row = "{:12}{:>10}{:>12.1f}{:>12.1f}{:>16.1f}"
+    print(row.format("LiteField", len(lite_frames[0]), lite_encode * 1e6, lite_decode * 1e6, lite_same * 1e6))
+    print(row.format("wire", len(wire_frames[0]), wire_encode * 1e6, wire_decode * 1e6, wire_same * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Часы конвейера
+
+Все процессоры и действия берут текущее время через clock.now(), а не time.time(),
+поэтому оффлайн-прогон можно сделать быстрее реального времени и воспроизводимым.
+Часы свои у каждого процесса: set_clock() надо вызвать до запуска Runner'а
+(дочерние процессы унаследуют их) или в initialize() процессора.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from bridge.auxiliary import matchlog
+
+
+class Clock(ABC):
+    """Base class of clock"""
+
+    @abstractmethod
+    def now(self) -> float:
+        """Current time [s]"""
+
+    def sync(self, t: float) -> None:
+        """Take into account the time of the received data (e.g. LiteField.last_update)"""
+
+
+class WallClock(Clock):
+    """Real time"""
+
+    def now(self) -> float:
+        return time.time()
+
+
+class SimClock(Clock):
+    """Time that goes only when it is moved by hand"""
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._t = start
+
+    def now(self) -> float:
+        return self._t
+
+    def advance(self, dt: float) -> None:
+        """Move time forward by dt"""
+        self._t += max(dt, 0.0)
+
+    def set(self, t: float) -> None:
+        """Move time forward to t"""
+        self._t = max(self._t, t)
+
+
+class ReplayClock(Clock):
+    """
+    Time of the replayed match
+
+    With source - the time of the log itself (for FieldCreator).
+    Without source - the latest time seen in the received data (for the rest of processors).
+    """
+
+    def __init__(self, source: Optional[matchlog.ReplaySource] = None, start: float = 0.0) -> None:
+        self.source = source
+        self._t = start
+
+    def now(self) -> float:
+        if self.source is not None:
+            self._t = max(self._t, self.source.now())
+        return self._t
+
+    def sync(self, t: float) -> None:
+        self._t = max(self._t, t)
+
+
+_CLOCK: Clock = WallClock()
+
+
+def set_clock(clock: Clock) -> None:
+    """Replace the clock of this process"""
+    global _CLOCK  # pylint: disable=global-statement
+    _CLOCK = clock
+
+
+def get_clock() -> Clock:
+    """Clock of this process"""
+    return _CLOCK
+
+
+def now() -> float:
+    """Current time of this process [s]"""
+    return _CLOCK.now()
+
+
+def sync(t: float) -> None:
+    """Pass the time of the received data to the clock of this process"""
+    _CLOCK.sync(t)
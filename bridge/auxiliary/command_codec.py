@@ -0,0 +1,254 @@
+"""
+Команды роботам и их упакованное бинарное представление
+
+Вместо cattrs.unstructure и send_json команды для команды роботов (DecoderTeamCommand) пишется в запись
+фиксированного формата TEAM_DTYPE: заголовок и TEAM_ROBOTS_MAX_COUNT команд, из которых
+используются первые count. Первый байт - MAGIC, поэтому приёмник отличит запись от JSON ('{').
+decode - локальная замена приёмника на стороне роботов, возвращает исходный DecoderTeamCommand.
+"""
+
+import math
+from typing import List, Optional, Union
+
+import attrs
+import cattrs
+import numpy as np
+import zmq
+import zmq.asyncio
+from cattrs.gen import make_dict_unstructure_fn, override
+
+from bridge import const
+from bridge.auxiliary.trace import TraceContext
+
+MAGIC = 0xC5
+FORMAT_VERSION = 1
+
+# биты COMMAND_DTYPE.flags
+KICK_UP = 1 << 0
+KICK_FORWARD = 1 << 1
+AUTO_KICK_UP = 1 << 2
+AUTO_KICK_FORWARD = 1 << 3
+HAS_ANGULAR_VEL = 1 << 4
+HAS_ANGLE = 1 << 5
+
+COMMAND_DTYPE = np.dtype(
+    [
+        ("robot_id", "u1"),
+        ("flags", "u1"),
+        ("kicker_setting", "u1"),
+        ("dribbler_setting", "<f8"),
+        ("forward_vel", "<f8"),
+        ("left_vel", "<f8"),
+        ("angular_vel", "<f8"),  # 0 if not HAS_ANGULAR_VEL
+        ("angle", "<f8"),  # 0 if not HAS_ANGLE
+    ]
+)
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "u1"),
+        ("version", "u1"),
+        ("isteamyellow", "u1"),
+        ("count", "u1"),  # used commands
+    ]
+)
+
+TEAM_DTYPE = np.dtype(HEADER_DTYPE.descr + [("commands", COMMAND_DTYPE, (const.TEAM_ROBOTS_MAX_COUNT,))])
+
+HEADER_SIZE = HEADER_DTYPE.itemsize
+
+
+@attrs.define
+class DecoderCommand:
+    """Command for one robot"""
+
+    robot_id: int = attrs.field()
+
+    kick_up: bool = attrs.field()
+    kick_forward: bool = attrs.field()
+    auto_kick_up: bool = attrs.field()
+    auto_kick_forward: bool = attrs.field()
+
+    kicker_setting: int = attrs.field()  # 0-15 [popugi]
+    dribbler_setting: float = attrs.field()  # 0-15 [popugi]
+
+    forward_vel: float = attrs.field()  # [m/s]
+    left_vel: float = attrs.field()  # [m/s]
+    angular_vel: Optional[float] = attrs.field(default=None)  # [rad/s]
+    angle: Optional[float] = attrs.field(default=None)  # [rad]
+
+
+@attrs.define
+class DecoderTeamCommand:
+    """Commands for the robots of one team"""
+
+    robot_commands: List[DecoderCommand] = attrs.field(factory=list)
+    isteamyellow: bool = attrs.field(default=False)
+    # frame behind the commands (the oldest of the robots), not sent to the robots
+    trace: Optional[TraceContext] = attrs.field(default=None, eq=False, repr=False)
+
+
+_converter = cattrs.Converter()
+_converter.register_unstructure_hook(
+    DecoderTeamCommand, make_dict_unstructure_fn(DecoderTeamCommand, _converter, trace=override(omit=True))
+)
+
+
+def unstructure_team(team: DecoderTeamCommand) -> dict:
+    """Team command as a dict for JSON, without the local fields (trace)"""
+    return _converter.unstructure(team)
+
+
+def message_size(count: int) -> int:
+    """Size of the record with count commands, bytes"""
+    return HEADER_SIZE + count * COMMAND_DTYPE.itemsize
+
+
+def command_row(cmd: DecoderCommand) -> tuple:
+    """Command as a tuple of COMMAND_DTYPE fields"""
+    flags = (
+        KICK_UP * bool(cmd.kick_up)
+        | KICK_FORWARD * bool(cmd.kick_forward)
+        | AUTO_KICK_UP * bool(cmd.auto_kick_up)
+        | AUTO_KICK_FORWARD * bool(cmd.auto_kick_forward)
+        | HAS_ANGULAR_VEL * (cmd.angular_vel is not None)
+        | HAS_ANGLE * (cmd.angle is not None)
+    )
+    return (
+        cmd.robot_id,
+        flags,
+        cmd.kicker_setting,
+        cmd.dribbler_setting,
+        cmd.forward_vel,
+        cmd.left_vel,
+        cmd.angular_vel if cmd.angular_vel is not None else 0.0,
+        cmd.angle if cmd.angle is not None else 0.0,
+    )
+
+
+def encode(team: DecoderTeamCommand, out: Optional[np.ndarray] = None) -> memoryview:
+    """
+    Pack the team command, returns the used part of the record
+
+    out - record to reuse, a new one is created if None
+    """
+    if out is None:
+        out = np.zeros(1, dtype=TEAM_DTYPE)
+    rec = out[0]
+    count = len(team.robot_commands)
+    rec["magic"] = MAGIC
+    rec["version"] = FORMAT_VERSION
+    rec["isteamyellow"] = team.isteamyellow
+    rec["count"] = count
+    rec["commands"][:count] = [command_row(cmd) for cmd in team.robot_commands]
+    return out.data.cast("B")[: message_size(count)]
+
+
+def decode(buf: Union[bytes, bytearray, memoryview]) -> DecoderTeamCommand:
+    """Unpack the team command (what the receiver on the robots side does)"""
+    if len(buf) < HEADER_SIZE or buf[0] != MAGIC:
+        raise ValueError("not a packed team command")
+    header = np.frombuffer(buf, dtype=HEADER_DTYPE, count=1)[0]
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError(f"unknown format version {header['version']}")
+    count = int(header["count"])
+    rows = np.frombuffer(buf, dtype=COMMAND_DTYPE, count=count, offset=HEADER_SIZE)
+
+    commands = []
+    for robot_id, flags, kicker, dribbler, forward_vel, left_vel, angular_vel, angle in rows.tolist():
+        commands.append(
+            DecoderCommand(
+                robot_id=robot_id,
+                kick_up=bool(flags & KICK_UP),
+                kick_forward=bool(flags & KICK_FORWARD),
+                auto_kick_up=bool(flags & AUTO_KICK_UP),
+                auto_kick_forward=bool(flags & AUTO_KICK_FORWARD),
+                kicker_setting=kicker,
+                dribbler_setting=dribbler,
+                forward_vel=forward_vel,
+                left_vel=left_vel,
+                angular_vel=angular_vel if flags & HAS_ANGULAR_VEL else None,
+                angle=angle if flags & HAS_ANGLE else None,
+            )
+        )
+    return DecoderTeamCommand(robot_commands=commands, isteamyellow=bool(header["isteamyellow"]))
+
+
+class CommandSender:
+    """
+    Sends packed team commands from reused buffers without copying them
+
+    zmq may still hold the previous message of a buffer (copy=False),
+    so buffers are rotated and one is reused only after zmq has released it.
+    zmq.asyncio sockets return a future instead of a tracker, they get a copy.
+    """
+
+    BUFFERS = 2
+
+    def __init__(self) -> None:
+        self._records = [np.zeros(1, dtype=TEAM_DTYPE) for _ in range(self.BUFFERS)]
+        self._trackers: list[Optional[zmq.MessageTracker]] = [None] * self.BUFFERS
+        self._next = 0
+
+    def send(self, socket: zmq.Socket, team: DecoderTeamCommand) -> int:
+        """Pack and send the team command, returns size of the message"""
+        idx = self._next
+        self._next = (idx + 1) % self.BUFFERS
+        tracker = self._trackers[idx]
+        if tracker is not None and not tracker.done:
+            tracker.wait()
+        message = encode(team, self._records[idx])
+        if isinstance(socket, zmq.asyncio.Socket):
+            socket.send(bytes(message))
+        else:
+            self._trackers[idx] = socket.send(message, copy=False, track=True)
+        return len(message)
+
+
+class ChangeFilter:
+    """
+    Picks commands that differ from the ones last sent to the robots
+
+    A command is sent if its flags or settings changed, or if a velocity (angle) moved more than
+    the tolerance since the last sent one. Every keepalive_period the whole team is sent anyway,
+    so robots that missed a message or were not changed for a long time get their command again.
+    """
+
+    def __init__(self, vel_tolerance: float, angle_tolerance: float, keepalive_period: float) -> None:
+        self.vel_tolerance = vel_tolerance
+        self.angle_tolerance = angle_tolerance
+        self.keepalive_period = keepalive_period
+        self._sent: dict[bool, list[Optional[tuple]]] = {
+            team: [None] * const.TEAM_ROBOTS_MAX_COUNT for team in (False, True)
+        }
+        self._refresh_time: dict[bool, float] = {False: -math.inf, True: -math.inf}
+
+    def select(self, team: DecoderTeamCommand, now: float) -> list[DecoderCommand]:
+        """Commands of the team to send now (remembered as sent)"""
+        sent = self._sent[team.isteamyellow]
+        refresh = now - self._refresh_time[team.isteamyellow] >= self.keepalive_period
+        if refresh:
+            self._refresh_time[team.isteamyellow] = now
+
+        changed = []
+        for cmd in team.robot_commands:
+            row = command_row(cmd)
+            last = sent[cmd.robot_id]
+            if refresh or last is None or self._differs(row, last):
+                sent[cmd.robot_id] = row
+                changed.append(cmd)
+        return changed
+
+    def _differs(self, row: tuple, last: tuple) -> bool:
+        """Rows of command_row differ more than the tolerances"""
+        _, flags, kicker, dribbler, forward_vel, left_vel, angular_vel, angle = row
+        _, last_flags, last_kicker, last_dribbler, last_forward_vel, last_left_vel, last_angular_vel, last_angle = last
+        return (
+            flags != last_flags
+            or kicker != last_kicker
+            or dribbler != last_dribbler
+            or abs(forward_vel - last_forward_vel) > self.vel_tolerance
+            or abs(left_vel - last_left_vel) > self.vel_tolerance
+            or abs(angular_vel - last_angular_vel) > self.angle_tolerance
+            or abs(angle - last_angle) > self.angle_tolerance
+        )
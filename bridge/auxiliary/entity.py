@@ -53,6 +53,7 @@ class Entity:
         self._vel_fr = tau.FOD(T, Ts, True)
         self._radius = R
         self.last_update_ = 0.0
+        self.version = 0  # растёт при каждом изменении состояния, по нему потребители пропускают неизменившиеся объекты
 
     def update(self, pos: aux.Point, angle: float, t: float) -> None:
         """
@@ -73,6 +74,17 @@ class Entity:
         self._angle = angle
         self._anglevel = self._vel_fr.process(self._angle)
         self.last_update_ = t
+        self.version += 1
+
+    def set_state(self, pos: aux.Point, vel: aux.Point, angle: float, anglevel: float, t: float) -> None:
+        """
+        Выставить готовое состояние (уже отфильтрованное в другом процессе)
+        """
+        self._pos = pos
+        self._vel = vel
+        self._angle = angle
+        self._anglevel = anglevel
+        self.last_update_ = t
 
     def last_update(self) -> float:
         """
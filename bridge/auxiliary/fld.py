@@ -2,11 +2,12 @@
 Модуль описания структуры Field для хранения информации об объектах на поле (роботы и мяч)
 """
 
+import copy
 from math import cos, pi
-from typing import Optional
+from typing import Any, Generic, Optional, Sequence, TypeVar
 
 from bridge import const, drawing
-from bridge.auxiliary import aux, entity, rbt
+from bridge.auxiliary import aux, entity, rbt, trace
 
 
 class Goal:
@@ -93,23 +94,155 @@ class Goal:
         ]
 
 
+class World:
+    """
+    Общее для всех команд состояние поля: мяч, роботы обеих команд и состояние игры
+
+    Одно и то же для всех Field (взглядов на поле со стороны одной из команд),
+    поэтому новый кадр разбирается один раз, сколько бы взглядов ни было.
+    """
+
+    def __init__(self) -> None:
+        self.game_state: const.State = const.State.STOP
+        self.active_team: const.Color = const.Color.ALL
+        self.last_update = 0.0
+        self.frame_id = 0  # номер кадра FieldCreator'а, 0 - кадров ещё не было
+        self.trace: Optional[trace.TraceContext] = None  # путь кадра по стадиям, см. trace.py
+        self.used_mask = 0  # бит i - робот all_bots[i] на поле (синие 0..15, жёлтые 16..31)
+        self.roster_version = 0  # растёт при каждом изменении used_mask
+        self.robot_with_ball: Optional[rbt.Robot] = None
+
+        self.ball = entity.Entity(aux.GRAVEYARD_POS, 0, const.BALL_R, 0.2)
+        self.b_team = [
+            rbt.Robot(
+                aux.GRAVEYARD_POS,
+                0,
+                const.ROBOT_R,
+                const.Color.BLUE,
+                i,
+            )
+            for i in range(const.TEAM_ROBOTS_MAX_COUNT)
+        ]
+        self.y_team = [
+            rbt.Robot(
+                aux.GRAVEYARD_POS,
+                0,
+                const.ROBOT_R,
+                const.Color.YELLOW,
+                i,
+            )
+            for i in range(const.TEAM_ROBOTS_MAX_COUNT)
+        ]
+        self.all_bots = [*self.b_team, *self.y_team]
+
+        self.ball_history: list[Optional[aux.Point]] = [None] * round(0.1 / const.Ts)
+        self.ball_history_idx = 0
+        self.ball_start_point: aux.Point = self.ball.get_pos()
+
+        self.ball_real_update_time = 0.0
+
+    def update_field(self, new_field: "LiteField") -> None:
+        """update with data from new_field, only robots with changed versions are touched"""
+        if new_field.frame_id == self.frame_id:
+            return
+        self.frame_id = new_field.frame_id
+        self.game_state = new_field.game_state
+        self.active_team = new_field.active_team
+
+        if new_field.robot_with_ball is None:
+            self.robot_with_ball = None
+        elif new_field.robot_with_ball[0] == const.Color.BLUE:
+            self.robot_with_ball = self.b_team[new_field.robot_with_ball[1]]
+        else:
+            self.robot_with_ball = self.y_team[new_field.robot_with_ball[1]]
+
+        self.last_update = new_field.last_update
+        self.trace = new_field.trace
+
+        ball = new_field.ball  # Field keeps a reference to self.ball, so it is updated in place
+        self.ball.set_state(ball.get_pos(), ball.get_vel(), ball.get_angle(), ball.get_anglevel(), ball.last_update())
+        self.ball.version = ball.version
+        self.ball_start_point = new_field.ball_start_point
+
+        roster_changed = False
+        for team, lite_team in ((self.b_team, new_field.blue_team), (self.y_team, new_field.yellow_team)):
+            seen = [False] * len(team)
+            for lite_robot in lite_team:
+                robot = team[lite_robot.r_id]
+                seen[lite_robot.r_id] = True
+                if robot.version != lite_robot.version or not robot.is_used():
+                    roster_changed |= not robot.is_used()
+                    robot.update_(lite_robot)
+            for robot in team:
+                if not seen[robot.r_id] and robot.is_used():
+                    robot.used(0)
+                    roster_changed = True
+
+        if roster_changed:
+            self.update_roster()
+
+    def update_roster(self) -> None:
+        """Recalculate used_mask after robots appeared or disappeared"""
+        mask = 0
+        for i, robot in enumerate(self.all_bots):
+            if robot.is_used():
+                mask |= 1 << i
+        if mask != self.used_mask:
+            self.used_mask = mask
+            self.roster_version += 1
+
+
+T = TypeVar("T")
+
+
+class _Shared(Generic[T]):
+    """Field attribute stored in its World (for values that World rebinds, objects are referenced directly)"""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, field: Any, owner: Optional[type] = None) -> T:
+        return getattr(field.world, self.name)
+
+    def __set__(self, field: Any, value: T) -> None:
+        setattr(field.world, self.name, value)
+
+
 class Field:
     """
     Класс, хранящий информацию о всех объектах на поле и ключевых точках
+
+    Это взгляд на World со стороны команды color: союзники, соперники, ворота и полярность
+    свои у каждого Field, а мяч, роботы и состояние игры общие.
     """
 
-    def __init__(self, color: const.Color) -> None:
+    game_state = _Shared[const.State]()
+    active_team = _Shared[const.Color]()
+    last_update = _Shared[float]()
+    frame_id = _Shared[int]()
+    trace = _Shared[Optional[trace.TraceContext]]()
+    robot_with_ball = _Shared[Optional[rbt.Robot]]()
+    ball_history = _Shared[list[Optional[aux.Point]]]()
+    ball_history_idx = _Shared[int]()
+    ball_start_point = _Shared[aux.Point]()
+    ball_real_update_time = _Shared[float]()
+
+    def __init__(self, color: const.Color, world: Optional[World] = None) -> None:
         """
         Конструктор
         Инициализирует все нулями
 
+        world - общее состояние поля, если его уже разбирает другой Field (новое, если None)
+
         TODO Сделать инициализацию реальными параметрами для корректного
         определения скоростей и ускорений в первые секунды
         """
-        self.game_state: const.State = const.State.STOP
-        self.active_team: const.Color = const.Color.ALL
-        self.last_update = 0.0
-        self.robot_with_ball: Optional[rbt.Robot] = None
+        self.world = world if world is not None else World()
+        # objects of the World are never replaced, plain attributes are cheaper to read than _Shared
+        self.ball = self.world.ball
+        self.b_team = self.world.b_team
+        self.y_team = self.world.y_team
+        self.all_bots = self.world.all_bots
 
         self.field_image = drawing.Image(drawing.ImageTopic.FIELD)
         self.strategy_image = drawing.Image(drawing.ImageTopic.STRATEGY)
@@ -129,28 +262,6 @@ class Field:
         else:
             self.polarity = const.POLARITY
 
-        self.ball = entity.Entity(aux.GRAVEYARD_POS, 0, const.BALL_R, 0.2)
-        self.b_team = [
-            rbt.Robot(
-                aux.GRAVEYARD_POS,
-                0,
-                const.ROBOT_R,
-                const.Color.BLUE,
-                i,
-            )
-            for i in range(const.TEAM_ROBOTS_MAX_COUNT)
-        ]
-        self.y_team = [
-            rbt.Robot(
-                aux.GRAVEYARD_POS,
-                0,
-                const.ROBOT_R,
-                const.Color.YELLOW,
-                i,
-            )
-            for i in range(const.TEAM_ROBOTS_MAX_COUNT)
-        ]
-        self.all_bots = [*self.b_team, *self.y_team]
         self.ally_goal = Goal(
             const.GOAL_DX * self.polarity,
             const.GOAL_DY * self.polarity,
@@ -181,14 +292,14 @@ class Field:
             aux.Point(-const.FIELD_DX, const.FIELD_DY),
         ]
 
-        self._active_allies: list[rbt.Robot] = []
-        self._active_enemies: list[rbt.Robot] = []
-
-        self.ball_history: list[Optional[aux.Point]] = [None] * round(0.1 / const.Ts)
-        self.ball_history_idx = 0
-        self.ball_start_point: aux.Point = self.ball.get_pos()
-
-        self.ball_real_update_time = 0.0
+        # active robots of this Field, rebuilt from World.used_mask once per roster change
+        self.ally_mask = 0  # бит r_id - союзник на поле
+        self.enemy_mask = 0  # бит r_id - соперник на поле
+        self._active_allies: dict[bool, tuple[rbt.Robot, ...]] = {False: (), True: ()}
+        self._active_enemies: dict[bool, tuple[rbt.Robot, ...]] = {False: (), True: ()}
+        self._active_ally_ids: dict[bool, frozenset[int]] = {False: frozenset(), True: frozenset()}
+        self._active_enemy_ids: dict[bool, frozenset[int]] = {False: frozenset(), True: frozenset()}
+        self._roster_version = 0
 
     def clear_images(self) -> None:
         """clear old data from images"""
@@ -196,46 +307,76 @@ class Field:
         self.router_image.clear()
         self.path_image.clear()
 
-    def active_allies(self, include_gk: bool = False) -> list[rbt.Robot]:
-        """return allies on field"""
-        robots = self._active_allies
-        if include_gk and self.allies[self.gk_id].is_used():
-            robots.append(self.allies[self.gk_id])
-        return robots
+    def view(self) -> "Field":
+        """
+        Field for a worker thread: shares the whole state with this one, but draws into its own images
 
-    def active_enemies(self, include_gk: bool = False) -> list[rbt.Robot]:
-        """return enemies on field"""
-        robots = self._active_enemies
-        if include_gk and self.enemies[self.enemy_gk_id].is_used():
-            robots.append(self.enemies[self.enemy_gk_id])
-        return robots
+        The state must not change while views are in use, drawings are added back with merge_images
+        """
+        view = copy.copy(self)
+        view.field_image = drawing.Image(drawing.ImageTopic.FIELD)
+        view.strategy_image = drawing.Image(drawing.ImageTopic.STRATEGY)
+        view.router_image = drawing.Image(drawing.ImageTopic.ROUTER)
+        view.path_image = drawing.Image(drawing.ImageTopic.PATH_GENERATION)
+        return view
+
+    def merge_images(self, view: "Field") -> None:
+        """Add drawings and telemetry of the view to the images of this Field"""
+        for image, view_image in (
+            (self.field_image, view.field_image),
+            (self.strategy_image, view.strategy_image),
+            (self.router_image, view.router_image),
+            (self.path_image, view.path_image),
+        ):
+            image.data.extend(view_image.data)
+            image.telemetry.update(view_image.telemetry)
+
+    def active_allies(self, include_gk: bool = False) -> tuple[rbt.Robot, ...]:
+        """return allies on field (ordered by r_id)"""
+        self._sync_active_robots()
+        return self._active_allies[include_gk]
+
+    def active_enemies(self, include_gk: bool = False) -> tuple[rbt.Robot, ...]:
+        """return enemies on field (ordered by r_id)"""
+        self._sync_active_robots()
+        return self._active_enemies[include_gk]
+
+    def active_ally_ids(self, include_gk: bool = False) -> frozenset[int]:
+        """return r_id of allies on field"""
+        self._sync_active_robots()
+        return self._active_ally_ids[include_gk]
+
+    def active_enemy_ids(self, include_gk: bool = False) -> frozenset[int]:
+        """return r_id of enemies on field"""
+        self._sync_active_robots()
+        return self._active_enemy_ids[include_gk]
 
     def update_field(self, new_field: "LiteField") -> None:
-        """update with data from new_field"""
-        self.game_state = new_field.game_state
-        self.active_team = new_field.active_team
-
-        if new_field.robot_with_ball is None:
-            self.robot_with_ball = None
-        elif new_field.robot_with_ball[0] == const.Color.BLUE:
-            self.robot_with_ball = self.b_team[new_field.robot_with_ball[1]]
+        """update with data from new_field (the shared World is updated once for all its fields)"""
+        self.world.update_field(new_field)
+
+    def _sync_active_robots(self) -> None:
+        """Rebuild active robots if some robots appeared or disappeared in the World"""
+        if self._roster_version == self.world.roster_version:
+            return
+        self._roster_version = self.world.roster_version
+
+        team_bits = (1 << const.TEAM_ROBOTS_MAX_COUNT) - 1
+        blue_mask = self.world.used_mask & team_bits
+        yellow_mask = (self.world.used_mask >> const.TEAM_ROBOTS_MAX_COUNT) & team_bits
+        if self.ally_color == const.Color.BLUE:
+            self.ally_mask, self.enemy_mask = blue_mask, yellow_mask
         else:
-            self.robot_with_ball = self.y_team[new_field.robot_with_ball[1]]
-
-        self.last_update = new_field.last_update
-
-        self.ball = new_field.ball
-        self.ball_start_point = new_field.ball_start_point
-
-        for robot in self.all_bots:
-            robot.used(0)
-        for lite_robot in new_field.blue_team:
-            self.b_team[lite_robot.r_id].update_(lite_robot)
-        for lite_robot in new_field.yellow_team:
-            self.y_team[lite_robot.r_id].update_(lite_robot)
+            self.ally_mask, self.enemy_mask = yellow_mask, blue_mask
 
-        self.update_active_allies([robot for robot in self.allies if robot.is_used()])
-        self.update_active_enemies([robot for robot in self.enemies if robot.is_used()])
+        for team, mask, gk_id, robots, ids in (
+            (self.allies, self.ally_mask, self.gk_id, self._active_allies, self._active_ally_ids),
+            (self.enemies, self.enemy_mask, self.enemy_gk_id, self._active_enemies, self._active_enemy_ids),
+        ):
+            robots[True] = tuple(robot for robot in team if mask >> robot.r_id & 1)
+            robots[False] = tuple(robot for robot in robots[True] if robot.r_id != gk_id)
+            ids[True] = frozenset(robot.r_id for robot in robots[True])
+            ids[False] = ids[True] - {gk_id}
 
     def update_ball(self, pos: aux.Point, t: float) -> None:
         """update ball position"""
@@ -285,14 +426,6 @@ class Field:
         """
         self.y_team[idx].update(pos, angle, t)
 
-    def update_active_enemies(self, active_enemies: list[rbt.Robot]) -> None:
-        """Обновляет список активных роботов-союзников"""
-        self._active_enemies = active_enemies
-
-    def update_active_allies(self, active_allies: list[rbt.Robot]) -> None:
-        """Обновляет список активных роботов-противников"""
-        self._active_allies = active_allies
-
     def get_blu_team(self) -> list[rbt.Robot]:
         """
         Получить массив роботов синей команды
@@ -390,12 +523,14 @@ def find_nearest_robot(point: aux.Point, team: list[rbt.Robot], avoid: Optional[
 
 def find_nearest_robots(
     point: aux.Point,
-    team: list[rbt.Robot],
+    team: Sequence[rbt.Robot],
     num: Optional[int] = None,
     avoid: Optional[list[int]] = None,
 ) -> list[rbt.Robot]:
     """
     Найти num роботов из team, ближайших к точке point
+
+    team может быть и field.active_allies() - тогда перебираются только роботы на поле
     """
     if num is None:
         num = len(team)
@@ -405,9 +540,8 @@ def find_nearest_robots(
     robot_dist: list[tuple[rbt.Robot, float]] = []
 
     for robot in team:  # in [field.enemies, field.allies]
-        dist = (robot.get_pos() - point).mag()
         if robot.is_used():
-            robot_dist.append((robot, dist))
+            robot_dist.append((robot, (robot.get_pos() - point).mag()))
 
     sorted_robot_dist = sorted(robot_dist, key=lambda x: x[1])
 
@@ -423,6 +557,8 @@ class LiteField:
         self.game_state: const.State = field.game_state
         self.active_team: const.Color = field.active_team
         self.last_update = field.last_update
+        self.frame_id = field.frame_id
+        self.trace = field.trace
         self.robot_with_ball: Optional[tuple[const.Color, int]]
         if field.robot_with_ball is None:
             self.robot_with_ball = None
@@ -0,0 +1,221 @@
+"""
+Компактный бинарный лог пакетов vision и referee и его воспроизведение
+
+Формат лога:
+- <path>      - заголовок MAGIC и записи подряд: RECORD_HEADER (время, канал, размер) + сырой пакет
+- <path>.idx  - индекс записей (массив INDEX_DTYPE), читается через np.memmap
+
+Оба файла можно отображать в память, поэтому воспроизведение не копирует лог целиком.
+"""
+
+import mmap
+import os
+import struct
+from enum import Enum
+from time import time
+from typing import Optional, Protocol, Union
+
+import numpy as np
+
+MAGIC = b"SSLLOG01"
+RECORD_HEADER = struct.Struct("<dBI")  # timestamp [s], channel, payload size [bytes]
+INDEX_DTYPE = np.dtype(
+    [
+        ("t", "<f8"),
+        ("channel", "u1"),
+        ("offset", "<u8"),
+        ("size", "<u4"),
+    ]
+)
+
+
+class Channel(Enum):
+    """Источник записанного пакета"""
+
+    VISION = 0
+    REFEREE = 1
+
+
+class Receiver(Protocol):
+    """Anything that can be used instead of ZmqReceiver"""
+
+    def next_message(self) -> Optional[bytes]:
+        """Return next packet or None if there is nothing new"""
+
+
+class LogWriter:
+    """Appends raw packets with timestamps to the binary log"""
+
+    def __init__(self, path: str) -> None:
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.path = path
+        self._data = open(path, "ab")  # pylint: disable=consider-using-with
+        self._index = open(path + ".idx", "ab")  # pylint: disable=consider-using-with
+        if is_new:
+            self._data.write(MAGIC)
+        self._offset = self._data.tell()
+        self._entry = np.zeros(1, dtype=INDEX_DTYPE)
+
+    def write(self, channel: Channel, payload: bytes, t: Optional[float] = None) -> None:
+        """Append one packet"""
+        if t is None:
+            t = time()
+        size = len(payload)
+        self._data.write(RECORD_HEADER.pack(t, channel.value, size))
+        self._data.write(payload)
+
+        self._entry[0] = (t, channel.value, self._offset + RECORD_HEADER.size, size)
+        self._index.write(self._entry.tobytes())
+        self._offset += RECORD_HEADER.size + size
+
+    def flush(self) -> None:
+        """Flush both files to disk"""
+        self._data.flush()
+        self._index.flush()
+
+    def close(self) -> None:
+        """Close the log"""
+        self._data.close()
+        self._index.close()
+
+
+class LogReader:
+    """Memory-mapped read access to the binary log"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._data: Union[mmap.mmap, bytes] = b""
+        if os.path.getsize(path) > 0:  # mmap can't map an empty file: the log was opened but never written
+            with open(path, "rb") as file:
+                self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._data[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"'{path}' is not a match log")
+
+        index_path = path + ".idx"
+        count = os.path.getsize(index_path) // INDEX_DTYPE.itemsize if os.path.exists(index_path) else 0
+        if count > 0:  # np.memmap can't map an empty file, a cut last entry is skipped
+            self.index: np.ndarray = np.memmap(index_path, dtype=INDEX_DTYPE, mode="r", shape=(count,))
+        else:
+            self.index = self._rebuild_index()
+
+    def _rebuild_index(self) -> np.ndarray:
+        """Restore the index by scanning the data file (e.g. if .idx was lost)"""
+        entries = []
+        offset = len(MAGIC)
+        while offset + RECORD_HEADER.size <= len(self._data):
+            t, channel, size = RECORD_HEADER.unpack_from(self._data, offset)
+            offset += RECORD_HEADER.size
+            if offset + size > len(self._data):
+                break  # unfinished record at the end of the log
+            entries.append((t, channel, offset, size))
+            offset += size
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def payload(self, idx: int) -> memoryview:
+        """Zero-copy view of the packet number idx"""
+        entry = self.index[idx]
+        offset = int(entry["offset"])
+        return memoryview(self._data)[offset : offset + int(entry["size"])]
+
+    def positions(self, channel: Channel) -> np.ndarray:
+        """Indexes of all packets of the channel"""
+        return np.flatnonzero(self.index["channel"] == channel.value)
+
+    def start_time(self) -> float:
+        """Time of the first packet"""
+        return float(self.index["t"][0]) if len(self) > 0 else 0.0
+
+    def duration(self) -> float:
+        """Log length in seconds"""
+        return float(self.index["t"][-1]) - self.start_time() if len(self) > 0 else 0.0
+
+
+class ReplaySource:
+    """
+    Воспроизведение лога с заданной скоростью
+
+    speed = 1 - в реальном времени, speed = N - в N раз быстрее,
+    speed = 0 - так быстро, как успевает потребитель: время лога сдвигается
+    на следующий пакет канала pace_channel каждый раз, когда этот канал вычитан до конца
+    """
+
+    def __init__(self, reader: LogReader, speed: float = 1.0, pace_channel: Channel = Channel.VISION) -> None:
+        self.reader = reader
+        self.speed = speed
+        self.pace_channel = pace_channel
+
+        self._start_log_time = reader.start_time()
+        self._start_wall_time = time()
+        self._log_time = self._start_log_time
+        self._receivers: dict[Channel, ReplayReceiver] = {}
+
+    def now(self) -> float:
+        """Current time of the log"""
+        if self.speed > 0:
+            return self._start_log_time + (time() - self._start_wall_time) * self.speed
+        return self._log_time
+
+    def receiver(self, channel: Channel) -> "ReplayReceiver":
+        """Get receiver of packets of the channel"""
+        if channel not in self._receivers:
+            self._receivers[channel] = ReplayReceiver(self, channel)
+        return self._receivers[channel]
+
+    def step(self) -> None:
+        """Move the log time to the next packet of pace_channel (only for speed = 0)"""
+        next_time = self.receiver(self.pace_channel).next_time()
+        if next_time is None:
+            # pace channel is over, let the rest of the log go out
+            times = [self.receiver(channel).next_time() for channel in Channel]
+            next_time = min((t for t in times if t is not None), default=None)
+        if next_time is not None:
+            self._log_time = max(self._log_time, next_time)
+
+    def is_finished(self) -> bool:
+        """True when all packets were replayed"""
+        return all(self.receiver(channel).next_time() is None for channel in Channel)
+
+
+class ReplayReceiver:
+    """Drop-in replacement of ZmqReceiver that takes packets from ReplaySource"""
+
+    def __init__(self, source: ReplaySource, channel: Channel) -> None:
+        self.source = source
+        self.channel = channel
+        self._positions = source.reader.positions(channel)
+        self._times = source.reader.index["t"][self._positions]
+        self._cursor = 0
+        self._drained = False
+
+    def next_time(self) -> Optional[float]:
+        """Timestamp of the next packet or None if the channel is over"""
+        if self._cursor >= len(self._positions):
+            return None
+        return float(self._times[self._cursor])
+
+    def next_message(self) -> Optional[bytes]:
+        """Return next packet if its time has come"""
+        next_time = self.next_time()
+        if next_time is not None and next_time <= self.source.now():
+            return self._pop()
+
+        if self.source.speed <= 0 and self.channel == self.source.pace_channel:
+            # the consumer has read the whole batch, the next call starts the next one
+            if not self._drained:
+                self._drained = True
+                return None
+            self._drained = False
+            self.source.step()
+            next_time = self.next_time()
+            if next_time is not None and next_time <= self.source.now():
+                return self._pop()
+        return None
+
+    def _pop(self) -> bytes:
+        """Take the next packet"""
+        message = bytes(self.source.reader.payload(int(self._positions[self._cursor])))
+        self._cursor += 1
+        return message
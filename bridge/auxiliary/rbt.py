@@ -3,10 +3,51 @@
 """
 
 import typing
-from time import time
+
+import numpy as np
 
 from bridge import const
-from bridge.auxiliary import aux, entity, tau
+from bridge.auxiliary import aux, clock, entity, tau
+
+T_WY = 0.15
+XX_T = 0.1
+YY_T = 0.1
+
+# регуляторы робота или их звенья в банках TeamController
+FOLPLike = typing.Union[tau.FOLP, tau.Channel]
+PISDLike = typing.Union[tau.PISD, tau.Channel]
+
+
+def pos_reg_gains() -> tuple[list[float], list[float], list[float], list[float]]:
+    """Коэффициенты регуляторов положения (gain, kd, ki, max_out) для режимов NORMAL и SOFT"""
+    # !v REAL
+    gains_full = [2.5, 0.07, 0.05, const.MAX_SPEED]
+    gains_soft = gains_full
+    if const.IS_SIMULATOR_USED:
+        # gains_full = [8, 0.35, 0, const.MAX_SPEED]
+        #            Prop  Diff  Int
+        gains_full = [1.8, 0.06, 0.0, const.MAX_SPEED]
+        gains_soft = gains_full
+    return _by_mode(gains_full, gains_soft)
+
+
+def angle_reg_gains() -> tuple[list[float], list[float], list[float], list[float]]:
+    """Коэффициенты регулятора угла (gain, kd, ki, max_out) для режимов NORMAL и SOFT"""
+    a_gains_full = [15, 0.5, 0, const.MAX_SPEED_R]
+    if const.IS_SIMULATOR_USED:
+        a_gains_full = [8, 0.1, 0.1, const.MAX_SPEED_R]
+    a_gains_soft = a_gains_full
+    return _by_mode(a_gains_full, a_gains_soft)
+
+
+def _by_mode(full: list[float], soft: list[float]) -> tuple[list[float], list[float], list[float], list[float]]:
+    """[gain, kd, ki, max_out] of two modes -> lists of gains, kds, kis and max_outs"""
+    return (
+        [full[0], soft[0]],
+        [full[1], soft[1]],
+        [full[2], soft[2]],
+        [full[3], soft[3]],
+    )
 
 
 class Robot(entity.Entity):
@@ -46,61 +87,26 @@ class Robot(entity.Entity):
         # v! SIM
         if const.IS_SIMULATOR_USED:
             self.k_wy = -0.001
-            self.t_wy = 0.15
-            self.r_comp_f_dy = tau.FOD(self.t_wy, const.Ts)
-            self.r_comp_f_fy = tau.FOLP(self.t_wy, const.Ts)
-
         # v! REAL
         else:
             self.k_wy = 0
-            self.t_wy = 0.15
-            self.r_comp_f_dy = tau.FOD(self.t_wy, const.Ts)
-            self.r_comp_f_fy = tau.FOLP(self.t_wy, const.Ts)
+        self.t_wy = T_WY
+        self.r_comp_f_dy = tau.FOD(self.t_wy, const.Ts)
+        self.r_comp_f_fy = tau.FOLP(self.t_wy, const.Ts)
 
-        self.xx_t = 0.1
-        self.xx_flp = tau.FOLP(self.xx_t, const.Ts)
-        self.yy_t = 0.1
-        self.yy_flp = tau.FOLP(self.yy_t, const.Ts)
+        self.xx_t = XX_T
+        self.xx_flp: FOLPLike = tau.FOLP(self.xx_t, const.Ts)
+        self.yy_t = YY_T
+        self.yy_flp: FOLPLike = tau.FOLP(self.yy_t, const.Ts)
 
-        # !v REAL
-        gains_full = [2.5, 0.07, 0.05, const.MAX_SPEED]
-        gains_soft = gains_full
-        a_gains_full = [15, 0.5, 0, const.MAX_SPEED_R]
-        if const.IS_SIMULATOR_USED:
-            # gains_full = [8, 0.35, 0, const.MAX_SPEED]
-            #            Prop  Diff  Int
-            gains_full = [1.8, 0.06, 0.0, const.MAX_SPEED]
-            gains_soft = gains_full
-            a_gains_full = [8, 0.1, 0.1, const.MAX_SPEED_R]
-
-        a_gains_soft = a_gains_full
-
-        self.pos_reg_x = tau.PISD(
-            const.Ts,
-            [gains_full[0], gains_soft[0]],
-            [gains_full[1], gains_soft[1]],
-            [gains_full[2], gains_soft[2]],
-            [gains_full[3], gains_soft[3]],
-        )
-        self.pos_reg_y = tau.PISD(
-            const.Ts,
-            [gains_full[0], gains_soft[0]],
-            [gains_full[1], gains_soft[1]],
-            [gains_full[2], gains_soft[2]],
-            [gains_full[3], gains_soft[3]],
-        )
-        self.angle_reg = tau.PISD(
-            const.Ts,
-            [a_gains_full[0], a_gains_soft[0]],
-            [a_gains_full[1], a_gains_soft[1]],
-            [a_gains_full[2], a_gains_soft[2]],
-            [a_gains_full[3], a_gains_soft[3]],
-        )
+        self.pos_reg_x = tau.PISD(const.Ts, *pos_reg_gains())
+        self.pos_reg_y = tau.PISD(const.Ts, *pos_reg_gains())
+        self.angle_reg: PISDLike = tau.PISD(const.Ts, *angle_reg_gains())
 
         self.is_kick_committed = False
 
         self.prev_sended_vel = aux.Point(0, 0)
-        self.prev_sended_time = time()
+        self.prev_sended_time = clock.now()
         self.prev_sended_angle = 0.0
 
     def __eq__(self, robo: typing.Any) -> bool:
@@ -119,6 +125,8 @@ class Robot(entity.Entity):
         """
         Выставить флаг использования робота
         """
+        if a != self._is_used:
+            self.version += 1
         self._is_used = a
 
         if a == 0:
@@ -158,7 +166,8 @@ class Robot(entity.Entity):
         self._anglevel = lite_robot.anglevel
 
         self._is_used = lite_robot.is_used
-        self.last_update_ = lite_robot.is_used
+        self.last_update_ = lite_robot.last_update
+        self.version = lite_robot.version
 
     def kick_forward(self) -> None:
         """
@@ -321,3 +330,39 @@ class LiteRobot:
 
         self.is_used = robot.is_used()
         self.last_update = robot.last_update()
+        self.version = robot.version
+
+
+class TeamController:
+    """
+    Регуляторы роботов команды, которые рассчитываются для всей команды сразу, в банках tau
+    (состояние в массивах, индекс - r_id): фильтры скорости xx_flp, yy_flp и регулятор угла angle_reg
+
+    bind() заменяет эти регуляторы роботов звеньями банков: их по-прежнему можно рассчитать для одного
+    робота (tau.Channel), а всю команду - одним вызовом (filter_vel, regulate_angle).
+
+    Регуляторы положения pos_reg_x, pos_reg_y остаются у каждого робота: их рассчитывают действия
+    (GoToPointIgnore) посреди дерева действий, по одному роботу, а одно звено банка через tau.Channel
+    в несколько раз медленнее одиночного PISD. Фильтры r_comp_* нигде не рассчитываются и тоже не в банках.
+    """
+
+    REGULATORS = ("angle_reg", "xx_flp", "yy_flp")
+
+    def __init__(self, size: int = const.TEAM_ROBOTS_MAX_COUNT) -> None:
+        self.angle_reg = tau.PISDBank(const.Ts, *angle_reg_gains(), size=size)
+        self.xx_flp = tau.FOLPBank(XX_T, const.Ts, size)
+        self.yy_flp = tau.FOLPBank(YY_T, const.Ts, size)
+
+    def bind(self, robots: typing.Iterable[Robot]) -> None:
+        """Make the robots use regulators of the banks (robot r_id - index in the banks)"""
+        for robot in robots:
+            for name in self.REGULATORS:
+                setattr(robot, name, tau.Channel(getattr(self, name), robot.r_id))
+
+    def filter_vel(self, vel: np.ndarray, index: tau.Index) -> tuple[np.ndarray, np.ndarray]:
+        """Step xx_flp and yy_flp of robots index with required velocities vel [r_id, x/y]"""
+        return self.xx_flp.process(vel[index, 0], index), self.yy_flp.process(vel[index, 1], index)
+
+    def regulate_angle(self, aerr: np.ndarray, anglevel: np.ndarray, index: tau.Index) -> np.ndarray:
+        """Step angle_reg of robots index with angle errors aerr and angular velocities anglevel [r_id]"""
+        return self.angle_reg.process(aerr[index], -anglevel[index], index)
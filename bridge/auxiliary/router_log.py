@@ -0,0 +1,70 @@
+"""
+Лог входов роутера для оффлайн-прогона (bench.router_bench)
+
+CommandSink с record_path на каждом тике, когда есть что считать, пишет RouterTick: время,
+новый кадр поля (LiteField) и пришедшие команды (RobotCommand с действиями). Записи - pickle подряд,
+первая - заголовок с форматом, маршрутизируемыми командами, временем запуска роутера
+(роботы запоминают время создания, с него же надо начинать прогон) и опциями TeamRouter,
+от которых зависят команды (в логах без них - опции по умолчанию).
+"""
+
+import pickle
+from typing import Any, Iterator, Optional
+
+import attrs
+
+from bridge import const
+from bridge.auxiliary import fld
+
+FORMAT = "router-log-1"
+
+
+@attrs.define
+class RouterTick:
+    """Inputs of one tick of CommandSink"""
+
+    t: float  # clock.now() of the tick
+    field: Optional[fld.LiteField]  # None - the field did not change
+    commands: list[Any]  # python_controller.RobotCommand
+
+
+class RouterLogWriter:
+    """Appends ticks to the log"""
+
+    def __init__(self, path: str, colors: tuple[const.Color, ...], start: float, options: dict) -> None:
+        self.path = path
+        self._file = open(path, "wb")  # pylint: disable=consider-using-with
+        pickle.dump({"format": FORMAT, "colors": colors, "start": start, "options": options}, self._file)
+
+    def write(self, tick: RouterTick) -> None:
+        """Append one tick"""
+        pickle.dump(tick, self._file, pickle.HIGHEST_PROTOCOL)
+
+    def close(self) -> None:
+        """Close the log"""
+        self._file.close()
+
+
+def read_header(path: str) -> tuple[tuple[const.Color, ...], float, dict]:
+    """Teams routed when the log was written, clock.now() of the router start and options of TeamRouter"""
+    with open(path, "rb") as file:
+        header = _header(file)
+    return header["colors"], header["start"], header.get("options", {})
+
+
+def read_ticks(path: str) -> Iterator[RouterTick]:
+    """All ticks of the log, actions are new objects on every call"""
+    with open(path, "rb") as file:
+        _header(file)
+        while True:
+            try:
+                yield pickle.load(file)
+            except EOFError:
+                return
+
+
+def _header(file: Any) -> dict:
+    header = pickle.load(file)
+    if not isinstance(header, dict) or header.get("format") != FORMAT:
+        raise ValueError(f"'{file.name}' is not a router log")
+    return header
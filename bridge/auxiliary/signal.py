@@ -3,9 +3,10 @@
 """
 
 import math
-import time
 import typing
 
+from bridge.auxiliary import clock
+
 
 class Signal:
     """
@@ -25,7 +26,7 @@ class Signal:
         Сигнал можно задать либо через амлитуду и смещение нуля (ampoffset),
         либо через минимальное и максимальное значения (lohi)
         """
-        self.t_0 = time.time()
+        self.t_0 = clock.now()
         self.period = period
         self.waveform = waveform
 
@@ -55,16 +56,16 @@ class Signal:
         """
         Получить значение меандра
         """
-        return math.copysign(self.amp, math.sin(2 * math.pi * (time.time() - self.t_0) / self.period)) + self.offset
+        return math.copysign(self.amp, math.sin(2 * math.pi * (clock.now() - self.t_0) / self.period)) + self.offset
 
     def sine(self) -> float:
         """
         Получить значение синуса
         """
-        return self.amp * math.sin(2 * math.pi * (time.time() - self.t_0) / self.period) + self.offset
+        return self.amp * math.sin(2 * math.pi * (clock.now() - self.t_0) / self.period) + self.offset
 
     def cosine(self) -> float:
         """
         Получить значение косинуса
         """
-        return self.amp * math.cos(2 * math.pi * (time.time() - self.t_0) / self.period) + self.offset
+        return self.amp * math.cos(2 * math.pi * (clock.now() - self.t_0) / self.period) + self.offset
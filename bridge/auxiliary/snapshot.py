@@ -0,0 +1,151 @@
+"""
+Снимок поля в разделяемой памяти
+
+FieldCreator пишет поле в формате wire в один из двух буферов сегмента, остальные процессы
+читают его напрямую из памяти, без pickle и очередей DataBus.
+
+Сегмент: заголовок с номером последней версии и два слота [begin, end, запись поля].
+Версия v пишется в слот v % 2: сначала begin = v, потом данные, потом end = v и версия в заголовке.
+Читатель копирует слот последней версии (end = v) и после копирования проверяет, что begin не изменился,
+иначе писатель успел начать следующую запись в этот слот, копия выбрасывается и чтение повторяется.
+Поля обновляются только из целой копии.
+
+Сегмент, оставшийся от упавшего прогона, новый писатель помечает закрытым (closed в заголовке) и удаляет,
+так же как и свой сегмент при закрытии. Читатель, подключившийся к старому сегменту, видит метку
+и подключается к новому, а поля обновляет целиком, без пропуска объектов по версиям старого прогона.
+"""
+
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+import numpy as np
+
+from bridge.auxiliary import fld, wire
+
+HEADER_DTYPE = np.dtype([("version", "<u8"), ("closed", "<u8")])
+SLOT_DTYPE = np.dtype([("begin", "<u8"), ("end", "<u8"), ("field", wire.FIELD_DTYPE)])
+SEGMENT_SIZE = HEADER_DTYPE.itemsize + 2 * SLOT_DTYPE.itemsize
+
+READ_ATTEMPTS = 3
+
+
+def _map(shm: shared_memory.SharedMemory) -> tuple[np.ndarray, np.ndarray]:
+    """Header and slots as arrays over the shared memory"""
+    header: np.ndarray = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf, offset=0)
+    slots: np.ndarray = np.ndarray((2,), dtype=SLOT_DTYPE, buffer=shm.buf, offset=HEADER_DTYPE.itemsize)
+    return header, slots
+
+
+class SnapshotWriter:
+    """Writer side (FieldCreator)"""
+
+    def __init__(self, name: str) -> None:
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=SEGMENT_SIZE)
+        except FileExistsError:
+            # left from the previous run, its readers have to switch to the new segment
+            old = shared_memory.SharedMemory(name=name)
+            if old.size >= HEADER_DTYPE.itemsize:
+                _map(old)[0]["closed"][0] = 1
+            old.close()
+            old.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=SEGMENT_SIZE)
+
+        self._header, self._slots = _map(self.shm)
+        self._header[0] = (0, 0)
+        self._slots[:] = np.zeros(2, dtype=SLOT_DTYPE)
+        self._records = [self._slots["field"][i : i + 1] for i in range(2)]
+        self.version = 0
+
+    def write(self, field: fld.Field) -> int:
+        """Publish the field, returns its version"""
+        version = self.version + 1
+        slot = version % 2
+        self._slots["begin"][slot] = version
+        wire.encode(field, self._records[slot])
+        self._slots["end"][slot] = version
+        self._header["version"][0] = version
+        self.version = version
+        return version
+
+    def close(self) -> None:
+        """Close and remove the segment"""
+        self._header["closed"][0] = 1
+        del self._header, self._slots, self._records
+        self.shm.close()
+        # a reader in this process shares the resource tracker and has unregistered the segment in it
+        resource_tracker.register(self.shm._name, "shared_memory")  # type: ignore  # pylint: disable=protected-access
+        self.shm.unlink()
+
+
+class SnapshotReader:
+    """Reader side (any processor that needs the field)"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.version = 0
+        self._record = np.zeros(1, dtype=wire.FIELD_DTYPE)  # copy of the slot, applied only if it is whole
+        self._new_segment = False  # versions of objects in the fields are from another segment
+        self._header: np.ndarray
+        self._slots: np.ndarray
+        self._records: list[np.ndarray]
+
+    def _attach(self) -> bool:
+        """Map the segment if FieldCreator has already created it, remap it if FieldCreator has replaced it"""
+        if self.shm is not None and not self._header["closed"][0]:
+            return True
+        self.close()
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return False
+        # the segment belongs to the writer, the resource tracker of this process must not remove it at exit
+        resource_tracker.unregister(self.shm._name, "shared_memory")  # type: ignore  # pylint: disable=protected-access
+        self._header, self._slots = _map(self.shm)
+        self._records = [self._slots["field"][i : i + 1] for i in range(2)]
+        self.version = 0
+        self._new_segment = True
+        return not self._header["closed"][0]
+
+    def latest_version(self) -> int:
+        """Version of the last published field (0 - nothing yet)"""
+        if not self._attach():
+            return 0
+        return int(self._header["version"][0])
+
+    def read_into(self, *fields: fld.Field) -> bool:
+        """Update the fields if there is a new version, returns True if they were updated"""
+        for _ in range(READ_ATTEMPTS):
+            version = self.latest_version()
+            if version == 0 or version == self.version:
+                return False
+            slot = version % 2
+            if int(self._slots["end"][slot]) != version:
+                continue
+            np.copyto(self._record, self._records[slot])
+            if int(self._slots["begin"][slot]) != version:
+                continue  # the writer started the next version in this slot while we copied it
+            for field in fields:
+                if self._new_segment:
+                    _forget_versions(field)
+                wire.update_field(field, self._record)
+            self._new_segment = False
+            self.version = version
+            return True
+        return False
+
+    def close(self) -> None:
+        """Unmap the segment"""
+        if self.shm is not None:
+            del self._header, self._slots, self._records
+            self.shm.close()
+            self.shm = None
+
+
+def _forget_versions(field: fld.Field) -> None:
+    """Make the next update apply every object of the field, versions of the new writer start over"""
+    field.frame_id = 0
+    field.ball.version = -1
+    for robot in field.all_bots:
+        robot.version = -1
@@ -4,6 +4,9 @@
 
 import math
 from enum import Enum, auto
+from typing import Any, Union
+
+import numpy as np
 
 from bridge.auxiliary import aux
 
@@ -291,3 +294,201 @@ class RateLimiter:
         Получить последнее значение выхода звена без расчета
         """
         return self.__out
+
+
+# Банки звеньев: состояние звеньев всех роботов команды в массивах numpy (индекс - r_id).
+# index в методах - какие звенья рассчитывать: номер, маска или срез (по умолчанию все).
+# Формулы те же, что и у одиночных звеньев, dT может быть своим для каждого звена.
+
+Index = Union[int, slice, np.ndarray]
+ALL = slice(None)
+
+
+class FOLPBank:
+    """
+    Банк фильтров низких частот первого порядка (FOLP)
+    """
+
+    def __init__(self, T: float, Ts: float, size: int) -> None:
+        self._t = T
+        self._ts = Ts
+        self._int = np.zeros(size)
+        self._out = np.zeros(size)
+
+    def process(self, x: Any, index: Index = ALL) -> np.ndarray:
+        """
+        Рассчитать следующие значения выходов звеньев index, возвращает выходы всех звеньев
+
+        ВЫЗЫВАТЬ РАЗ В ПЕРИОД КВАНТОВАНИЯ
+        """
+        err = x - self._out[index]
+        self._int[index] += err * self._ts
+        self._out[index] = self._int[index] / self._t
+        return self._out
+
+    def process_(self, x: Any, dT: Any, index: Index = ALL) -> np.ndarray:
+        """
+        Рассчитать следующие значения выходов звеньев index с периодами dT
+
+        np.power может отличаться от math.pow в FOLP.process_ в последнем знаке
+        """
+        err = x - self._out[index]
+        self._int[index] += err * dT
+        self._out[index] = self._int[index] / np.power(self._t, dT / self._t)  # NOTE
+        return self._out
+
+    def get_val(self) -> np.ndarray:
+        """
+        Получить последние значения выходов звеньев без расчета
+        """
+        return self._out
+
+
+class FODBank:
+    """
+    Банк реальных дифференцирующих звеньев первого порядка (FOD)
+    """
+
+    def __init__(self, T: float, Ts: float, size: int, is_angle: bool = False) -> None:
+        self._t = T
+        self._ts = Ts
+        self._int = np.zeros(size)
+        self._out = np.zeros(size)
+        self._is_angle = is_angle
+
+    def process(self, x: Any, index: Index = ALL) -> np.ndarray:
+        """
+        Рассчитать следующие значения выходов звеньев index, возвращает выходы всех звеньев
+
+        ВЫЗЫВАТЬ РАЗ В ПЕРИОД КВАНТОВАНИЯ
+        """
+        return self.process_(x, self._ts, index)
+
+    def process_(self, x: Any, dT: Any, index: Index = ALL) -> np.ndarray:
+        """
+        Рассчитать следующие значения выходов звеньев index с периодами dT
+        """
+        integral = self._int[index]
+        err = x - integral
+        if self._is_angle:
+            wrap = np.where(err > math.pi, -2 * math.pi, np.where(err < -math.pi, 2 * math.pi, 0.0))
+            err = err + wrap
+            integral = integral - wrap
+        out = err / self._t
+        self._out[index] = out
+        self._int[index] = integral + out * dT
+        return self._out
+
+    def get_val(self) -> np.ndarray:
+        """
+        Получить последние значения выходов звеньев без расчета
+        """
+        return self._out
+
+
+class PISDBank:
+    """
+    Банк регуляторов PISD, у каждого свой режим (набор коэффициентов)
+    """
+
+    def __init__(
+        self,
+        dT: float,
+        gain: list[float],
+        kd: list[float],
+        ki: list[float],
+        max_out: list[float],
+        size: int,
+        max_int: float = 100,
+    ) -> None:
+        """
+        Параметры - как у PISD, size - количество регуляторов
+        """
+        self._ts = dT
+        self._gain = np.array(gain, dtype=float)
+        self._kd = np.array(kd, dtype=float)
+        self._ki = np.array(ki, dtype=float)
+        self._max_out = np.array(max_out, dtype=float)
+        self._max_int = max_int
+        self._mode = np.full(size, Mode.NORMAL.value)
+        # как у Integrator: сброс обнуляет накопленное значение, но не выход до следующего расчёта
+        self._int = np.zeros(size)
+        self._int_out = np.zeros(size)
+        self._out = np.zeros(size)
+
+    def select_mode(self, mode: Mode, index: Index = ALL) -> None:
+        """
+        Выбрать набор коэффициентов регуляторов index
+        """
+        self._mode[index] = mode.value
+        self._int[index] = 0.0
+
+    def process(self, xerr: Any, x_i: Any, index: Index = ALL) -> np.ndarray:
+        """
+        Рассчитать следующий тик регуляторов index, возвращает выходы всех регуляторов
+        """
+        mode = self._mode[index]
+        k_d, k_i = self._kd[mode], self._ki[mode]
+
+        s = xerr + k_d * x_i + k_i * self._int_out[index]
+        self._out[index] = self._gain[mode] * s
+        self._int[index] += (xerr + k_d * x_i) * self._ts
+        self._int_out[index] = self._int[index]
+        return self._out
+
+    def process_(self, xerr: Any, x_i: Any, dT: Any, index: Index = ALL) -> np.ndarray:
+        """
+        Рассчитать следующий тик регуляторов index с периодами dT
+        """
+        mode = self._mode[index]
+        k_d, max_out = self._kd[mode], self._max_out[mode]
+
+        s = xerr + k_d * x_i + self._int_out[index]
+        u = self._gain[mode] * s
+        self._int[index] = np.clip(
+            self._int[index] + self._ki[mode] * (xerr + k_d * x_i) * dT, -self._max_int, self._max_int
+        )
+        self._int_out[index] = self._int[index]
+        self._out[index] = np.clip(u, -max_out, max_out)  # NOTE
+        return self._out
+
+    def get_val(self) -> np.ndarray:
+        """
+        Получить последние значения выходов без расчета
+        """
+        return self._out
+
+
+class Channel:
+    """
+    Одно звено банка с интерфейсом одиночного звена (FOLP, FOD или PISD)
+    """
+
+    def __init__(self, bank: Union[FOLPBank, FODBank, PISDBank], index: int) -> None:
+        self.bank = bank
+        self.index = index
+
+    def process(self, *args: float) -> float:
+        """
+        Рассчитать следующее значение выхода звена
+        """
+        return float(self.bank.process(*args, index=self.index)[self.index])  # type: ignore
+
+    def process_(self, *args: float) -> float:
+        """
+        Рассчитать следующее значение выхода звена, последний аргумент - dT
+        """
+        return float(self.bank.process_(*args, index=self.index)[self.index])  # type: ignore
+
+    def select_mode(self, mode: Mode) -> None:
+        """
+        Выбрать набор коэффициентов регулятора
+        """
+        assert isinstance(self.bank, PISDBank)
+        self.bank.select_mode(mode, self.index)
+
+    def get_val(self) -> float:
+        """
+        Получить последнее значение выхода звена без расчета
+        """
+        return float(self.bank.get_val()[self.index])
@@ -0,0 +1,70 @@
+"""
+Телеметрия команд роботам
+
+CommandSink на каждом тике только записывает числа команд в заранее выделенный буфер (CommandLog)
+и раз в telemetry_period отдаёт его копию в TELEMETRY_TOPIC. Таблицу для консоли из этих чисел
+собирает Drawer (процесс с низким приоритетом) со своей частотой.
+"""
+
+import numpy as np
+
+from bridge import const, drawing
+from bridge.auxiliary import command_codec
+
+ROW_DTYPE = np.dtype([("isteamyellow", "u1")] + command_codec.COMMAND_DTYPE.descr)
+
+TABLE_HEADER = "\tr_id\tvelFRW\tvelLEFT\tvelR\tangle\tkickUP\tkickFRW\tautoUP\tautoFRW\tvolt\tdrib\n"
+
+
+class CommandLog:
+    """Commands sent during one tick, as plain numbers"""
+
+    def __init__(self) -> None:
+        self.rows = np.zeros(const.ROBOTS_MAX_COUNT, dtype=ROW_DTYPE)
+        self.count = 0
+
+    def clear(self) -> None:
+        """Start a new tick"""
+        self.count = 0
+
+    def append(self, color: const.Color, cmd: command_codec.DecoderCommand) -> None:
+        """Remember the command sent to the robot of the team"""
+        self.rows[self.count] = (color == const.Color.YELLOW,) + command_codec.command_row(cmd)
+        self.count += 1
+
+    def snapshot(self) -> np.ndarray:
+        """Copy of the commands of this tick"""
+        return self.rows[: self.count].copy()
+
+
+def format_commands(rows: np.ndarray) -> str:
+    """Telemetry table for the commands from CommandLog.snapshot()"""
+    message = drawing.get_wave() + "\n"
+    for color in [const.Color.BLUE, const.Color.YELLOW]:
+        team_rows = rows[rows["isteamyellow"] == (color == const.Color.YELLOW)]
+        if len(team_rows) == 0:
+            continue
+        message += f"TEAM {str(color)}\n" + TABLE_HEADER
+        for row in team_rows.tolist():
+            message += _format_row(row[1:])
+        message += "-" * 90 + "\n"
+    return message
+
+
+def _format_row(row: tuple) -> str:
+    """Line of the table for one robot (row - COMMAND_DTYPE fields)"""
+    r_id, flags, kicker, dribbler, forward_vel, left_vel, angular_vel, angle = row
+    values = [
+        str(r_id),
+        f"{forward_vel:.0f}",
+        f"{left_vel:.0f}",
+        f"{angular_vel:.0f}" if flags & command_codec.HAS_ANGULAR_VEL else "None",
+        f"{angle:.0f}" if flags & command_codec.HAS_ANGLE else "None",
+        str(bool(flags & command_codec.KICK_UP)),
+        str(bool(flags & command_codec.KICK_FORWARD)),
+        str(bool(flags & command_codec.AUTO_KICK_UP)),
+        str(bool(flags & command_codec.AUTO_KICK_FORWARD)),
+        str(kicker),
+        f"{dribbler:g}",
+    ]
+    return "\t" + "\t".join(values) + "\n"
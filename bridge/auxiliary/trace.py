@@ -0,0 +1,143 @@
+"""
+Трассировка задержек от пакета vision до команды роботу
+
+FieldCreator заводит на каждый кадр TraceContext: номер кадра, t_capture из SSL-Vision и отметки
+времени стадий. Контекст едет дальше вместе с данными (LiteField -> RobotCommand -> DecoderTeamCommand),
+каждая стадия добавляет свою отметку (clock.now()), CommandSink после отправки записывает
+интервалы между отметками в гистограммы LatencyRecorder.
+
+t_capture - время камеры по часам машины с SSL-Vision, с нашими часами его можно сравнивать,
+только если они синхронизированы, поэтому интервал capture -> received считается отдельно.
+"""
+
+import math
+from typing import Optional
+
+import attrs
+import numpy as np
+
+from bridge.auxiliary import clock
+
+# стадии в порядке прохождения кадра
+RECEIVED = "received"  # FieldCreator got the first vision packet of the frame
+FIELD = "field"  # the field is written (LiteField / shared memory)
+STRATEGY = "strategy"  # SSLController wrote the command
+ROUTER = "router"  # CommandSink evaluated the action
+SENT = "sent"  # the command is sent to the robots
+
+CAPTURE = "capture"  # interval from t_capture to RECEIVED
+AGE = "age"  # interval from RECEIVED to the last stamp
+
+
+@attrs.frozen
+class TraceContext:
+    """Frame behind the data and times of the stages it passed"""
+
+    frame_id: int
+    capture_time: Optional[float] = None  # [s] t_capture of the frame, clock of SSL-Vision
+    stamps: tuple[tuple[str, float], ...] = ()
+
+    def stamp(self, stage: str, t: Optional[float] = None) -> "TraceContext":
+        """Context with one more stage, t - clock.now() if None"""
+        return attrs.evolve(self, stamps=self.stamps + ((stage, clock.now() if t is None else t),))
+
+    def start(self) -> float:
+        """Time of the first stage"""
+        return self.stamps[0][1] if self.stamps else math.inf
+
+    def time(self, stage: str) -> Optional[float]:
+        """Time of the stage, None if it was not passed"""
+        for name, t in self.stamps:
+            if name == stage:
+                return t
+        return None
+
+
+def oldest(traces: list[Optional[TraceContext]]) -> Optional[TraceContext]:
+    """Context with the earliest first stage (the oldest world state), None if there are none"""
+    known = [trace for trace in traces if trace is not None]
+    if not known:
+        return None
+    return min(known, key=TraceContext.start)
+
+
+class LatencyHistogram:
+    """Histogram with logarithmic bins from MIN_LATENCY to MAX_LATENCY"""
+
+    MIN_LATENCY = 1e-5  # [s]
+    MAX_LATENCY = 10.0  # [s]
+    BINS_PER_DECADE = 20
+
+    def __init__(self) -> None:
+        decades = math.log10(self.MAX_LATENCY / self.MIN_LATENCY)
+        self.edges = np.logspace(
+            math.log10(self.MIN_LATENCY),
+            math.log10(self.MAX_LATENCY),
+            round(decades * self.BINS_PER_DECADE) + 1,
+        )
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)  # + below MIN and above MAX
+        self.count = 0
+        self.max = 0.0
+
+    def reset(self) -> None:
+        """Forget all values"""
+        self.counts[:] = 0
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        """Add one latency [s]"""
+        self.counts[np.searchsorted(self.edges, value, side="right")] += 1
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bin with the q-th percentile (0..100), 0 if empty"""
+        if self.count == 0:
+            return 0.0
+        idx = int(np.searchsorted(np.cumsum(self.counts), math.ceil(self.count * q / 100)))
+        if idx >= len(self.edges):
+            return self.max
+        return min(float(self.edges[idx]), self.max)
+
+
+class LatencyRecorder:
+    """Histograms of intervals between stages of the traces"""
+
+    def __init__(self, with_capture: bool = False) -> None:
+        self.with_capture = with_capture
+        self.histograms: dict[str, LatencyHistogram] = {}
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        """Histogram of the interval, created on first use"""
+        if name not in self.histograms:
+            self.histograms[name] = LatencyHistogram()
+        return self.histograms[name]
+
+    def record(self, trace: TraceContext) -> None:
+        """Add intervals of the trace"""
+        stamps = trace.stamps
+        if not stamps:
+            return
+        if self.with_capture and trace.capture_time is not None:
+            self.histogram(CAPTURE).add(stamps[0][1] - trace.capture_time)
+        for (prev, prev_t), (name, t) in zip(stamps, stamps[1:]):
+            self.histogram(f"{prev} -> {name}").add(t - prev_t)
+        self.histogram(AGE).add(stamps[-1][1] - stamps[0][1])
+
+    def reset(self) -> None:
+        """Forget all intervals"""
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def report(self) -> str:
+        """p50, p99 and max of every interval, ms"""
+        message = ""
+        for name, histogram in self.histograms.items():
+            if histogram.count == 0:
+                continue
+            message += (
+                f"{name}: p50 {histogram.percentile(50) * 1e3:.2f}, p99 {histogram.percentile(99) * 1e3:.2f},"
+                f" max {histogram.max * 1e3:.2f} ms, n {histogram.count}\n"
+            )
+        return message
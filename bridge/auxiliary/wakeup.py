@@ -0,0 +1,95 @@
+"""
+Пробуждение процессоров по записи в топики DataBus
+
+Вместо опроса DataReader'ов с маленькой паузой процессор ждёт, пока кто-нибудь запишет
+в нужные ему топики (или пока не выйдет таймаут). На каждый топик заведён счётчик записей.
+Счётчики и условие (Signals) создаёт Runner и передаёт в свои процессы аргументом, каждый процесс
+ставит их себе через install() до initialize() процессоров: при импорте модуля общими для всех
+процессов они были бы только при запуске процессов через fork, но не через spawn и forkserver.
+"""
+
+import multiprocessing
+import typing
+from multiprocessing.context import BaseContext
+from typing import Optional
+
+from strategy_bridge.bus import DataWriter
+
+from bridge import const
+
+TOPICS = [const.CONTROL_TOPIC, const.FIELD_TOPIC, const.IMAGE_TOPIC]
+_TOPIC_IDX = {topic: i for i, topic in enumerate(TOPICS)}
+
+
+class Signals:
+    """Counters of writes into the topics and the condition to wait for them, shared by the processes of a Runner"""
+
+    def __init__(self, context: Optional[BaseContext] = None) -> None:
+        """context - the one that starts the processes (default one of multiprocessing if None)"""
+        context = context if context is not None else multiprocessing.get_context()
+        self.condition = context.Condition()
+        self.counters = context.Array("Q", len(TOPICS), lock=False)  # guarded by condition
+
+
+_SIGNALS: Optional[Signals] = None
+
+
+def install(signals: Signals) -> None:
+    """Use the signals of the Runner in this process"""
+    global _SIGNALS  # pylint: disable=global-statement
+    _SIGNALS = signals
+
+
+def notify(topic: str) -> None:
+    """Wake up everyone who waits for the topic"""
+    signals = _SIGNALS
+    if signals is None:
+        return  # the Runner has no signals, so nobody waits
+    with signals.condition:
+        signals.counters[_TOPIC_IDX[topic]] += 1
+        signals.condition.notify_all()
+
+
+class NotifyingDataWriter(DataWriter):
+    """DataWriter that wakes up processors waiting for its topic"""
+
+    def write(self, content: typing.Any, notify_readers: bool = True) -> None:
+        """
+        Write the record
+
+        notify_readers=False - for a batch of records, call notify() after the last one
+        """
+        super().write(content)
+        if notify_readers:
+            self.notify()
+
+    def notify(self) -> None:
+        """Wake up readers of the topic"""
+        notify(self.write_topic_name)
+
+
+class TopicWaiter:
+    """Waits for new writes into any of the topics"""
+
+    def __init__(self, topics: list[str]) -> None:
+        if _SIGNALS is None:
+            raise RuntimeError("wakeup signals are not installed, run the processors with TopologyRunner or AsyncRunner")
+        self._signals = _SIGNALS
+        self._idx = [_TOPIC_IDX[topic] for topic in topics]
+        with self._signals.condition:
+            self._seen = [self._signals.counters[i] for i in self._idx]
+
+    def _changed(self) -> bool:
+        counters = self._signals.counters
+        return any(counters[i] != seen for i, seen in zip(self._idx, self._seen))
+
+    def poll(self) -> bool:
+        """Check without waiting if there was a write since the previous call"""
+        return self.wait(0)
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for a write since the previous call, returns False on timeout"""
+        with self._signals.condition:
+            woken = self._signals.condition.wait_for(self._changed, timeout)
+            self._seen = [self._signals.counters[i] for i in self._idx]
+        return woken
@@ -0,0 +1,185 @@
+"""
+Упакованное бинарное представление поля для передачи между процессами
+
+Вместо графа объектов LiteField (с Entity, фильтром Калмана и aux.Point внутри)
+передаётся одна запись фиксированного формата FIELD_DTYPE: состояние игры, мяч и 32 робота.
+Роботы лежат по индексу: синие 0..15, жёлтые 16..31.
+Номер кадра и версии объектов те же, что и в Field, поэтому update_field обновляет только изменившееся.
+"""
+
+import math
+from typing import Optional, Union
+
+import numpy as np
+
+from bridge import const
+from bridge.auxiliary import aux, fld, rbt, trace
+
+ROBOT_DTYPE = np.dtype(
+    [
+        ("used", "u1"),
+        ("x", "<f8"),
+        ("y", "<f8"),
+        ("vel_x", "<f8"),
+        ("vel_y", "<f8"),
+        ("angle", "<f8"),
+        ("anglevel", "<f8"),
+        ("last_update", "<f8"),
+        ("version", "<u8"),
+    ]
+)
+
+BALL_DTYPE = np.dtype(
+    [
+        ("x", "<f8"),
+        ("y", "<f8"),
+        ("vel_x", "<f8"),
+        ("vel_y", "<f8"),
+        ("start_x", "<f8"),
+        ("start_y", "<f8"),
+        ("last_update", "<f8"),
+        ("version", "<u8"),
+    ]
+)
+
+FIELD_DTYPE = np.dtype(
+    [
+        ("last_update", "<f8"),
+        ("frame_id", "<u8"),
+        ("capture_time", "<f8"),  # trace: t_capture of the frame, NaN - unknown
+        ("received_time", "<f8"),  # trace: RECEIVED stamp, NaN - no trace
+        ("game_state", "u1"),
+        ("active_team", "u1"),
+        ("ball_owner_color", "u1"),  # const.Color.value, 0 - nobody has the ball
+        ("ball_owner_id", "u1"),
+        ("ball", BALL_DTYPE),
+        ("robots", ROBOT_DTYPE, (const.ROBOTS_MAX_COUNT,)),
+    ]
+)
+
+WIRE_SIZE = FIELD_DTYPE.itemsize
+_UNUSED_ROW = (0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0)
+
+
+def empty() -> np.ndarray:
+    """New zeroed record"""
+    return np.zeros(1, dtype=FIELD_DTYPE)
+
+
+def encode(field: fld.Field, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Pack the field into the record
+
+    out - record to reuse (e.g. a view into a shared buffer), a new one is created if None
+    """
+    if out is None:
+        out = empty()
+    rec = out[0]
+
+    rec["last_update"] = field.last_update
+    rec["frame_id"] = field.frame_id
+    capture_time, received_time = math.nan, math.nan
+    if field.trace is not None:
+        if field.trace.capture_time is not None:
+            capture_time = field.trace.capture_time
+        received = field.trace.time(trace.RECEIVED)
+        if received is not None:
+            received_time = received
+    rec["capture_time"], rec["received_time"] = capture_time, received_time
+    rec["game_state"] = field.game_state.value
+    rec["active_team"] = field.active_team.value
+    if field.robot_with_ball is None:
+        rec["ball_owner_color"] = 0
+        rec["ball_owner_id"] = 0
+    else:
+        rec["ball_owner_color"] = field.robot_with_ball.color.value
+        rec["ball_owner_id"] = field.robot_with_ball.r_id
+
+    ball = rec["ball"]
+    pos, vel = field.ball.get_pos(), field.ball.get_vel()
+    ball["x"], ball["y"], ball["vel_x"], ball["vel_y"] = pos.x, pos.y, vel.x, vel.y
+    ball["start_x"], ball["start_y"] = field.ball_start_point.x, field.ball_start_point.y
+    ball["last_update"] = field.ball.last_update()
+    ball["version"] = field.ball.version
+
+    rec["robots"] = [_robot_row(robot) for robot in field.all_bots]
+    return out
+
+
+def _robot_row(robot: rbt.Robot) -> tuple:
+    """Robot as a tuple of ROBOT_DTYPE fields"""
+    if not robot.is_used():
+        return _UNUSED_ROW
+    pos, vel = robot.get_pos(), robot.get_vel()
+    return (
+        robot.is_used(),
+        pos.x,
+        pos.y,
+        vel.x,
+        vel.y,
+        robot.get_angle(),
+        robot.get_anglevel(),
+        robot.last_update(),
+        robot.version,
+    )
+
+
+def decode(buf: Union[bytes, bytearray, memoryview, np.ndarray]) -> np.ndarray:
+    """Zero-copy view of the packed record in buf"""
+    if isinstance(buf, np.ndarray) and buf.dtype == FIELD_DTYPE:
+        return buf
+    return np.frombuffer(buf, dtype=FIELD_DTYPE, count=1)
+
+
+def update_field(field: fld.Field, record: np.ndarray) -> None:
+    """Same as fld.Field.update_field, but with the packed record"""
+    rec = record[0]
+    last_update, frame_id, capture_time, received_time, game_state, active_team, owner_color, owner_id, ball, _ = rec.item()
+    if frame_id == field.frame_id:
+        return
+    field.frame_id = frame_id
+    field.trace = None
+    if not math.isnan(received_time):
+        field.trace = trace.TraceContext(
+            frame_id,
+            None if math.isnan(capture_time) else capture_time,
+            ((trace.RECEIVED, received_time), (trace.FIELD, last_update)),
+        )
+    field.game_state = const.State(game_state)
+    field.active_team = const.Color(active_team)
+    field.last_update = last_update
+
+    ball_x, ball_y, ball_vel_x, ball_vel_y, start_x, start_y, ball_update, ball_version = ball
+    if ball_version != field.ball.version:
+        field.ball.set_state(aux.Point(ball_x, ball_y), aux.Point(ball_vel_x, ball_vel_y), 0.0, 0.0, ball_update)
+        field.ball.version = ball_version
+    field.ball_start_point = aux.Point(start_x, start_y)
+
+    roster_changed = False
+    for robot, robot_rec in zip(field.all_bots, rec["robots"].tolist()):
+        if not robot_rec[0]:
+            if robot.is_used():
+                robot.used(0)
+                roster_changed = True
+            continue
+        if robot_rec[-1] != robot.version or not robot.is_used():
+            roster_changed |= not robot.is_used()
+            update_robot(robot, robot_rec)
+
+    if owner_color == 0:
+        field.robot_with_ball = None
+    elif owner_color == const.Color.BLUE.value:
+        field.robot_with_ball = field.b_team[owner_id]
+    else:
+        field.robot_with_ball = field.y_team[owner_id]
+
+    if roster_changed:
+        field.world.update_roster()
+
+
+def update_robot(robot: rbt.Robot, robot_rec: tuple) -> None:
+    """Update the robot with its packed record (as a tuple of ROBOT_DTYPE fields)"""
+    used, x, y, vel_x, vel_y, angle, anglevel, last_update, version = robot_rec
+    robot.set_state(aux.Point(x, y), aux.Point(vel_x, vel_y), angle, anglevel, last_update)
+    robot.used(used)
+    robot.version = version
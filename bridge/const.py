@@ -3,6 +3,7 @@
 """
 
 from enum import Enum
+from typing import Optional
 
 
 class State(Enum):
@@ -44,6 +45,13 @@ class Div(Enum):
     C = 2
 
 
+class PathPlanner(Enum):
+    """Класс с алгоритмами обхода препятствий"""
+
+    RECURSIVE = 0  # calc_next_point
+    BOUNDED = 1  # calc_next_point_bounded: the same with memoized sub-problems and a budget
+
+
 ##################################################
 # GAME SETTING CONSTS
 DIV = Div.C
@@ -108,6 +116,8 @@ for i in range(TEAM_ROBOTS_MAX_COUNT):
 CONTROL_TOPIC = "control-topic"
 FIELD_TOPIC = "field-topic"
 IMAGE_TOPIC = "image-topic"
+TELEMETRY_TOPIC = "telemetry-topic"  # telemetry.CommandLog snapshots
+FIELD_SHM_NAME = "ssl-field"  # shared memory segment with the field snapshot
 ##################################################
 
 ##################################################
@@ -169,6 +179,10 @@ match DIV:
 
 # ROUTE CONSTS
 VIEW_DIST = 2500
+PATH_PLANNER = PathPlanner.BOUNDED
+PLANNER_MAX_NODES = 256  # sub-problems solved for one waypoint, then the best explored path is taken
+PLANNER_MAX_TIME: Optional[float] = None  # [s] the same by time, waypoints then depend on CPU load; None - no limit
+PLANNER_UNEXPLORED_PENALTY = 1e6  # [mm] added to the length of a path through a sub-problem cut by the budget
 KEEP_BALL_DIST = 300 + ROBOT_R
 
 # is_ball_in
@@ -3,11 +3,10 @@ draw field with robots and trajectory
 """
 
 import math
-import time
 from enum import Enum
 from typing import Any
 
-from bridge.auxiliary import aux
+from bridge.auxiliary import aux, clock
 
 
 class ImageTopic(Enum):
@@ -28,7 +27,7 @@ class Image:
     def __init__(self, topic: ImageTopic) -> None:
         self.topic: ImageTopic = topic
         self.timer: FeedbackTimer = FeedbackTimer(0, 1, 1)
-        self.telemetry: list[tuple[str, str]] = []  # name and line
+        self.telemetry: dict[str, str] = {}  # name -> last text
 
         self.data: list[dict[str, Any]] = []
 
@@ -141,8 +140,8 @@ class Image:
         return
 
     def send_telemetry(self, name: str, new_telemetry: str) -> None:
-        """Send new string to telemetry console"""
-        self.telemetry.append((name, new_telemetry))
+        """Send new string to telemetry console (replaces the previous one with this name)"""
+        self.telemetry[name] = new_telemetry
 
 
 class FeedbackTimer:
@@ -208,7 +207,7 @@ def get_wave() -> str:
     line = ""
     for x in range(width):
         # Для плавного волнообразного эффекта используем синус с фазовым сдвигом по позиции
-        height_index = int((math.sin(time.time() + (x / width) * 2 * math.pi) + 1) / 2 * (length - 1))
+        height_index = int((math.sin(clock.now() + (x / width) * 2 * math.pi) + 1) / 2 * (length - 1))
         line += wave_chars[height_index]
 
     return line
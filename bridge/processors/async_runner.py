@@ -0,0 +1,257 @@
+"""
+Запуск процессоров в одном процессе на asyncio вместо Runner'а из strategy_bridge
+
+Каждый процессор - стадия (Stage) с приоритетом. Стадия становится готовой, когда
+- пришёл пакет в один из её AsyncReceiver'ов (vision, referee),
+- кто-то записал в один из её топиков DataBus (через wakeup.NotifyingDataWriter),
+- прошёл её period.
+Один диспетчер запускает готовые стадии по приоритету (0 - самый важный), тяжёлые стадии
+(in_executor) выполняются в своём потоке, чтобы не задерживать приём пакетов и роутер.
+
+Время от прихода пакета vision до отправки команд считается по цепочке стадий latency_chain:
+первая стадия берёт время прихода самого раннего непрочитанного пакета, каждая следующая -
+значение предыдущей, записанное до её запуска.
+
+Стадии в разных потоках обмениваются записями через LocalDataBus: как и общая шина Runner'а,
+она хранит записи в pickle, поэтому читатель получает свою копию, которую писатель уже не изменит.
+
+Блокирующие режимы процессоров (FieldCreator.blocking_receive, wake_on_write) здесь не нужны
+и остановили бы весь цикл, поэтому запрещены.
+"""
+
+import asyncio
+import functools
+import logging
+import pickle
+import threading
+import time
+import typing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import attr
+import zmq
+import zmq.asyncio
+from strategy_bridge.bus import DataBus
+from strategy_bridge.bus.record import Record
+from strategy_bridge.processors import BaseProcessor
+
+from bridge.auxiliary import wakeup
+
+RECEIVER_QUEUE_SIZE = 1000
+
+
+class AsyncReceiver:
+    """zmq.asyncio SUB socket with the next_message() interface of ZmqReceiver"""
+
+    def __init__(self, port: int) -> None:
+        self.socket = zmq.asyncio.Context.instance().socket(zmq.SUB)
+        self.socket.connect(f"tcp://localhost:{port}")
+        self.socket.subscribe("")
+        self.queue: deque[bytes] = deque(maxlen=RECEIVER_QUEUE_SIZE)
+        self.on_message: Optional[Callable[[], None]] = None  # set by AsyncRunner
+
+    async def pump(self) -> None:
+        """Move received packets to the queue"""
+        while True:
+            message = typing.cast(bytes, await self.socket.recv())
+            self.queue.append(message)
+            if self.on_message is not None:
+                self.on_message()
+
+    def next_message(self) -> Optional[bytes]:
+        """Return next packet or None if there is nothing new"""
+        if self.queue:
+            return self.queue.popleft()
+        return None
+
+
+class LocalDataBus(DataBus):
+    """DataBus for threads of one process that, like the shared one, gives every reader its own copy of records"""
+
+    def __attrs_post_init__(self) -> None:
+        super().__attrs_post_init__()
+        self._lock = threading.Lock()
+
+    def register_topic(self, topic_name: str, max_size: int) -> None:
+        with self._lock:
+            super().register_topic(topic_name, max_size)
+
+    def write(self, topic_name: str, record: Record) -> None:
+        data = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)  # the writer may change its objects right after
+        with self._lock:
+            super().write(topic_name, data)
+
+    def read_all(self, topic_name: str) -> list[Record]:
+        with self._lock:
+            records = list(self.data.get(topic_name, ()))
+        return [pickle.loads(data) for data in records]
+
+
+@attr.s(auto_attribs=True)
+class Stage:
+    """Processor hosted by AsyncRunner"""
+
+    name: str
+    processor: BaseProcessor
+    priority: int = 0  # 0 - runs first
+    triggers: list[str] = attr.Factory(list)  # DataBus topics that wake the stage up
+    period: Optional[float] = None  # [s] run at least this often
+    in_executor: bool = False  # CPU-heavy stage, runs in its own thread
+
+    ready: bool = attr.ib(init=False, default=True)
+    running: bool = attr.ib(init=False, default=False)
+    origin: Optional[float] = attr.ib(init=False, default=None)  # arrival of the earliest unread packet
+    runs: int = attr.ib(init=False, default=0)
+    busy_time: float = attr.ib(init=False, default=0.0)  # [s] spent in process() since the last report
+
+
+@attr.s(auto_attribs=True, kw_only=True)
+class AsyncRunner:
+    """Runs all stages in one process with one priority scheduler"""
+
+    stages: list[Stage]
+    latency_chain: tuple[str, ...] = ("vision", "strategy", "router")  # stage names from vision to commands
+    report_period: Optional[float] = 5.0  # [s] log latency and stage load, None - never
+    logger: logging.Logger = logging.getLogger(__name__)
+
+    def __attrs_post_init__(self) -> None:
+        self.latencies: list[float] = []  # [s] vision packet -> commands, since the last report
+        self._marks: dict[str, Optional[float]] = {name: None for name in self.latency_chain}
+        self._waiters: dict[str, wakeup.TopicWaiter] = {}
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+
+    def run(self) -> None:
+        """Run until interrupted"""
+        try:
+            asyncio.run(self._main())
+        except KeyboardInterrupt:
+            self.logger.warning("The application was interrupted")
+
+    async def _main(self) -> None:
+        self._wake = asyncio.Event()
+        self._failed: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        data_bus = LocalDataBus()
+        wakeup.install(wakeup.Signals())
+        tasks = []
+        for stage in self.stages:
+            processor = stage.processor
+            if getattr(processor, "blocking_receive", False) or getattr(processor, "wake_on_write", False):
+                raise ValueError(f"{stage.name}: blocking modes can not be used with AsyncRunner")
+            if not stage.in_executor and getattr(processor, "zmq_context", False) is None:
+                # sockets of stages in the loop thread are asyncio ones
+                setattr(processor, "zmq_context", zmq.asyncio.Context.instance())
+            processor.initialize(data_bus)
+
+            if stage.triggers:
+                self._waiters[stage.name] = wakeup.TopicWaiter(stage.triggers)
+            if stage.in_executor:
+                self._executors[stage.name] = ThreadPoolExecutor(1, thread_name_prefix=stage.name)
+            for receiver in getattr(processor, "async_receivers", []):
+                receiver.on_message = self._on_packet(stage)
+                tasks.append(asyncio.create_task(receiver.pump()))
+            if stage.period is not None:
+                tasks.append(asyncio.create_task(self._tick(stage, stage.period)))
+        if self.report_period is not None:
+            tasks.append(asyncio.create_task(self._report(self.report_period)))
+
+        try:
+            await asyncio.gather(self._dispatch(), self._failed)
+        finally:
+            for task in tasks:
+                task.cancel()
+            for executor in self._executors.values():
+                executor.shutdown()
+            for stage in self.stages:
+                stage.processor.finalize()
+
+    def _on_packet(self, stage: Stage) -> Callable[[], None]:
+        def on_packet() -> None:
+            if stage.origin is None:
+                stage.origin = time.perf_counter()
+            self._make_ready(stage)
+
+        return on_packet
+
+    def _make_ready(self, stage: Stage) -> None:
+        stage.ready = True
+        self._wake.set()
+
+    async def _tick(self, stage: Stage, period: float) -> None:
+        while True:
+            await asyncio.sleep(period)
+            self._make_ready(stage)
+
+    async def _dispatch(self) -> None:
+        """Run ready stages, the most important first"""
+        loop = asyncio.get_running_loop()
+        while True:
+            candidates = [stage for stage in self.stages if stage.ready and not stage.running]
+            if not candidates:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            stage = min(candidates, key=lambda s: s.priority)
+            stage.ready = False
+            origin = self._take_origin(stage)
+            if stage.name in self._executors:
+                stage.running = True
+                future = loop.run_in_executor(self._executors[stage.name], self._process, stage)
+                future.add_done_callback(functools.partial(self._finished, stage, origin))
+            else:
+                self._process(stage)
+                self._finished(stage, origin)
+            await asyncio.sleep(0)  # let receivers and timers run
+
+    def _process(self, stage: Stage) -> None:
+        start = time.perf_counter()
+        stage.processor.process()
+        stage.busy_time += time.perf_counter() - start
+        stage.runs += 1
+
+    def _take_origin(self, stage: Stage) -> Optional[float]:
+        """Time of the vision packet that this run of the stage is going to handle"""
+        if stage.name not in self._marks:
+            return None
+        idx = self.latency_chain.index(stage.name)
+        if idx == 0:
+            origin, stage.origin = stage.origin, None
+        else:
+            prev = self.latency_chain[idx - 1]
+            origin, self._marks[prev] = self._marks[prev], None
+        return origin
+
+    def _finished(self, stage: Stage, origin: Optional[float], future: Optional[asyncio.Future] = None) -> None:
+        stage.running = False
+        if future is not None and future.exception() is not None and not self._failed.done():
+            self._failed.set_exception(typing.cast(BaseException, future.exception()))
+            return
+
+        if origin is not None:
+            if stage.name == self.latency_chain[-1]:
+                self.latencies.append(time.perf_counter() - origin)
+            else:
+                self._marks[stage.name] = origin
+
+        for other in self.stages:
+            waiter = self._waiters.get(other.name)
+            if waiter is not None and waiter.poll():
+                other.ready = True
+        self._wake.set()
+
+    async def _report(self, period: float) -> None:
+        while True:
+            await asyncio.sleep(period)
+            message = "vision -> commands: no data"
+            if self.latencies:
+                lat = sorted(self.latencies)
+                p50, p99 = lat[len(lat) // 2], lat[min(len(lat) - 1, int(len(lat) * 0.99))]
+                message = f"vision -> commands: p50 {p50 * 1e3:.1f} ms, p99 {p99 * 1e3:.1f} ms, n {len(lat)}"
+            for stage in self.stages:
+                message += f"; {stage.name}: {stage.runs} runs, {stage.busy_time / period * 100:.0f}% busy"
+                stage.runs, stage.busy_time = 0, 0.0
+            self.latencies = []
+            self.logger.info(message)
@@ -8,7 +8,7 @@ from strategy_bridge.bus import DataBus, DataReader
 from strategy_bridge.processors import BaseProcessor
 
 from bridge import const, drawing
-from bridge.auxiliary import fld
+from bridge.auxiliary import clock, fld, snapshot, telemetry, wakeup
 
 
 @attr.s(auto_attribs=True)
@@ -18,6 +18,16 @@ class Drawer(BaseProcessor):
     processing_pause: Optional[float] = 1 / 60
     reduce_pause_on_process_time: bool = True
     commands_sink_reader: DataReader = attr.ib(init=False)
+    field_shm: Optional[str] = None  # read the field from shared memory instead of FIELD_TOPIC
+    draw_endpoint: str = "ipc:///tmp/ether.draw.xsub"
+    telemetry_endpoint: str = "ipc:///tmp/ether.telemetry.xsub"
+    zmq_context: Optional[zmq.Context] = None  # context for sockets (e.g. zmq.asyncio one), new if None
+
+    # wait for a new field instead of redrawing the same one, processing_pause still limits the rate
+    wake_on_write: bool = False
+    wake_timeout: float = 0.1  # [s] redraw anyway if there is no field
+
+    telemetry_period: float = 0.2  # [s] format and send telemetry (commands, timers) at most this often
 
     def initialize(self, data_bus: DataBus) -> None:
         """
@@ -25,7 +35,15 @@ class Drawer(BaseProcessor):
         """
         super().initialize(data_bus)
         self.field_reader = DataReader(data_bus, const.FIELD_TOPIC)
+        self.snapshot_reader: Optional[snapshot.SnapshotReader] = None
+        if self.field_shm is not None:
+            self.snapshot_reader = snapshot.SnapshotReader(self.field_shm)
         self.image_reader = DataReader(data_bus, const.IMAGE_TOPIC)
+        self.telemetry_reader = DataReader(data_bus, const.TELEMETRY_TOPIC)
+        self.telemetry_time = 0.0
+        self.waiter: Optional[wakeup.TopicWaiter] = None
+        if self.wake_on_write:
+            self.waiter = wakeup.TopicWaiter([const.FIELD_TOPIC])
 
         self.field = fld.Field(const.COLOR)
 
@@ -33,31 +51,42 @@ class Drawer(BaseProcessor):
         for topic in drawing.ImageTopic:
             self.images.update({topic: drawing.Image(topic)})
 
-        context = zmq.Context()
+        context = self.zmq_context if self.zmq_context is not None else zmq.Context()
         self.draw_socket = context.socket(zmq.PUB)
-        self.draw_socket.connect("ipc:///tmp/ether.draw.xsub")
+        self.draw_socket.connect(self.draw_endpoint)
 
         self.telemetry_socket = context.socket(zmq.PUB)
-        self.telemetry_socket.connect("ipc:///tmp/ether.telemetry.xsub")
+        self.telemetry_socket.connect(self.telemetry_endpoint)
 
     def process(self) -> None:
+        if self.waiter is not None:
+            self.waiter.wait(self.wake_timeout)
         message_img = self.image_reader.read_new()
-        message_fld = self.field_reader.read_last()
-        if len(message_img) == 0 and message_fld is None:
+        message_fld = None
+        field_updated = False
+        if self.snapshot_reader is not None:
+            field_updated = self.snapshot_reader.read_into(self.field)
+            if field_updated:
+                clock.sync(self.field.last_update)
+        else:
+            message_fld = self.field_reader.read_last()
+            field_updated = message_fld is not None
+        if len(message_img) == 0 and not field_updated:
             return
 
         for ext_image in message_img:
             image: drawing.Image = ext_image.content
             self.images[image.topic] = image
 
-        if message_fld is not None:
-            new_field: fld.LiteField = message_fld.content
-            self.field.update_field(new_field)
+        if field_updated:
+            if message_fld is not None:
+                new_field: fld.LiteField = message_fld.content
+                clock.sync(new_field.last_update)
+                self.field.update_field(new_field)
             image = self.field.field_image
             self.images[image.topic] = image
 
         all_data: dict[str, dict[str, Any]] = {}
-        telemetries: dict[str, str] = {}
 
         for topic, image in self.images.items():
             if topic == drawing.ImageTopic.FIELD:
@@ -70,10 +99,22 @@ class Drawer(BaseProcessor):
                     }
                 }
             )
-            for name, message in image.telemetry:
-                telemetries.update({name: message})
         self.draw_socket.send_json(all_data)
 
+        if clock.now() - self.telemetry_time > self.telemetry_period:
+            self.telemetry_time = clock.now()
+            self.send_telemetry()
+
+    def send_telemetry(self) -> None:
+        """Format tables for the telemetry console"""
+        telemetries: dict[str, str] = {}
+        for image in self.images.values():
+            telemetries.update(image.telemetry)
+
+        commands = self.telemetry_reader.read_last()
+        if commands is not None:
+            telemetries.update({"COMMANDS TO ROBOTS": telemetry.format_commands(commands.content)})
+
         boarder_pos = 16
         boarder_text = " | "
 
@@ -1,17 +1,18 @@
 """Processor that creates the field"""
 
-from time import time
 from typing import Optional
 
 import attr
-from strategy_bridge.bus import DataBus, DataReader, DataWriter
+import zmq
+from strategy_bridge.bus import DataBus, DataReader
 from strategy_bridge.common import config
 from strategy_bridge.larcmacs.receiver import ZmqReceiver
 from strategy_bridge.pb.messages_robocup_ssl_wrapper_pb2 import SSL_WrapperPacket
 from strategy_bridge.processors import BaseProcessor
 
 from bridge import const, drawing
-from bridge.auxiliary import aux, fld
+from bridge.auxiliary import aux, clock, fld, matchlog, snapshot, trace, wakeup
+from bridge.processors.async_runner import AsyncReceiver
 from bridge.processors.referee_state_processor import RefereeStateProcessor, State
 
 
@@ -30,27 +31,82 @@ class FieldCreator(BaseProcessor):
     debug_preparation_delay: float = 5.0
     # time in seconds before command free_kick, kickoff or penalty
 
+    # match log
+    record_path: Optional[str] = None  # write raw vision and referee packets to this log
+    replay_path: Optional[str] = None  # take packets from this log instead of ZMQ
+    replay_speed: float = 1.0  # 1 - real time, N - N times faster, 0 - as fast as possible
+
+    # True => sleep on zmq.Poller until vision or referee packet arrives (processing_pause is ignored)
+    # only with ZMQ receivers, in replay and with async_receive processing_pause is used as usual
+    blocking_receive: bool = False
+    poll_timeout: float = 0.05  # [s] max wait, so referee timers keep going without packets
+
+    # True => receive through zmq.asyncio sockets (only under AsyncRunner)
+    async_receive: bool = False
+
+    # name of shared memory segment for the field (instead of FIELD_TOPIC), see snapshot.py
+    field_shm: Optional[str] = None
+
     def initialize(self, data_bus: DataBus) -> None:
         """
         Инициализация
         """
         super().initialize(data_bus)
-        self.field_receiver = ZmqReceiver(port=config.VISION_DETECTIONS_SUBSCRIBE_PORT)
+        self.recorder: Optional[matchlog.LogWriter] = None
+        if self.record_path is not None:
+            self.recorder = matchlog.LogWriter(self.record_path)
+
+        referee_receiver: Optional[matchlog.Receiver] = None
+        self.field_receiver: matchlog.Receiver
+        self.async_receivers: list[AsyncReceiver] = []
+        if self.replay_path is not None:
+            self.replay = matchlog.ReplaySource(matchlog.LogReader(self.replay_path), self.replay_speed)
+            clock.set_clock(clock.ReplayClock(self.replay))
+            self.field_receiver = self.replay.receiver(matchlog.Channel.VISION)
+            referee_receiver = self.replay.receiver(matchlog.Channel.REFEREE)
+        elif self.async_receive:
+            self.async_receivers = [
+                AsyncReceiver(config.VISION_DETECTIONS_SUBSCRIBE_PORT),
+                AsyncReceiver(config.REFEREE_COMMANDS_SUBSCRIBE_PORT),
+            ]
+            self.field_receiver, referee_receiver = self.async_receivers
+        else:
+            self.field_receiver = ZmqReceiver(port=config.VISION_DETECTIONS_SUBSCRIBE_PORT)
 
         self.box_feedback_reader = DataReader(data_bus, config.BOX_FEEDBACK_TOPIC)
-        self.field_writer = DataWriter(data_bus, const.FIELD_TOPIC, 1)
+        self.field_writer = wakeup.NotifyingDataWriter(data_bus, const.FIELD_TOPIC, 1)
+        self.snapshot_writer: Optional[snapshot.SnapshotWriter] = None
+        if self.field_shm is not None:
+            self.snapshot_writer = snapshot.SnapshotWriter(self.field_shm)
         self._ssl_converter = SSL_WrapperPacket()
         self.field = fld.Field(const.COLOR)
-        self.field.field_image.timer = drawing.FeedbackTimer(time(), 5, 30)
+        self.field.field_image.timer = drawing.FeedbackTimer(clock.now(), 5, 30)
 
         self.referee_processor = RefereeStateProcessor(
             debug_mode=self.debug_mode,
             debug_game_state=self.debug_game_state,
             debug_active_team=self.debug_active_team,
             debug_preparation_delay=self.debug_preparation_delay,
+            receiver=referee_receiver,
+            recorder=self.recorder,
         )
 
+        self.poller: Optional[zmq.Poller] = None
+        if self.blocking_receive:
+            receivers = [self.field_receiver, self.referee_processor.receiver]
+            sockets = [receiver.socket for receiver in receivers if isinstance(receiver, ZmqReceiver)]
+            if sockets:
+                self.processing_pause = None
+                self.poller = zmq.Poller()
+                for socket in sockets:
+                    self.poller.register(socket, zmq.POLLIN)
+            else:
+                # replay and asyncio receivers have no sockets to poll, the pause keeps the loop from spinning
+                self.logger.warning("blocking_receive needs ZMQ receivers, processing_pause is kept")
+
     def process(self) -> None:
+        if self.poller is not None:
+            self.poller.poll(round(self.poll_timeout * 1000))
         self.process_field()
         cur_state = self.referee_processor.process(self.field)
         self.field.game_state, self.field.active_team = cur_state
@@ -64,14 +120,18 @@ class FieldCreator(BaseProcessor):
         message = self.field_receiver.next_message()
         while message is not None:
             queue.append(message)
+            if self.recorder is not None:
+                self.recorder.write(matchlog.Channel.VISION, message)
             message = self.field_receiver.next_message()
 
         if len(queue) == 0:
             return
 
-        self.field.field_image.timer.start(time())
+        received_time = clock.now()
+        capture_time: Optional[float] = None
+        self.field.field_image.timer.start(received_time)
 
-        # print("field delay:", time() - self.field.last_update)
+        # print("field delay:", clock.now() - self.field.last_update)
         balls: list[aux.Point] = []
         b_bots_id: list[int] = []
         b_bots_pos: list[list] = [[] for _ in range(const.TEAM_ROBOTS_MAX_COUNT)]
@@ -98,6 +158,9 @@ class FieldCreator(BaseProcessor):
             #         const.GOAL_DY = geometry.field.goal_width
 
             detection = ssl_package_content.detection
+            if ssl_package_content.HasField("detection"):
+                # cameras of one frame capture at slightly different times, the frame is as old as the first one
+                capture_time = detection.t_capture if capture_time is None else min(capture_time, detection.t_capture)
             for ball in detection.balls:
                 if ball.x * const.DEBUG_HALF < 0:
                     continue
@@ -124,20 +187,20 @@ class FieldCreator(BaseProcessor):
             balls,
         )
         if new_ball_pos is not None:
-            self.field.update_ball(new_ball_pos[0], time())
-            self.field.ball_real_update_time = time()
+            self.field.update_ball(new_ball_pos[0], clock.now())
+            self.field.ball_real_update_time = clock.now()
         else:
             cur_state = self.referee_processor.state_machine.get_state()
             if cur_state[0] == State.RUN:
                 if self.field.robot_with_ball is not None:
                     ally = self.field.robot_with_ball
                     ball = ally.get_pos() + aux.rotate(aux.RIGHT, ally.get_angle()) * 90
-                    self.field.update_ball(ball, time())
+                    self.field.update_ball(ball, clock.now())
             else:
                 if self.field.robot_with_ball is not None:
                     ally = self.field.robot_with_ball
                     ball = ally.get_pos() + aux.rotate(aux.RIGHT, ally.get_angle()) * 90
-                    self.field.update_ball(ball, time())
+                    self.field.update_ball(ball, clock.now())
 
         self.field.update_ball_history()
 
@@ -151,13 +214,13 @@ class FieldCreator(BaseProcessor):
                 b_bots_ang[r_id],
             )
             if new_pos is not None:
-                self.field.update_blu_robot(r_id, new_pos[0], new_pos[1], time())
+                self.field.update_blu_robot(r_id, new_pos[0], new_pos[1], clock.now())
 
             live_time = self.field.b_team[r_id].live_time()
-            if live_time is not None and time() - live_time > const.TIME_TO_BORN:
+            if live_time is not None and clock.now() - live_time > const.TIME_TO_BORN:
                 self.field.b_team[r_id].used(1)
         for robot in self.field.b_team:
-            if time() - robot.last_update() > const.TIME_TO_DIE:
+            if clock.now() - robot.last_update() > const.TIME_TO_DIE:
                 robot.used(0)
 
         for r_id in set(y_bots_id):
@@ -170,26 +233,16 @@ class FieldCreator(BaseProcessor):
                 y_bots_ang[r_id],
             )
             if new_pos is not None:
-                self.field.update_yel_robot(r_id, new_pos[0], new_pos[1], time())
+                self.field.update_yel_robot(r_id, new_pos[0], new_pos[1], clock.now())
 
             live_time = self.field.y_team[r_id].live_time()
-            if live_time is not None and time() - live_time > const.TIME_TO_BORN:
+            if live_time is not None and clock.now() - live_time > const.TIME_TO_BORN:
                 self.field.y_team[r_id].used(1)
         for robot in self.field.y_team:
-            if time() - robot.last_update() > const.TIME_TO_DIE:
+            if clock.now() - robot.last_update() > const.TIME_TO_DIE:
                 robot.used(0)
 
-        active_allies = []
-        for r in self.field.allies:
-            if r.is_used() and r.r_id != self.field.gk_id:
-                active_allies.append(r)
-        self.field.update_active_allies(active_allies)
-
-        active_enemies = []
-        for r in self.field.enemies:
-            if r.is_used() and r.r_id != self.field.enemy_gk_id:
-                active_enemies.append(r)
-        self.field.update_active_enemies(active_enemies)
+        self.field.world.update_roster()
 
         ENABLE_FEEDBACK = False
         if ENABLE_FEEDBACK:
@@ -218,10 +271,26 @@ class FieldCreator(BaseProcessor):
             for r in self.field.allies:
                 if self.field._is_ball_in(r):
                     self.field.robot_with_ball = r
-        self.field.last_update = time()
-        self.field.field_image.timer.end(time())
-        lite_field = fld.LiteField(self.field)
-        self.field_writer.write(lite_field)
+        self.field.last_update = clock.now()
+        self.field.frame_id += 1
+        self.field.trace = trace.TraceContext(
+            self.field.frame_id,
+            capture_time,
+            ((trace.RECEIVED, received_time), (trace.FIELD, self.field.last_update)),
+        )
+        self.field.field_image.timer.end(clock.now())
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.write(self.field)
+            wakeup.notify(const.FIELD_TOPIC)
+        else:
+            lite_field = fld.LiteField(self.field)
+            self.field_writer.write(lite_field)
+
+    def finalize(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.close()
 
 
 def filter_fake_detections(
@@ -236,7 +305,7 @@ def filter_fake_detections(
     correct_angles: list[float] = []
     for i, new_pos in enumerate(new_poses):
         if const.IS_SIMULATOR_USED or (
-            new_pos != old_pos or (new_pos - old_pos).mag() / (time() - last_update) < max_vision_speed
+            new_pos != old_pos or (new_pos - old_pos).mag() / (clock.now() - last_update) < max_vision_speed
         ):
             correct_poses.append(new_pos)
             if angles is not None:
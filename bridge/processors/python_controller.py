@@ -2,7 +2,6 @@
 Модуль стратегии игры
 """
 
-from time import time
 from typing import Optional
 
 import attr
@@ -11,7 +10,7 @@ from strategy_bridge.processors import BaseProcessor
 from strategy_bridge.utils.debugger import debugger
 
 from bridge import const, drawing
-from bridge.auxiliary import fld
+from bridge.auxiliary import clock, fld, snapshot, trace, wakeup
 from bridge.router.action import Action
 from bridge.strategy import strategy
 
@@ -19,10 +18,17 @@ from bridge.strategy import strategy
 class RobotCommand:
     """Command to control robot"""
 
-    def __init__(self, r_id: int, color: const.Color, action: Action) -> None:
+    def __init__(
+        self,
+        r_id: int,
+        color: const.Color,
+        action: Action,
+        trace_context: Optional[trace.TraceContext] = None,
+    ) -> None:
         self.r_id: int = r_id
         self.color: const.Color = color
         self.action: Action = action
+        self.trace: Optional[trace.TraceContext] = trace_context  # frame the command was made for
 
 
 @attr.s(auto_attribs=True)
@@ -36,8 +42,9 @@ class SSLController(BaseProcessor):
     max_commands_to_persist: int = 20
 
     ally_color: const.Color = const.Color.BLUE
+    field_shm: Optional[str] = None  # read the field from shared memory instead of FIELD_TOPIC
 
-    cur_time = time()
+    cur_time = clock.now()
     delta_t = 0.0
 
     count_halt_cmd = 0
@@ -48,12 +55,15 @@ class SSLController(BaseProcessor):
         """
         super().initialize(data_bus)
         self.field_reader = DataReader(data_bus, const.FIELD_TOPIC)
+        self.snapshot_reader: Optional[snapshot.SnapshotReader] = None
+        if self.field_shm is not None:
+            self.snapshot_reader = snapshot.SnapshotReader(self.field_shm)
 
-        self.robot_control_writer = DataWriter(data_bus, const.CONTROL_TOPIC, 50)
+        self.robot_control_writer = wakeup.NotifyingDataWriter(data_bus, const.CONTROL_TOPIC, 50)
         self.image_writer = DataWriter(data_bus, const.IMAGE_TOPIC, 20)
 
         self.field = fld.Field(self.ally_color)
-        self.field.strategy_image.timer = drawing.FeedbackTimer(time(), 0.05, 40)
+        self.field.strategy_image.timer = drawing.FeedbackTimer(clock.now(), 0.05, 40)
 
         self.strategy = strategy.Strategy()
         self.actions: list[Optional[Action]] = []
@@ -62,9 +72,15 @@ class SSLController(BaseProcessor):
         """
         Прочитать новые пакеты из SSL-Vision
         """
+        if self.snapshot_reader is not None:
+            if self.snapshot_reader.read_into(self.field):
+                clock.sync(self.field.last_update)
+            return
+
         new_field = self.field_reader.read_last()
         if new_field is not None:
             updated_field: fld.LiteField = new_field.content
+            clock.sync(updated_field.last_update)
             # print(f"strategy daley{(time() - new_field.timestamp)*1000 : .2f}")
             self.field.update_field(updated_field)
         else:
@@ -78,16 +94,24 @@ class SSLController(BaseProcessor):
 
     def control_assign(self) -> None:
         """Send commands to robots"""
+        written = False
+        trace_context = None
+        if self.field.trace is not None:
+            trace_context = self.field.trace.stamp(trace.STRATEGY)
         for robot in self.field.active_allies(True):
             cur_action = self.actions[robot.r_id]
             if cur_action is not None:
-                message = RobotCommand(robot.r_id, robot.color, cur_action)
+                message = RobotCommand(robot.r_id, robot.color, cur_action, trace_context)
 
-                self.robot_control_writer.write(message)
+                self.robot_control_writer.write(message, notify_readers=False)
+                written = True
+        if written:
+            # CommandSink wakes up once for the whole batch
+            self.robot_control_writer.notify()
 
     def send_image(self) -> None:
         """Send commands to drawer processor"""
-        self.field.strategy_image.timer.end(time())
+        self.field.strategy_image.timer.end(clock.now())
         if self.field.ally_color == const.COLOR:
             self.image_writer.write(self.field.strategy_image)
         self.field.clear_images()
@@ -97,7 +121,7 @@ class SSLController(BaseProcessor):
         """
         Выполнить цикл процессора
         """
-        self.field.strategy_image.timer.start(time())
+        self.field.strategy_image.timer.start(clock.now())
 
         self.read_vision()
         self.control_loop()
@@ -2,7 +2,6 @@
 
 import json
 from enum import Enum
-from time import time
 from typing import Optional
 
 from strategy_bridge.common import config
@@ -10,7 +9,7 @@ from strategy_bridge.larcmacs.receiver import ZmqReceiver
 from strategy_bridge.model.referee import RefereeCommand
 
 from bridge import const
-from bridge.auxiliary import aux, fld
+from bridge.auxiliary import aux, clock, fld, matchlog
 from bridge.const import State
 
 
@@ -135,11 +134,21 @@ class RefereeStateProcessor:
         debug_game_state: State = State.STOP,
         debug_active_team: const.Color = const.Color.ALL,
         debug_preparation_delay: float = 5.0,
+        receiver: Optional[matchlog.Receiver] = None,
+        recorder: Optional[matchlog.LogWriter] = None,
     ) -> None:
         """
         Инициализация
+
+        receiver - источник команд вместо ZMQ (например, воспроизведение лога)
+        recorder - лог для записи всех полученных команд
         """
-        self.receiver = ZmqReceiver(port=config.REFEREE_COMMANDS_SUBSCRIBE_PORT)
+        self.receiver: matchlog.Receiver
+        if receiver is None:
+            self.receiver = ZmqReceiver(port=config.REFEREE_COMMANDS_SUBSCRIBE_PORT)
+        else:
+            self.receiver = receiver
+        self.recorder = recorder
 
         self.debug_mode = debug_mode
         self.debug_game_state = debug_game_state
@@ -168,7 +177,7 @@ class RefereeStateProcessor:
                 State.PENALTY,
             ]:
                 self.preparation_flag = True
-                self.preparation_timer = time()
+                self.preparation_timer = clock.now()
 
                 self.state_machine.set_state(PreparationStateMap[self.debug_game_state])
             else:
@@ -179,6 +188,8 @@ class RefereeStateProcessor:
         Метод обратного вызова процесса
         """
         message = self.receiver.next_message()
+        if message is not None and self.recorder is not None:
+            self.recorder.write(matchlog.Channel.REFEREE, message)
         if not self.debug_mode and message is not None:
             parsed_message = json.loads(bytes(message))
             cur_command = RefereeCommand(
@@ -198,7 +209,7 @@ class RefereeStateProcessor:
 
                 self.update_flags(field, cur_state)
 
-        elif self.preparation_flag and time() - self.preparation_timer > self.debug_preparation_delay:
+        elif self.preparation_flag and clock.now() - self.preparation_timer > self.debug_preparation_delay:
             self.state_machine.set_state(self.debug_game_state)
             self.state_machine.active_team(self.debug_active_team.value)
 
@@ -209,7 +220,7 @@ class RefereeStateProcessor:
 
             self.preparation_flag = False
 
-        if self.wait_10_sec_flag and time() - self.wait_10_sec > 10:
+        if self.wait_10_sec_flag and clock.now() - self.wait_10_sec > 10:
             self.state_machine.make_transition_(Command.PASS_10_SECONDS)
             self.state_machine.active_team(0)
             self.wait_10_sec_flag = False
@@ -234,7 +245,7 @@ class RefereeStateProcessor:
             State.PENALTY,
         ]:
             self.wait_10_sec_flag = True
-            self.wait_10_sec = time()
+            self.wait_10_sec = clock.now()
 
         if state in [
             State.KICKOFF,
@@ -2,24 +2,50 @@
 Модуль-прослойка между стратегией и отправкой пакетов на роботов
 """
 
-from time import sleep, time
-from typing import List, Optional
+import math
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from typing import Optional
 
 import attr
-import attrs
+import numpy as np
 import zmq
-from cattrs import unstructure
 from strategy_bridge.bus import DataBus, DataReader, DataWriter
 from strategy_bridge.processors import BaseProcessor
+from zmq.utils import jsonapi
 
 from bridge import const, drawing
-from bridge.auxiliary import aux, fld, rbt
+from bridge.auxiliary import (
+    aux,
+    clock,
+    command_codec,
+    fld,
+    rbt,
+    router_log,
+    snapshot,
+    telemetry,
+    trace,
+    wakeup,
+)
+from bridge.auxiliary.command_codec import DecoderCommand, DecoderTeamCommand
 from bridge.processors.python_controller import RobotCommand
-from bridge.router.action import Action, ActionDomain, ActionValues
+from bridge.router import profiler
+from bridge.router.action import (
+    Action,
+    ActionDomain,
+    ActionValues,
+    TeamActionValues,
+    body_frame,
+    update_action,
+)
+from bridge.router.base_actions import Actions
 
 UDP_IP = "10.0.120.210"
 UDP_PORT = 10000
 
+MIN_DT = 1e-6  # [s]
+PERIOD_SMOOTHING = 0.1  # weight of a new interval in the period of commands (EWMA)
+
 
 @attr.s(auto_attribs=True)
 class CommandSink(BaseProcessor):
@@ -29,6 +55,53 @@ class CommandSink(BaseProcessor):
 
     processing_pause: Optional[float] = 0.001
     reduce_pause_on_process_time: bool = False
+    field_shm: Optional[str] = None  # read the field from shared memory instead of FIELD_TOPIC
+    control_endpoint: str = "tcp://127.20.10.11:5051"
+    zmq_context: Optional[zmq.Context] = None  # context for sockets (e.g. zmq.asyncio one), new if None
+
+    # run right after a new field or command is written instead of every processing_pause
+    wake_on_write: bool = False
+    wake_timeout: float = 0.05  # [s] run anyway if nothing was written
+
+    # evaluate actions of a team's robots in that many threads, 0 - one by one in the processor thread
+    robot_workers: int = 0
+
+    # teams to route commands for, None - const.COLOR (both teams if const.SELF_PLAY)
+    colors: Optional[tuple[const.Color, ...]] = None
+
+    # "json" - send_json of unstructured DecoderTeamCommand, "binary" - packed record of command_codec
+    command_format: str = "json"
+
+    telemetry_period: Optional[float] = 0.1  # [s] send commands to the telemetry console, None - never
+
+    # send only robots whose command changed (the receiver keeps the last command of every robot)
+    send_changed_only: bool = False
+    vel_tolerance: float = 1.0  # change of forward_vel, left_vel that is not sent
+    angle_tolerance: float = 0.01  # [rad, rad/s] change of angle, angular_vel that is not sent
+    keepalive_period: float = 0.1  # [s] send commands of all robots at least this often
+
+    stop_burst: int = 5  # stop commands sent to every team in finalize
+
+    # [mm/s^2] limit change of commanded velocity (field frame) of every robot between ticks, None - off
+    max_acceleration: Optional[float] = None
+
+    # velocity filters and angle regulators of the team in arrays (rbt.TeamController), stepped in one call
+    team_controller: bool = False
+
+    # latency of commands by stages of trace.TraceContext, sent to the telemetry console
+    latency_window: Optional[float] = 10.0  # [s] restart the histograms this often, None - never
+    capture_clock_synced: bool = False  # clock of SSL-Vision is ours (same host, NTP), count t_capture too
+
+    # command of a robot expires after missed_ticks strategy ticks without a new one and becomes Actions.Stop,
+    # a tick is the period of commands of the team seen by the router, but not shorter than strategy_period
+    strategy_period: float = const.Ts  # [s] processing_pause of SSLController
+    missed_ticks: Optional[float] = 10  # None - commands never expire
+
+    # time of Action.process by action classes and robots (profiler.ActionProfiler)
+    profile_actions: bool = False  # table in the telemetry console (ACTION PROFILE), since the start
+    profile_stacks_path: Optional[str] = None  # write folded stacks for flamegraph.pl here in finalize
+
+    record_path: Optional[str] = None  # write fields and commands to this router_log (for bench.router_bench)
 
     def initialize(self, data_bus: DataBus) -> None:
         """
@@ -36,30 +109,65 @@ class CommandSink(BaseProcessor):
         """
         super().initialize(data_bus)
         self.field_reader = DataReader(data_bus, const.FIELD_TOPIC)
+        self.snapshot_reader: Optional[snapshot.SnapshotReader] = None
+        if self.field_shm is not None:
+            self.snapshot_reader = snapshot.SnapshotReader(self.field_shm)
         self.commands_sink_reader = DataReader(data_bus, const.CONTROL_TOPIC)
+        self.waiter: Optional[wakeup.TopicWaiter] = None
+        if self.wake_on_write:
+            self.processing_pause = None
+            self.waiter = wakeup.TopicWaiter([const.FIELD_TOPIC, const.CONTROL_TOPIC])
         self.image_writer = DataWriter(data_bus, const.IMAGE_TOPIC, 20)
+        self.telemetry_writer = DataWriter(data_bus, const.TELEMETRY_TOPIC, 1)
+        self.command_log = telemetry.CommandLog()
+        self.telemetry_time = 0.0
+
+        self.tmp_timer = clock.now()
+
+        self.routed_colors: tuple[const.Color, ...] = self.colors if self.colors is not None else default_colors()
+        if not self.routed_colors:
+            raise ValueError("CommandSink: no teams to route")
+
+        # Field and actions only for routed teams, commands for the others are dropped
+        self.world = fld.World()
+        self.field: dict[const.Color, fld.Field] = {color: fld.Field(color, self.world) for color in self.routed_colors}
+        self.router = TeamRouter(
+            self.field,
+            robot_workers=self.robot_workers,
+            max_acceleration=self.max_acceleration,
+            team_controller=self.team_controller,
+            strategy_period=self.strategy_period,
+            missed_ticks=self.missed_ticks,
+        )
+        self.latency = trace.LatencyRecorder(self.capture_clock_synced)
+        self.latency_time = clock.now()
+        self.recorder: Optional[router_log.RouterLogWriter] = None
+        if self.record_path is not None:
+            self.recorder = router_log.RouterLogWriter(
+                self.record_path, self.routed_colors, clock.now(), self.router.options()
+            )
+        self.action_profiler: Optional[profiler.ActionProfiler] = None
+        if self.profile_actions or self.profile_stacks_path is not None:
+            self.action_profiler = profiler.ActionProfiler()
+            profiler.install(self.action_profiler)
 
-        self.tmp_timer = time()
-
-        self.field_b = fld.Field(const.Color.BLUE)
-        self.field_y = fld.Field(const.Color.YELLOW)
-        self.field: dict[const.Color, fld.Field] = {
-            const.Color.BLUE: self.field_b,
-            const.Color.YELLOW: self.field_y,
-        }
-
-        self.field[const.COLOR].router_image.timer = drawing.FeedbackTimer(time(), 10, 50)
-
-        self.waypoints_b: list[Optional[Action]] = [None for _ in range(const.TEAM_ROBOTS_MAX_COUNT)]
-        self.waypoints_y: list[Optional[Action]] = [None for _ in range(const.TEAM_ROBOTS_MAX_COUNT)]
-        self.actions: dict[const.Color, list[Optional[Action]]] = {
-            const.Color.BLUE: self.waypoints_b,
-            const.Color.YELLOW: self.waypoints_y,
-        }
+        # images of the router are sent from the field of our team
+        self.image_field = self.field.get(const.COLOR, self.field[self.routed_colors[0]])
+        self.image_field.router_image.timer = drawing.FeedbackTimer(clock.now(), 10, 50)
 
-        context = zmq.Context()
+        context = self.zmq_context if self.zmq_context is not None else zmq.Context()
         self.s_control = context.socket(zmq.PUB)
-        self.s_control.connect("tcp://127.20.10.11:5051")
+        self.s_control.connect(self.control_endpoint)
+        if self.command_format not in ("json", "binary"):
+            raise ValueError(f"CommandSink: unknown command_format {self.command_format}")
+        self.command_sender = command_codec.CommandSender()
+        self.change_filter = command_codec.ChangeFilter(self.vel_tolerance, self.angle_tolerance, self.keepalive_period)
+        # traffic to the robots; saved - what sending all commands would cost on top (estimated by message size)
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        self.saved_messages = 0
+        self.saved_bytes = 0
+        self.command_size = 0.0  # [B] per robot in the last message
 
     def process(self) -> None:
         """
@@ -70,73 +178,108 @@ class CommandSink(BaseProcessor):
         # sleep(0.01)
         # return
 
-        telemetry_message = drawing.get_wave() + "\n"
-        updated = False
+        if self.waiter is not None:
+            self.waiter.wait(self.wake_timeout)
 
-        new_field = self.field_reader.read_last()
-        if new_field is not None:
-            updated_field: fld.LiteField = new_field.content
-            if self.field_b.last_update != updated_field.last_update:
-                self.field_b.update_field(updated_field)
-                self.field_y.update_field(updated_field)
-                updated = True
+        field_updated = False
+
+        if self.snapshot_reader is not None:
+            if self.snapshot_reader.read_into(self.image_field):
+                clock.sync(self.world.last_update)
+                field_updated = True
+        else:
+            new_field = self.field_reader.read_last()
+            if new_field is not None:
+                updated_field: fld.LiteField = new_field.content
+                clock.sync(updated_field.last_update)
+                if self.world.last_update != updated_field.last_update:
+                    self.world.update_field(updated_field)
+                    field_updated = True
 
         cmds = self.commands_sink_reader.read_new()
-        for cmd in cmds:
-            command: RobotCommand = cmd.content
-            if command.color == const.Color.BLUE:
-                self.waypoints_b[command.r_id] = command.action
-            else:
-                self.waypoints_y[command.r_id] = command.action
-            updated = True
-
-        if updated:
-            self.field[const.COLOR].router_image.timer.start(time())
-            for color in [const.Color.BLUE, const.Color.YELLOW]:
-                team_message: str = (
-                    f"TEAM {str(color)}\n"
-                    + "\tr_id\tvelFRW\tvelLEFT\tvelR\tangle\tkickUP\tkickFRW\tautoUP\tautoFRW\tvolt\tdrib\n"
-                )
-                team_commands: list[DecoderCommand] = []
-                for i in range(const.TEAM_ROBOTS_MAX_COUNT):
-                    cur_action = self.actions[color][i]
-                    if self.field[color].allies[i].is_used() and cur_action is not None:
-                        self.field[color].allies[i].clear_fields()
-
-                        domain = ActionDomain(
-                            field=self.field[color],
-                            game_state=self.field[color].game_state,
-                            we_active=self.field[color].active_team in [const.Color.ALL, color],
-                            robot=self.field[color].allies[i],
-                        )
-                        values = ActionValues()
-                        cur_action.process(domain, values)
-
-                        cur_command = command_from_values(domain.field, domain.robot, values)
-                        team_commands.append(cur_command)
-                        team_message += create_telemetry(cur_command)
+        commands: list[RobotCommand] = [cmd.content for cmd in cmds if cmd.content.color in self.field]
+        if self.recorder is not None and (field_updated or commands):
+            lite_field = fld.LiteField(self.image_field) if field_updated else None
+            self.recorder.write(router_log.RouterTick(clock.now(), lite_field, commands))
+
+        for command in commands:
+            self.router.update_command(command)
+
+        if field_updated or commands:
+            self.image_field.router_image.timer.start(clock.now())
+            self.command_log.clear()
+            for color in self.routed_colors:
+                team_commands = self.router.process_team(color)
+                for cur_command in team_commands:
+                    self.command_log.append(color, cur_command)
 
                 if len(team_commands) > 0:
+                    team_trace = trace.oldest([self.router.traces[color][cmd.robot_id] for cmd in team_commands])
                     control_data = DecoderTeamCommand(
                         robot_commands=team_commands,
                         isteamyellow=(color == const.Color.YELLOW),
+                        trace=team_trace.stamp(trace.ROUTER) if team_trace is not None else None,
                     )
 
-                    self.s_control.send_json({"control": "actuate_robot", "data": unstructure(control_data)})
-
-                telemetry_message += team_message
-                telemetry_message += "-" * 90 + "\n"
-
-            self.field[const.COLOR].router_image.timer.end(time())
-            self.image_writer.write(self.field[const.COLOR].path_image)
-            self.field_b.clear_images()
-            self.field_y.clear_images()
-
-            self.field[const.COLOR].router_image.send_telemetry("COMMANDS TO ROBOTS", telemetry_message)
-        self.image_writer.write(self.field[const.COLOR].router_image)
+                    self.send_changed(control_data)
+
+            self.image_field.router_image.timer.end(clock.now())
+            self.image_writer.write(self.image_field.path_image)
+            for field in self.field.values():
+                field.clear_images()
+
+            if self.telemetry_period is not None and clock.now() - self.telemetry_time > self.telemetry_period:
+                self.telemetry_time = clock.now()
+                self.telemetry_writer.write(self.command_log.snapshot())
+                self.image_field.router_image.send_telemetry("COMMAND TRAFFIC", self.traffic_report())
+                self.image_field.router_image.send_telemetry("COMMAND LATENCY", self.latency.report())
+                if self.latency_window is not None and clock.now() - self.latency_time > self.latency_window:
+                    self.latency_time = clock.now()
+                    self.latency.reset()
+                if self.profile_actions and self.action_profiler is not None:
+                    self.image_field.router_image.send_telemetry("ACTION PROFILE", self.action_profiler.table())
+        self.image_writer.write(self.image_field.router_image)
+
+    def send_team_command(self, control_data: DecoderTeamCommand) -> int:
+        """Send commands of the team in the configured format, returns size of the message"""
+        if self.command_format == "binary":
+            return self.command_sender.send(self.s_control, control_data)
+        message = jsonapi.dumps({"control": "actuate_robot", "data": command_codec.unstructure_team(control_data)})
+        self.s_control.send(message)
+        return len(message)
+
+    def send_changed(self, control_data: DecoderTeamCommand) -> None:
+        """Send commands of the team, only changed ones if send_changed_only"""
+        count = len(control_data.robot_commands)
+        if self.send_changed_only:
+            control_data = DecoderTeamCommand(
+                robot_commands=self.change_filter.select(control_data, clock.now()),
+                isteamyellow=control_data.isteamyellow,
+                trace=control_data.trace,
+            )
+        sent = len(control_data.robot_commands)
+        if sent == 0:
+            self.saved_messages += 1
+            self.saved_bytes += round(count * self.command_size)
+            return
+
+        size = self.send_team_command(control_data)
+        if control_data.trace is not None:
+            self.latency.record(control_data.trace.stamp(trace.SENT))
+        self.command_size = size / sent
+        self.sent_messages += 1
+        self.sent_bytes += size
+        self.saved_bytes += round((count - sent) * self.command_size)
+
+    def traffic_report(self) -> str:
+        """Sent and saved messages and bytes"""
+        return (
+            f"sent: {self.sent_messages} msgs, {self.sent_bytes / 1024:.0f} KiB\n"
+            f"saved: {self.saved_messages} msgs, {self.saved_bytes / 1024:.0f} KiB\n"
+            f"stale: {self.router.stale_commands} commands\n"
+        )
 
     def finalize(self) -> None:
-
         team_commands: list[DecoderCommand] = []
         for r_id in range(const.TEAM_ROBOTS_MAX_COUNT):
             team_commands.append(
@@ -154,101 +297,293 @@ class CommandSink(BaseProcessor):
                 )
             )
 
-        for _ in range(5):
-            for team in [True, False]:
-                control_data = DecoderTeamCommand(robot_commands=team_commands, isteamyellow=team)
-                self.s_control.send_json({"control": "actuate_robot", "data": unstructure(control_data)})
+        for _ in range(self.stop_burst):
+            for color in self.routed_colors:
+                control_data = DecoderTeamCommand(robot_commands=team_commands, isteamyellow=(color == const.Color.YELLOW))
+                self.send_team_command(control_data)
             sleep(0.002)
 
         self.s_control.close()
+        self.router.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.action_profiler is not None:
+            profiler.install(None)
+            if self.profile_stacks_path is not None:
+                with open(self.profile_stacks_path, "w", encoding="utf-8") as file:
+                    file.write(self.action_profiler.folded())
 
 
-def command_from_values(field: fld.Field, robot: rbt.Robot, values: ActionValues) -> "DecoderCommand":
-    """Turn ActionValues to commands for robots"""
-    if const.IS_SIMULATOR_USED:
-        robot.beep = 1
+def default_colors() -> tuple[const.Color, ...]:
+    """Teams routed by default: ours, or both in self-play"""
+    if const.SELF_PLAY:
+        return (const.Color.BLUE, const.Color.YELLOW)
+    return (const.COLOR,)
 
-    if values.beep == 0:
-        robot.update_vel_xy(values.vel)
-        aerr = aux.wind_down_angle(values.angle - robot.get_angle())
-        if const.IS_SIMULATOR_USED:
-            ang_vel = robot.angle_reg.process(aerr, -robot.get_anglevel())
-            robot.update_vel_w(ang_vel)
-        else:
-            robot.delta_angle = aerr
 
-        reg_vel = aux.Point(robot.speed_x, -robot.speed_y)
-        field.router_image.draw_line(
-            robot.get_pos(),
-            robot.get_pos() + aux.rotate(reg_vel, robot.get_angle()) * 50,
-        )
-    else:
-        # print("manual speeds: ", values.vel, values.angle)
+class TeamRouter:
+    """
+    Actions of the routed teams and their evaluation to commands - CommandSink without I/O
 
-        robot.speed_x = values.vel.x
-        robot.speed_y = values.vel.y
-        if const.IS_SIMULATOR_USED:
-            robot.update_vel_w(values.angle)
-        else:
-            robot.delta_angle = values.angle
-
-    return DecoderCommand(
-        robot_id=robot.r_id,
-        kick_up=values.kick_up,
-        kick_forward=values.kick_forward,
-        auto_kick_up=values.auto_kick == 2,
-        auto_kick_forward=values.auto_kick == 1,
-        kicker_setting=values.kicker_voltage,
-        dribbler_setting=values.dribbler_speed,
-        forward_vel=robot.speed_x,
-        left_vel=-robot.speed_y,
-        angular_vel=robot.speed_r if robot.beep else None,
-        angle=robot.delta_angle if not robot.beep else None,
-    )
+    bench.router_bench runs it on the recorded ticks with the options of the game (options()),
+    so the commands are the same as the ones CommandSink sent.
+    """
 
+    def __init__(
+        self,
+        fields: dict[const.Color, fld.Field],
+        *,
+        robot_workers: int = 0,
+        max_acceleration: Optional[float] = None,
+        team_controller: bool = False,
+        strategy_period: float = const.Ts,
+        missed_ticks: Optional[float] = 10,
+    ) -> None:
+        """Options are the ones of CommandSink"""
+        self.field = fields
+        self.robot_workers = robot_workers
+        self.max_acceleration = max_acceleration
+        self.team_controller = team_controller
+        self.strategy_period = strategy_period
+        self.missed_ticks = missed_ticks
+
+        self.executor: Optional[ThreadPoolExecutor] = None
+        if robot_workers > 0:
+            self.executor = ThreadPoolExecutor(robot_workers, thread_name_prefix="router")
+        self.actions: dict[const.Color, list[Optional[Action]]] = {
+            color: [None for _ in range(const.TEAM_ROBOTS_MAX_COUNT)] for color in fields
+        }
+        self.traces: dict[const.Color, list[Optional[trace.TraceContext]]] = {
+            color: [None for _ in range(const.TEAM_ROBOTS_MAX_COUNT)] for color in fields
+        }
+        self.deadlines = {color: [math.inf] * const.TEAM_ROBOTS_MAX_COUNT for color in fields}
+        self.arrivals: dict[const.Color, list[Optional[float]]] = {
+            color: [None] * const.TEAM_ROBOTS_MAX_COUNT for color in fields
+        }
+        self.command_periods = {color: strategy_period for color in fields}  # [s] smoothed, see observe_period
+        self.stale_commands = 0  # commands that expired before the strategy sent a new one
+
+        self.team_values = {color: TeamActionValues() for color in fields}
+        self.controllers: dict[const.Color, rbt.TeamController] = {}
+        if team_controller:
+            for color, field in fields.items():
+                self.controllers[color] = rbt.TeamController()
+                self.controllers[color].bind(field.allies)
+        self.prev_vel = {color: np.zeros((const.TEAM_ROBOTS_MAX_COUNT, 2)) for color in fields}
+        self.prev_vel_time = {color: clock.now() for color in fields}
+
+    def options(self) -> dict:
+        """Options that change the commands, to create the same router again"""
+        return {
+            "robot_workers": self.robot_workers,
+            "max_acceleration": self.max_acceleration,
+            "team_controller": self.team_controller,
+            "strategy_period": self.strategy_period,
+            "missed_ticks": self.missed_ticks,
+        }
 
-def create_telemetry(cmd: "DecoderCommand") -> str:
-    """Create line for telemetry for single robot"""
-    values = [
-        str(cmd.robot_id),
-        f"{cmd.forward_vel:.0f}",
-        f"{cmd.left_vel:.0f}",
-        f"{cmd.angular_vel:.0f}" if cmd.angular_vel is not None else "None",
-        f"{cmd.angle:.0f}" if cmd.angle is not None else "None",
-        str(cmd.kick_up),
-        str(cmd.kick_forward),
-        str(cmd.auto_kick_up),
-        str(cmd.auto_kick_forward),
-        str(cmd.kicker_setting),
-        str(cmd.dribbler_setting),
-    ]
-    return "\t" + "\t".join(values) + "\n"
+    def update_command(self, command: RobotCommand) -> None:
+        """Take the command of the strategy"""
+        actions = self.actions[command.color]
+        actions[command.r_id] = update_action(actions[command.r_id], command.action)
+        self.traces[command.color][command.r_id] = command.trace
 
+        now = clock.now()
+        prev = self.arrivals[command.color][command.r_id]
+        if prev is not None:
+            self.observe_period(command.color, now - prev)
+        self.arrivals[command.color][command.r_id] = now
+        self.deadlines[command.color][command.r_id] = self.command_deadline(command.color, now)
 
-@attrs.define
-class DecoderCommand:
-    robot_id: int = attrs.field()
+    def observe_period(self, color: const.Color, interval: float) -> None:
+        """
+        Take the interval between two commands of a robot of the team into the period of its commands
 
-    kick_up: bool = attrs.field()
-    kick_forward: bool = attrs.field()
-    auto_kick_up: bool = attrs.field()
-    auto_kick_forward: bool = attrs.field()
+        Intervals longer than the deadline are stalls of the strategy (the command has expired), not its period
+        """
+        if self.missed_ticks is not None and interval > self.missed_ticks * self.command_period(color):
+            return
+        period = self.command_periods[color]
+        self.command_periods[color] = period + PERIOD_SMOOTHING * (interval - period)
+
+    def command_period(self, color: const.Color) -> float:
+        """Period of commands of the team, never shorter than strategy_period"""
+        return max(self.command_periods[color], self.strategy_period)
+
+    def command_deadline(self, color: const.Color, now: float) -> float:
+        """Time when the command of the team received at now expires"""
+        if self.missed_ticks is None:
+            return math.inf
+        return now + self.missed_ticks * self.command_period(color)
+
+    def expire_commands(self, color: const.Color) -> None:
+        """Stop robots of the team whose commands were not renewed in time (e.g. the strategy stalled)"""
+        now = clock.now()
+        deadlines = self.deadlines[color]
+        for r_id, action in enumerate(self.actions[color]):
+            if action is not None and now > deadlines[r_id]:
+                self.actions[color][r_id] = update_action(action, Actions.Stop())
+                self.traces[color][r_id] = None
+                deadlines[r_id] = math.inf
+                self.stale_commands += 1
+
+    def process_team(self, color: const.Color) -> list["DecoderCommand"]:
+        """
+        Stop robots with expired commands and evaluate actions of the team's robots, commands are ordered by r_id
 
-    kicker_setting: int = attrs.field()  # 0-15 [popugi]
-    dribbler_setting: float = attrs.field()  # 0-15 [popugi]
+        With robot_workers robots are evaluated in parallel: each one gets a view of the Field
+        (the state is not changed until all of them finish) and only touches its own Robot
+        and Action (regulators, prev_sended_*). Drawings are merged in the order of robots,
+        so the result is the same as one by one.
+        """
+        self.expire_commands(color)
+        field = self.field[color]
+        jobs = []
+        for robot in field.active_allies(True):
+            action = self.actions[color][robot.r_id]
+            if action is not None:
+                jobs.append((robot, action))
+        if self.executor is None or len(jobs) < 2:
+            values = [self.process_robot(field, robot, action) for robot, action in jobs]
+        else:
+            views = [field.view() for _ in jobs]
+            futures = [
+                self.executor.submit(self.process_robot, view, robot, action) for view, (robot, action) in zip(views, jobs)
+            ]
+            values = [future.result() for future in futures]
+            for view in views:
+                field.merge_images(view)
+
+        team = self.team_values[color]
+        team.clear()
+        robots = [robot for robot, _ in jobs]
+        for robot, robot_values in zip(robots, values):
+            team.store(robot.r_id, robot_values)
+        if self.max_acceleration is not None:
+            self.limit_acceleration(color, team)
+        return commands_from_values(field, robots, team, self.controllers.get(color))
+
+    def limit_acceleration(self, color: const.Color, team: TeamActionValues) -> None:
+        """Limit change of velocity of the team's robots since the previous tick"""
+        assert self.max_acceleration is not None
+        now = clock.now()
+        dt = max(now - self.prev_vel_time[color], MIN_DT)
+        team.limit_acceleration(self.prev_vel[color], dt, self.max_acceleration)
+        self.prev_vel[color][team.used] = team.vel[team.used]
+        self.prev_vel[color][~team.used] = 0  # a robot that comes back starts from standstill
+        self.prev_vel_time[color] = now
+
+    def process_robot(self, field: fld.Field, robot: rbt.Robot, action: Action) -> ActionValues:
+        """Evaluate the robot's action (bench.router_bench measures it)"""
+        return process_robot(field, robot, action)
+
+    def close(self) -> None:
+        """Stop the workers"""
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def process_robot(field: fld.Field, robot: rbt.Robot, action: Action) -> ActionValues:
+    """Evaluate the robot's action"""
+    robot.clear_fields()
+
+    domain = ActionDomain(
+        field=field,
+        game_state=field.game_state,
+        we_active=field.active_team in [const.Color.ALL, field.ally_color],
+        robot=robot,
+    )
+    values = ActionValues()
+    action.process(domain, values)
+    return values
+
+
+def commands_from_values(
+    field: fld.Field,
+    robots: list[rbt.Robot],
+    team: TeamActionValues,
+    controller: Optional[rbt.TeamController] = None,
+) -> list["DecoderCommand"]:
+    """
+    Turn ActionValues of the robots (stored in team) to commands for robots
+
+    controller - regulators of the robots if they are bound to a TeamController
+    """
+    team.limit_speed()
+    ids = [robot.r_id for robot in robots]
+    angles = np.array([robot.get_angle() for robot in robots])
+
+    # velocity filters - per robot or in one call with the controller, conversion to the robot frame - for the team
+    reg_vel = np.zeros((len(robots), 2))
+    if controller is not None:
+        regulated = np.zeros_like(team.used)
+        regulated[ids] = team.beep[ids] == 0
+        filtered_x, filtered_y = controller.filter_vel(team.vel, regulated)
+        reg_vel[:, 0], reg_vel[:, 1] = filtered_x[ids], filtered_y[ids]
+    else:
+        for i, robot in enumerate(robots):
+            if team.beep[robot.r_id] == 0:
+                vel_x, vel_y = team.vel[robot.r_id].tolist()
+                reg_vel[i] = (robot.xx_flp.process(vel_x), robot.yy_flp.process(vel_y))
+    speed_x, speed_y = body_frame(reg_vel, angles)
+
+    # angle regulators - per robot below or in one call with the controller (only in the simulator)
+    ang_vel: Optional[np.ndarray] = None
+    if controller is not None and const.IS_SIMULATOR_USED:
+        aerrs = np.zeros(len(team.used))
+        anglevels = np.zeros(len(team.used))
+        for i, robot in enumerate(robots):
+            aerrs[ids[i]] = aux.wind_down_angle(float(team.angle[ids[i]]) - robot.get_angle())
+            anglevels[ids[i]] = robot.get_anglevel()
+        ang_vel = controller.regulate_angle(aerrs, anglevels, regulated)
+
+    commands = []
+    for i, robot in enumerate(robots):
+        r_id = ids[i]
+        angle = float(team.angle[r_id])
+        if const.IS_SIMULATOR_USED:
+            robot.beep = 1
+
+        if team.beep[r_id] == 0:
+            robot.speed_x = float(speed_x[i])
+            robot.speed_y = float(speed_y[i])
+            aerr = aux.wind_down_angle(angle - robot.get_angle())
+            if ang_vel is not None:
+                robot.update_vel_w(float(ang_vel[r_id]))
+            elif const.IS_SIMULATOR_USED:
+                robot.update_vel_w(robot.angle_reg.process(aerr, -robot.get_anglevel()))
+            else:
+                robot.delta_angle = aerr
 
-    forward_vel: float = attrs.field()  # [m/s]
-    left_vel: float = attrs.field()  # [m/s]
-    angular_vel: Optional[float] = attrs.field(default=None)  # [rad/s]
-    angle: Optional[float] = attrs.field(default=None)  # [rad]
+            field.router_image.draw_line(
+                robot.get_pos(),
+                robot.get_pos() + aux.rotate(aux.Point(robot.speed_x, -robot.speed_y), robot.get_angle()) * 50,
+            )
+        else:
+            robot.speed_x, robot.speed_y = team.vel[r_id].tolist()
+            if const.IS_SIMULATOR_USED:
+                robot.update_vel_w(angle)
+            else:
+                robot.delta_angle = angle
+
+        commands.append(
+            DecoderCommand(
+                robot_id=r_id,
+                kick_up=bool(team.kick_up[r_id]),
+                kick_forward=bool(team.kick_forward[r_id]),
+                auto_kick_up=bool(team.auto_kick[r_id] == 2),
+                auto_kick_forward=bool(team.auto_kick[r_id] == 1),
+                kicker_setting=int(team.kicker_voltage[r_id]),
+                dribbler_setting=int(team.dribbler_speed[r_id]),
+                forward_vel=robot.speed_x,
+                left_vel=-robot.speed_y,
+                angular_vel=robot.speed_r if robot.beep else None,
+                angle=robot.delta_angle if not robot.beep else None,
+            )
+        )
+    return commands
 
 
 test_commands = [
     DecoderCommand(idx, True, False, False, False, 15, 15, 100, 0, 1, None) for idx in range(const.TEAM_ROBOTS_MAX_COUNT)
 ]
-
-
-@attrs.define
-class DecoderTeamCommand:
-    robot_commands: List[DecoderCommand] = attrs.field(factory=list)
-    isteamyellow: bool = attrs.field(default=False)
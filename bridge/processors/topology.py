@@ -0,0 +1,138 @@
+"""
+Раскладка процессоров по процессам и ядрам
+
+Вместо плоского списка Runner'а процессоры делятся на группы (ProcessGroup): каждая группа -
+отдельный процесс, процессоры внутри группы работают по очереди в одном потоке,
+каждый со своей processing_pause. Группе можно задать ядра (sched_setaffinity) и nice,
+например, чтобы отрисовка не отнимала время у роутера. Если задан report_period, каждая группа
+раз в report_period пишет в лог, сколько процессорного времени ушло на каждый её процессор
+(если логирование не настроено через config.init_logging, отчёт всё равно выводится в консоль).
+"""
+
+import logging
+import os
+import time
+import typing
+from multiprocessing import Process
+from typing import Optional
+
+import attr
+from strategy_bridge.bus import DataBus
+from strategy_bridge.processors import BaseProcessor
+from strategy_bridge.runner import BridgeManager
+
+from bridge.auxiliary import wakeup
+
+
+@attr.s(auto_attribs=True)
+class ProcessGroup:
+    """Processors that share one process"""
+
+    name: str
+    processors: list[BaseProcessor]
+    cpus: Optional[set[int]] = None  # cores for the process, None - any
+    nice: int = 0  # niceness increment, < 0 needs CAP_SYS_NICE
+
+
+@attr.s(auto_attribs=True, kw_only=True)
+class TopologyRunner:
+    """Runner that starts one process per ProcessGroup"""
+
+    groups: list[ProcessGroup]
+    report_period: Optional[float] = None  # [s] log CPU usage of processors, None - never
+    logger: logging.Logger = logging.getLogger(__name__)
+
+    def run(self) -> None:
+        """Start all groups and wait for them"""
+        BridgeManager.register("data_bus", DataBus)
+        with BridgeManager() as manager:
+            data_bus = manager.data_bus()  # type: ignore # pylint: disable=no-member
+            signals = wakeup.Signals()
+            processes = [
+                Process(target=self.run_group, args=(group, data_bus, signals), name=group.name) for group in self.groups
+            ]
+            for process in processes:
+                process.start()
+            try:
+                for process in processes:
+                    process.join()
+            except KeyboardInterrupt:
+                self.logger.warning("The application was interrupted")
+
+    def run_group(self, group: ProcessGroup, data_bus: DataBus, signals: wakeup.Signals) -> None:
+        """Body of the group process"""
+        configure_process(group, self.logger)
+        wakeup.install(signals)
+        if self.report_period is not None:
+            show_info(self.logger)
+        for processor in group.processors:
+            if len(group.processors) > 1 and (
+                getattr(processor, "blocking_receive", False) or getattr(processor, "wake_on_write", False)
+            ):
+                raise ValueError(f"{group.name}: blocking {type(processor).__name__} would stall its neighbours")
+            processor.initialize(data_bus)
+
+        try:
+            self._loop(group)
+        except KeyboardInterrupt:
+            for processor in group.processors:
+                processor.finalize()
+
+    def _loop(self, group: ProcessGroup) -> None:
+        """Run processors of the group in turn, each one with its own pause"""
+        processors = group.processors
+        next_run = [time.perf_counter()] * len(processors)
+        cpu_time = [0.0] * len(processors)
+        report_time = time.perf_counter()
+        report_cpu = time.process_time()
+
+        while True:
+            idx = min(range(len(processors)), key=next_run.__getitem__)
+            delay = next_run[idx] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            processor = processors[idx]
+            start, start_cpu = time.perf_counter(), time.thread_time()
+            processor.process()
+            cpu_time[idx] += time.thread_time() - start_cpu
+
+            pause = processor.processing_pause or 0.0
+            if processor.reduce_pause_on_process_time:
+                next_run[idx] = start + pause
+            else:
+                next_run[idx] = time.perf_counter() + pause
+
+            if self.report_period is not None and time.perf_counter() - report_time > self.report_period:
+                elapsed = time.perf_counter() - report_time
+                usage = [f"{type(p).__name__} {cpu / elapsed * 100:.0f}%" for p, cpu in zip(processors, cpu_time)]
+                total = (time.process_time() - report_cpu) / elapsed * 100
+                self.logger.info("[%s] cpu %.0f%% (all threads): %s", group.name, total, ", ".join(usage))
+                cpu_time = [0.0] * len(processors)
+                report_time, report_cpu = time.perf_counter(), time.process_time()
+
+
+def configure_process(group: ProcessGroup, logger: logging.Logger = logging.getLogger(__name__)) -> None:
+    """Apply CPU affinity and niceness of the group to the current process"""
+    if group.cpus is not None:
+        cpus = group.cpus & typing.cast(set[int], os.sched_getaffinity(0))
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+        else:
+            logger.warning("[%s] none of cpus %s is available, affinity is not set", group.name, sorted(group.cpus))
+    if group.nice != 0:
+        try:
+            os.nice(group.nice)
+        except PermissionError:
+            logger.warning("[%s] not allowed to set nice %d", group.name, group.nice)
+
+
+def show_info(logger: logging.Logger) -> None:
+    """Print INFO messages of the logger to the console even if logging is not configured"""
+    if logger.isEnabledFor(logging.INFO):
+        return
+    logger.setLevel(logging.INFO)
+    if not logger.hasHandlers():
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s"))
+        logger.addHandler(handler)
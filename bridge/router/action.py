@@ -2,21 +2,91 @@
 Description of the base action class
 """
 
+import math
+from typing import Any, Optional, TypeVar
+
+import numpy as np
+
 from bridge import const
 from bridge.auxiliary import aux, fld, rbt
 
+A = TypeVar("A", bound="Action")
+
+LIMIT_EPS = 1e-9  # relative
+
 
 class ActionValues:
     """Return values of the action"""
 
-    vel = aux.Point(0, 0)
-    angle = 0.0
-    kick_up = False
-    kick_forward = False
-    auto_kick = 0  # 0-lower, 1-upper
-    kicker_voltage = 0
-    dribbler_speed = 0
-    beep = 0  # MOST IMPORTANT
+    __slots__ = ("vel", "angle", "kick_up", "kick_forward", "auto_kick", "kicker_voltage", "dribbler_speed", "beep")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Default values (before any action)"""
+        self.vel = aux.Point(0, 0)
+        self.angle = 0.0
+        self.kick_up = False
+        self.kick_forward = False
+        self.auto_kick = 0  # 0-lower, 1-upper
+        self.kicker_voltage = 0
+        self.dribbler_speed = 0
+        self.beep = 0  # MOST IMPORTANT
+
+
+class TeamActionValues:
+    """
+    ActionValues of all robots of a team as arrays (index - r_id)
+
+    Limits are applied to the whole team at once, only robots marked in used are changed
+    """
+
+    def __init__(self, size: int = const.TEAM_ROBOTS_MAX_COUNT) -> None:
+        self.vel = np.zeros((size, 2))
+        self.angle = np.zeros(size)
+        self.kick_up = np.zeros(size, dtype=bool)
+        self.kick_forward = np.zeros(size, dtype=bool)
+        self.auto_kick = np.zeros(size, dtype=np.int8)
+        self.kicker_voltage = np.zeros(size, dtype=np.int32)
+        self.dribbler_speed = np.zeros(size, dtype=np.int32)
+        self.beep = np.zeros(size, dtype=np.int8)
+        self.used = np.zeros(size, dtype=bool)
+
+    def clear(self) -> None:
+        """Forget values of the previous tick"""
+        self.used[:] = False
+
+    def store(self, r_id: int, values: ActionValues) -> None:
+        """Put values of the robot to the arrays"""
+        self.vel[r_id] = (values.vel.x, values.vel.y)
+        self.angle[r_id] = values.angle
+        self.kick_up[r_id] = values.kick_up
+        self.kick_forward[r_id] = values.kick_forward
+        self.auto_kick[r_id] = values.auto_kick
+        self.kicker_voltage[r_id] = values.kicker_voltage
+        self.dribbler_speed[r_id] = values.dribbler_speed
+        self.beep[r_id] = values.beep
+        self.used[r_id] = True
+
+    def limit_speed(self, speed: float = const.MAX_SPEED) -> None:
+        """Same as limit_action for every robot"""
+        mag = np.hypot(self.vel[:, 0], self.vel[:, 1])
+        # np.hypot may differ from math.hypot in the last bits: the team is only screened with it,
+        # robots near the limit are limited one by one exactly as limit_action does
+        for r_id in np.flatnonzero(self.used & (mag > speed * (1 - LIMIT_EPS))).tolist():
+            vel_x, vel_y = self.vel[r_id].tolist()
+            robot_mag = math.hypot(vel_x, vel_y)
+            if robot_mag > speed:
+                self.vel[r_id] = (vel_x * (1 / robot_mag) * speed, vel_y * (1 / robot_mag) * speed)
+
+    def limit_acceleration(self, prev_vel: np.ndarray, dt: float, acceleration: float) -> None:
+        """Limit change of velocity since prev_vel (as velocities, [r_id, x/y]) by acceleration"""
+        delta = self.vel - prev_vel
+        delta_mag = np.hypot(delta[:, 0], delta[:, 1])
+        over = self.used & (delta_mag > acceleration * dt)
+        if over.any():
+            self.vel[over] = prev_vel[over] + delta[over] / delta_mag[over, np.newaxis] * acceleration * dt
 
 
 class ActionDomain:
@@ -36,7 +106,29 @@ class ActionDomain:
 
 
 class Action:
-    """Base class of Action"""
+    """
+    Base class of Action
+
+    Actions form a tree (use_behavior_of), which is kept between ticks: a child made with node()
+    stays in its slot while its type is the same and only takes new parameters (setup),
+    so only the subtrees whose type changed are built again.
+
+    Parameters and all the state of an action are set in setup() instead of __init__:
+    it is called when the action is created and each time it is re-issued in its slot.
+    """
+
+    _nodes: Optional[dict[int, "Action"]] = None  # children made with node(), created on first use
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if "__init__" in cls.__dict__:
+            raise TypeError(f"{cls.__qualname__}: parameters of an action are set in setup(), not in __init__")
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self.setup(*args, **kwargs)
+
+    def setup(self, *args: Any, **kwargs: Any) -> None:
+        """Take parameters of the action"""
 
     def is_defined(self, _: ActionDomain) -> bool:
         """Scope"""
@@ -49,6 +141,22 @@ class Action:
         """Condition for performing an action"""
         return []
 
+    def node(self, index: int, cls: type[A], *args: Any, **kwargs: Any) -> A:
+        """
+        Child action number index of this action of type cls with parameters args, kwargs
+
+        The child already in the slot is kept with its own children if it is of type cls, it only takes the parameters
+        """
+        if self._nodes is None:
+            self._nodes = {}
+        child = self._nodes.get(index)
+        if type(child) is cls:  # pylint: disable=unidiomatic-typecheck
+            child.setup(*args, **kwargs)
+            return child  # type: ignore
+        new_child = cls(*args, **kwargs)
+        self._nodes[index] = new_child
+        return new_child
+
     def process(self, domain: ActionDomain, current_action: ActionValues) -> None:
         """Process of Action"""
         for action in self.use_behavior_of(domain, current_action):
@@ -59,7 +167,26 @@ class Action:
             limit_action(domain, current_action)
 
 
+def body_frame(vel: np.ndarray, angle: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Velocities [i, x/y] in the field frame to speed_x, speed_y of robots with angles angle
+
+    Same as -aux.rotate(vel, -angle) with speed_x = -x, speed_y = y in Robot.update_vel_xy
+    """
+    cos, sin = np.cos(-angle), np.sin(-angle)
+    speed_x = vel[:, 0] * cos - vel[:, 1] * sin
+    speed_y = -(vel[:, 1] * cos + vel[:, 0] * sin)
+    return speed_x, speed_y
+
+
 def limit_action(_: ActionDomain, current_action: ActionValues, speed: float = const.MAX_SPEED) -> None:
     """Limit robot speed"""
     if current_action.vel.mag() > speed:
         current_action.vel = current_action.vel.unity() * speed
+
+
+def update_action(old: Optional[Action], new: Optional[Action]) -> Optional[Action]:
+    """Action to keep for the robot: new one with the children of old one if they are of the same type"""
+    if old is not None and new is not None and type(old) is type(new):  # pylint: disable=unidiomatic-typecheck
+        new._nodes = old._nodes  # pylint: disable=protected-access
+    return new
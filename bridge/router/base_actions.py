@@ -3,19 +3,22 @@ Class with robot actions
 """
 
 import math
-from time import time
+import time
 from typing import Optional
 
 import bridge.auxiliary.quickhull as qh
 from bridge import const
-from bridge.auxiliary import aux, fld, rbt, tau
+from bridge.auxiliary import aux, clock, fld, rbt, tau
 from bridge.auxiliary.entity import Entity
+from bridge.router import visibility
 from bridge.router.action import Action, ActionDomain, ActionValues, limit_action
 from bridge.strategy.strategy import GameStates
 from bridge.auxiliary import aux, fld, rbt  # type: ignore
 
 # Actions: ActionDomain -> ActionValues
 
+MIN_DT = 1e-6  # [s]
+
 
 class Actions:
     """Class with all user-available actions (except kicks)"""
@@ -32,7 +35,7 @@ class Actions:
     class GoToPointIgnore(Action):
         """Go to point ignore obstacles"""
 
-        def __init__(
+        def setup(
             self,
             target_pos: aux.Point,
             target_angle: float,
@@ -57,32 +60,34 @@ class Actions:
                 cur_robot.pos_reg_x.select_mode(tau.Mode.NORMAL)
                 cur_robot.pos_reg_y.select_mode(tau.Mode.NORMAL)
 
-            u_x = cur_robot.pos_reg_x.process_(vec_err.x, -cur_vel.x, time() - cur_robot.prev_sended_time)
-            u_y = cur_robot.pos_reg_y.process_(vec_err.y, -cur_vel.y, time() - cur_robot.prev_sended_time)
+            cur_time = clock.now()
+            dt = max(cur_time - cur_robot.prev_sended_time, MIN_DT)  # simulated clock may not move between ticks
+            u_x = cur_robot.pos_reg_x.process_(vec_err.x, -cur_vel.x, dt)
+            u_y = cur_robot.pos_reg_y.process_(vec_err.y, -cur_vel.y, dt)
             current_action.vel = aux.Point(u_x, u_y)
             # return
             cur_vel_abs = aux.rotate(current_action.vel, cur_robot.get_angle())
             prev_vel_abs = aux.rotate(cur_robot.prev_sended_vel, cur_robot.prev_sended_angle)
-            if (cur_vel_abs - prev_vel_abs).mag() / (time() - cur_robot.prev_sended_time) > const.MAX_ACCELERATION:
+            if (cur_vel_abs - prev_vel_abs).mag() / dt > const.MAX_ACCELERATION:
                 # domain.field.router_image.draw_circle(aux.Point(0, 1000), size_in_mms=200)
                 current_action.vel = aux.rotate(
-                    prev_vel_abs
-                    + (cur_vel_abs - prev_vel_abs).unity() * const.MAX_ACCELERATION * (time() - cur_robot.prev_sended_time),
+                    prev_vel_abs + (cur_vel_abs - prev_vel_abs).unity() * const.MAX_ACCELERATION * dt,
                     -cur_robot.get_angle(),
                 )
 
             # current_action.vel = aux.Point(0,500)
             cur_robot.prev_sended_vel = current_action.vel
             cur_robot.prev_sended_angle = cur_robot.get_angle()
-            cur_robot.prev_sended_time = time()
+            cur_robot.prev_sended_time = cur_time
             current_action.angle = self.target_angle
 
-            DumbActions.AddFinalVelocityAction(self.target_pos, self.target_vel).process(domain, current_action)
+            final_vel = self.node(0, DumbActions.AddFinalVelocityAction, self.target_pos, self.target_vel)
+            final_vel.process(domain, current_action)
 
     class GoToPoint(Action):
         """Go to point and avoid obstacles"""
 
-        def __init__(
+        def setup(
             self, target_pos: aux.Point, target_angle: float, ball_interact: bool = False, ignore_ball: bool = False
         ) -> None:
             self.target_pos = target_pos
@@ -104,10 +109,10 @@ class Actions:
 
                 if aux.is_point_inside_poly(domain.robot.get_pos(), domain.field.ally_goal.hull):
                     next_point = aux.nearest_point_on_poly(domain.robot.get_pos(), domain.field.ally_goal.big_hull)
-                    return [Actions.GoToPointIgnore(next_point, angle0)]
+                    return [self.node(0, Actions.GoToPointIgnore, next_point, angle0)]
                 elif aux.is_point_inside_poly(domain.robot.get_pos(), domain.field.enemy_goal.hull):
                     next_point = aux.nearest_point_on_poly(domain.robot.get_pos(), domain.field.enemy_goal.big_hull)
-                    return [Actions.GoToPointIgnore(next_point, angle0)]
+                    return [self.node(0, Actions.GoToPointIgnore, next_point, angle0)]
 
                 pint = aux.segment_poly_intersect(domain.robot.get_pos(), next_point, domain.field.ally_goal.hull)
                 if pint is not None:
@@ -124,15 +129,54 @@ class Actions:
             avoid_ball = domain.game_state in [GameStates.STOP, GameStates.PREPARE_KICKOFF] or not domain.we_active
             pth_wp = calc_passthrough_wp(domain, next_point, avoid_ball=avoid_ball, ignore_ball=self.ignore_ball)
             if pth_wp is not None:
-                return [Actions.GoToPointIgnore(pth_wp, angle0)]
+                return [self.node(0, Actions.GoToPointIgnore, pth_wp, angle0)]
             if next_point != self.target_pos:
-                return [Actions.GoToPointIgnore(next_point, angle0)]
-            return [Actions.GoToPointIgnore(self.target_pos, angle0, self.ball_interact)]
+                return [self.node(0, Actions.GoToPointIgnore, next_point, angle0)]
+            return [self.node(0, Actions.GoToPointIgnore, self.target_pos, angle0, self.ball_interact)]
+
+    class GoToPointPlanned(Action):
+        """Go to point along the shortest path around robots, ball and penalty areas (visibility graph)"""
+
+        def setup(
+            self, target_pos: aux.Point, target_angle: float, ball_interact: bool = False, ignore_ball: bool = False
+        ) -> None:
+            self.target_pos = target_pos
+            self.target_angle = target_angle
+            self.ball_interact = ball_interact
+            self.ignore_ball = ignore_ball
+
+        def use_behavior_of(self, domain: ActionDomain, current_action: ActionValues) -> list["Action"]:
+            field = domain.field
+            robot = domain.robot
+            target = self.target_pos
+            if not aux.is_point_inside_poly(target, field.hull):
+                target = aux.nearest_point_on_poly(target, field.hull)
+
+            if robot.r_id != field.gk_id:
+                for goal in (field.ally_goal, field.enemy_goal):
+                    if aux.is_point_inside_poly(target, goal.hull):
+                        target = aux.nearest_point_on_poly(target, goal.big_hull)
+                    if aux.is_point_inside_poly(robot.get_pos(), goal.hull):
+                        exit_point = aux.nearest_point_on_poly(robot.get_pos(), goal.big_hull)
+                        return [self.node(0, Actions.GoToPointIgnore, exit_point, self.target_angle)]
+
+            ball_radius: Optional[float] = None
+            if not self.ignore_ball:
+                avoid_ball = domain.game_state in [GameStates.STOP, GameStates.PREPARE_KICKOFF] or not domain.we_active
+                ball_radius = const.KEEP_BALL_DIST if avoid_ball else const.BALL_R + const.ROBOT_R
+
+            path = visibility.plan(field, robot, target, ball_radius)
+            if path is None or len(path[0]) <= 2:
+                return [self.node(0, Actions.GoToPointIgnore, target, self.target_angle, self.ball_interact)]
+            polyline = path[0]
+            for begin, end in zip(polyline, polyline[1:]):
+                field.path_image.draw_line(begin, end, color=(0, 0, 0))
+            return [self.node(0, Actions.GoToPointIgnore, polyline[1], self.target_angle)]
 
     class BallPlacement(Action):
         """Move ball to target_point"""
 
-        def __init__(self, target_point: aux.Point) -> None:
+        def setup(self, target_point: aux.Point) -> None:
             self.target_point = target_point
 
         def behavior(self, domain: ActionDomain, current_action: ActionValues) -> None:
@@ -146,13 +190,16 @@ class Actions:
                 current_action.angle = (self.target_point - domain.robot.get_pos()).arg()
                 return []
             if domain.field.is_ball_in(domain.robot):
-                return [Actions.GoToPointIgnore(self.target_point, target_angle), DumbActions.LimitSpeed(500)]
-            return [Actions.BallGrab(target_angle), DumbActions.LimitSpeed(700)]
+                return [
+                    self.node(0, Actions.GoToPointIgnore, self.target_point, target_angle),
+                    self.node(1, DumbActions.LimitSpeed, 500),
+                ]
+            return [self.node(0, Actions.BallGrab, target_angle), self.node(1, DumbActions.LimitSpeed, 700)]
 
     class BallGrab(Action):
         """Grab ball in a given direction"""
 
-        def __init__(self, target_angle: float) -> None:
+        def setup(self, target_angle: float) -> None:
             self.target_angle = target_angle
 
         def is_defined(self, domain: ActionDomain) -> bool:
@@ -184,12 +231,12 @@ class Actions:
         def use_behavior_of(self, domain: ActionDomain, current_action: ActionValues) -> list["Action"]:
             ball_pos = domain.field.ball.get_pos()
             align_pos = ball_pos - aux.rotate(aux.RIGHT, self.target_angle) * const.GRAB_ALIGN_DIST
-            return [Actions.GoToPoint(align_pos, self.target_angle, True)]
+            return [self.node(0, Actions.GoToPoint, align_pos, self.target_angle, True)]
 
     class Velocity(Action):
         """Move robot with velocity and angle_speed"""
 
-        def __init__(self, velocity: aux.Point, angle: float, control_angle_by_speed: bool = False) -> None:
+        def setup(self, velocity: aux.Point, angle: float, control_angle_by_speed: bool = False) -> None:
             self.velocity = velocity
             self.angle = angle  # angle to turn / angle speed
 
@@ -209,7 +256,7 @@ class Actions:
     class Kick(Action):
         """Choose type of kick (from KickActions)"""
 
-        def __init__(
+        def setup(
             self,
             target_pos: aux.Point,
             voltage: int = const.VOLTAGE_SHOOT,
@@ -219,7 +266,7 @@ class Actions:
             self.kick_args = (target_pos, voltage, is_pass, is_upper)
 
         def use_behavior_of(self, domain: ActionDomain, current_action: ActionValues) -> list["Action"]:
-            return [KickActions.Straight(*self.kick_args)]
+            return [self.node(0, KickActions.Straight, *self.kick_args)]
 
 
 class KickActions:
@@ -228,7 +275,7 @@ class KickActions:
     class Kick(Action):
         """Base class"""
 
-        def __init__(
+        def setup(
             self,
             target_pos: aux.Point,
             voltage: float = const.VOLTAGE_SHOOT,
@@ -250,9 +297,9 @@ class KickActions:
             kick_angle = (domain.field.allies[0].get_pos() - domain.field.allies[2].get_pos()).arg()
 
             actions = [
-                Actions.BallGrab(kick_angle),
-                DumbActions.ShootActionNeymar(kick_angle, self.is_upper),
-                DumbActions.ControlVoltageAction(domain.field.ball.get_pos(), self.voltage, self.pass_pos),
+                self.node(0, Actions.BallGrab, kick_angle),
+                self.node(1, DumbActions.ShootActionNeymar, kick_angle, self.is_upper),
+                self.node(2, DumbActions.ControlVoltageAction, domain.field.ball.get_pos(), self.voltage, self.pass_pos),
             ]
 
             return actions
@@ -264,9 +311,9 @@ class KickActions:
             kick_angle = aux.angle_to_point(domain.field.ball.get_pos(), self.target_pos)
 
             actions = [
-                Actions.BallGrab(kick_angle),
-                DumbActions.ShootAction(kick_angle, self.is_upper),
-                DumbActions.ControlVoltageAction(domain.field.ball.get_pos(), self.voltage, self.pass_pos),
+                self.node(0, Actions.BallGrab, kick_angle),
+                self.node(1, DumbActions.ShootAction, kick_angle, self.is_upper),
+                self.node(2, DumbActions.ControlVoltageAction, domain.field.ball.get_pos(), self.voltage, self.pass_pos),
             ]
 
             return actions
@@ -278,7 +325,7 @@ class DumbActions:
     class ShootAction(Action):
         """Shoot the target when kick is aligned"""
 
-        def __init__(self, target_angle: float, is_upper: bool = False, angle_bounds: Optional[float] = None) -> None:
+        def setup(self, target_angle: float, is_upper: bool = False, angle_bounds: Optional[float] = None) -> None:
             self.target_angle = target_angle
             self.autokick = 2 if is_upper else 1
             self.angle_bounds = angle_bounds
@@ -297,7 +344,7 @@ class DumbActions:
     class ShootActionNeymar(Action):
         """Shoot the target when kick is aligned"""
 
-        def __init__(self, target_angle: float, is_upper: bool = False, angle_bounds: Optional[float] = None) -> None:
+        def setup(self, target_angle: float, is_upper: bool = False, angle_bounds: Optional[float] = None) -> None:
             self.target_angle = target_angle
             self.autokick = 2 if is_upper else 1
             self.angle_bounds = angle_bounds
@@ -316,7 +363,7 @@ class DumbActions:
     class ControlVoltageAction(Action):
         """Control voltage before shooting"""
 
-        def __init__(
+        def setup(
             self, ball_pos: aux.Point, voltage: float = const.VOLTAGE_SHOOT, pass_pos: Optional[aux.Point] = None
         ) -> None:
             self.voltage = voltage
@@ -327,15 +374,16 @@ class DumbActions:
             return aux.dist(domain.robot.get_pos(), self.ball_pos) < 1000
 
         def behavior(self, domain: ActionDomain, current_action: ActionValues) -> None:
+            voltage = self.voltage
             if self.pass_pos is not None:
-                self.voltage = get_pass_voltage(aux.dist(domain.robot.get_pos(), self.pass_pos))
+                voltage = get_pass_voltage(aux.dist(domain.robot.get_pos(), self.pass_pos))
 
-            current_action.kicker_voltage = int(self.voltage)
+            current_action.kicker_voltage = int(voltage)
 
     class AddFinalVelocityAction(Action):
         """Add velocity in final target"""
 
-        def __init__(
+        def setup(
             self, target: aux.Point, final_velocity: aux.Point, max_dist: float = 1000, min_dist: float = 200
         ) -> None:
             self.target = target
@@ -357,7 +405,7 @@ class DumbActions:
     class LimitSpeed(Action):
         """Limit robot speed"""
 
-        def __init__(self, limit: float = const.MAX_SPEED) -> None:
+        def setup(self, limit: float = const.MAX_SPEED) -> None:
             self.limit = limit
 
         def behavior(self, domain: ActionDomain, current_action: ActionValues) -> None:
@@ -547,9 +595,9 @@ def calc_passthrough_wp(
         ):
             obstacles_dist.append((ball, aux.dist(ball.get_pos(), robot.get_pos())))
 
-    for obstacle in field.enemies + field.allies:
+    for obstacle in field.active_enemies(True) + field.active_allies(True):
         dist = (obstacle.get_pos() - robot.get_pos()).mag()
-        if obstacle.is_used() and obstacle.get_radius() + robot.get_radius() < dist < const.VIEW_DIST:
+        if obstacle.get_radius() + robot.get_radius() < dist < const.VIEW_DIST:
             obstacles_dist.append((obstacle.to_entity(), dist))
 
     sorted_obstacles = sorted(obstacles_dist, key=lambda x: x[1])
@@ -558,7 +606,10 @@ def calc_passthrough_wp(
     for obst in sorted_obstacles:
         obstacles.append(obst[0])
 
-    pth_point = calc_next_point(field, robot.get_pos(), target, domain.robot, obstacles)
+    if const.PATH_PLANNER == const.PathPlanner.BOUNDED:
+        pth_point = calc_next_point_bounded(field, robot.get_pos(), target, domain.robot, obstacles)
+    else:
+        pth_point = calc_next_point(field, robot.get_pos(), target, domain.robot, obstacles)
     if pth_point is None:
         return None
     field.path_image.draw_line(robot.get_pos(), pth_point[0], color=(0, 0, 0))
@@ -654,3 +705,132 @@ def calc_next_point(
 
     field.path_image.draw_line(position, target, color=(255, 0, 127))
     return target, aux.dist(position, target)
+
+
+def calc_next_point_bounded(
+    field: fld.Field,
+    position: aux.Point,
+    target: aux.Point,
+    robot: rbt.Robot,
+    obstacles: list[Entity],
+    max_nodes: int = const.PLANNER_MAX_NODES,
+    max_time: Optional[float] = const.PLANNER_MAX_TIME,
+) -> Optional[tuple[aux.Point, float]]:
+    """
+    Same as calc_next_point, but every sub-problem is solved once and their number is limited
+
+    Sub-problems of calc_next_point are paths between two points around a range of the obstacles
+    (the ones skipped before the blocking obstacle or remaining after it), so they are memoized by
+    (start, end, range). When max_nodes sub-problems are solved or max_time [s] has passed,
+    the rest are taken as straight lines with const.PLANNER_UNEXPLORED_PENALTY added to the length:
+    a path that was explored to the end is taken over any path through them, and the robot
+    is circled in red on path_image.
+    """
+    planner = BoundedPlanner(field, robot, obstacles, max_nodes, max_time)
+    result = planner.solve(position, target, 0, len(obstacles))
+    if planner.exhausted:
+        field.path_image.draw_circle(position, (255, 0, 0), const.ROBOT_R * 2)
+    return result
+
+
+class BoundedPlanner:
+    """Memoized calc_next_point over obstacles[lo:hi]"""
+
+    def __init__(
+        self,
+        field: fld.Field,
+        robot: rbt.Robot,
+        obstacles: list[Entity],
+        max_nodes: int,
+        max_time: Optional[float],
+    ) -> None:
+        self.field = field
+        self.robot = robot
+        self.obstacles = obstacles
+        self.max_nodes = max_nodes
+        self.deadline = time.perf_counter() + max_time if max_time is not None else math.inf
+        self.nodes = 0
+        self.exhausted = False  # the budget was hit, the result may differ from calc_next_point
+        self._memo: dict[tuple[float, float, float, float, int, int], Optional[tuple[aux.Point, float]]] = {}
+
+    def solve(self, position: aux.Point, target: aux.Point, lo: int, hi: int) -> Optional[tuple[aux.Point, float]]:
+        """Next point and length of the path from position to target around obstacles[lo:hi]"""
+        key = (position.x, position.y, target.x, target.y, lo, hi)
+        if key in self._memo:
+            return self._memo[key]
+        if self.nodes >= self.max_nodes or time.perf_counter() > self.deadline:
+            self.exhausted = True
+            return target, aux.dist(position, target) + const.PLANNER_UNEXPLORED_PENALTY
+        self.nodes += 1
+        result = self._solve(position, target, lo, hi)
+        self._memo[key] = result
+        return result
+
+    def _solve(self, position: aux.Point, target: aux.Point, lo: int, hi: int) -> Optional[tuple[aux.Point, float]]:
+        field = self.field
+        for idx in range(lo, hi):
+            obstacle = self.obstacles[idx]
+
+            time_to_reach = aux.dist(obstacle.get_pos(), position) / const.MAX_SPEED
+            center = obstacle.get_pos() + obstacle.get_vel() * time_to_reach
+            radius = (
+                obstacle.get_radius()
+                + const.ROBOT_R
+                + const.ROBOT_R * (self.robot.get_vel().mag() / const.MAX_SPEED) * 1
+                + time_to_reach * obstacle.get_vel().mag() * 0.5
+            )
+            field.path_image.draw_circle(
+                center,
+                (127, 127, 127),
+                radius,
+            )
+            if len(aux.line_circle_intersect(position, target, center, radius, "S")) > 0:
+                tangents = aux.get_tangent_points(center, position, radius)
+                if tangents is None or len(tangents) < 2:
+                    return None
+
+                tangents[0] = aux.point_on_line(center, tangents[0], radius + const.ROBOT_R * 0.5)
+                tangents[1] = aux.point_on_line(center, tangents[1], radius + const.ROBOT_R * 0.5)
+
+                path_before0 = self.solve(position, tangents[0], lo, idx)
+                path_before1 = self.solve(position, tangents[1], lo, idx)
+                path_after0 = self.solve(tangents[0], target, idx + 1, hi)
+                path_after1 = self.solve(tangents[1], target, idx + 1, hi)
+                return self._choose(position, path_before0, path_after0, path_before1, path_after1)
+
+        field.path_image.draw_line(position, target, color=(255, 0, 127))
+        return target, aux.dist(position, target)
+
+    def _choose(
+        self,
+        position: aux.Point,
+        path_before0: Optional[tuple[aux.Point, float]],
+        path_after0: Optional[tuple[aux.Point, float]],
+        path_before1: Optional[tuple[aux.Point, float]],
+        path_after1: Optional[tuple[aux.Point, float]],
+    ) -> Optional[tuple[aux.Point, float]]:
+        """Path around one of the tangents, the same choice as calc_next_point"""
+        field = self.field
+        if path_before0 is None or path_after0 is None:
+            if path_before1 is not None and path_after1 is not None:
+                return path_before1[0], path_before1[1] + path_after1[1]
+            return None
+        if path_before1 is None or path_after1 is None:
+            return path_before0[0], path_before0[1] + path_after0[1]
+
+        length0 = path_before0[1] + path_after0[1]
+        length1 = path_before1[1] + path_after1[1]
+        in_zone0 = aux.is_point_inside_poly(path_before0[0], field.ally_goal.big_hull) or aux.is_point_inside_poly(
+            path_before0[0], field.enemy_goal.big_hull
+        )
+        in_zone1 = aux.is_point_inside_poly(path_before1[0], field.ally_goal.big_hull) or aux.is_point_inside_poly(
+            path_before1[0], field.enemy_goal.big_hull
+        )
+
+        if (length0 < length1 or in_zone1) and not in_zone0:
+            field.path_image.draw_line(position, path_before0[0], color=(255, 0, 255))
+            return path_before0[0], length0
+        if (length1 < length0 or in_zone0) and not in_zone1:
+            field.path_image.draw_line(position, path_before1[0], color=(255, 0, 255))
+            return path_before1[0], length1
+        return None
@@ -0,0 +1,137 @@
+"""
+Профилирование дерева действий
+
+install() подменяет Action.process на версию, которая считает для каждого класса действия и робота
+число вызовов, полное (inclusive, с детьми) и собственное (exclusive) время. Пока профилировщик
+не установлен, Action.process - исходный метод, накладных расходов нет.
+
+Результат - таблица (table) или стеки в формате flamegraph.pl / speedscope (folded):
+"B3;Kick;GoToPoint;GoToPointIgnore 1234" - собственное время узла в микросекундах.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from bridge.router.action import Action, ActionDomain, ActionValues
+
+_ORIGINAL_PROCESS = Action.process
+
+
+class _Frame:
+    """Action being processed"""
+
+    __slots__ = ("path", "key", "children_time")
+
+    def __init__(self, path: tuple[str, ...], key: tuple[str, str]) -> None:
+        self.path = path
+        self.key = key
+        self.children_time = 0.0
+
+
+class _ThreadStats:
+    """Stats of one thread (robot_workers evaluate actions in parallel)"""
+
+    def __init__(self) -> None:
+        self.stack: list[_Frame] = []
+        self.active: dict[tuple[str, str], int] = {}  # frames of the key on the stack (recursion)
+        self.calls: dict[tuple[str, str], list[float]] = {}  # (action, robot) -> [calls, inclusive, exclusive]
+        self.stacks: dict[tuple[str, ...], float] = {}  # path -> exclusive
+
+
+class ActionProfiler:
+    """Time spent in Action.process by action classes and robots"""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._threads: list[_ThreadStats] = []
+        self._lock = threading.Lock()
+
+    def _stats(self) -> _ThreadStats:
+        stats: Optional[_ThreadStats] = getattr(self._local, "stats", None)
+        if stats is None:
+            stats = _ThreadStats()
+            self._local.stats = stats
+            with self._lock:
+                self._threads.append(stats)
+        return stats
+
+    def process(self, action: Action, domain: ActionDomain, current_action: ActionValues) -> None:
+        """Action.process of the action with its time accounted"""
+        stats = self._stats()
+        robot = f"{domain.robot.color.name[0]}{domain.robot.r_id}"
+        name = type(action).__name__
+        parent = stats.stack[-1] if stats.stack else None
+        frame = _Frame((parent.path if parent is not None else (robot,)) + (name,), (name, robot))
+        stats.stack.append(frame)
+        stats.active[frame.key] = stats.active.get(frame.key, 0) + 1
+
+        start = time.perf_counter()
+        try:
+            _ORIGINAL_PROCESS(action, domain, current_action)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.stack.pop()
+            stats.active[frame.key] -= 1
+            if parent is not None:
+                parent.children_time += elapsed
+
+            exclusive = elapsed - frame.children_time
+            record = stats.calls.setdefault(frame.key, [0, 0.0, 0.0])
+            record[0] += 1
+            if stats.active[frame.key] == 0:  # nested calls of the same action are already inside
+                record[1] += elapsed
+            record[2] += exclusive
+            stats.stacks[frame.path] = stats.stacks.get(frame.path, 0.0) + exclusive
+
+    def reset(self) -> None:
+        """Forget collected times"""
+        with self._lock:
+            for stats in self._threads:
+                stats.calls.clear()
+                stats.stacks.clear()
+
+    def totals(self) -> dict[tuple[str, str], list[float]]:
+        """(action, robot) -> [calls, inclusive, exclusive] of all threads"""
+        result: dict[tuple[str, str], list[float]] = {}
+        with self._lock:
+            for stats in self._threads:
+                for key, (calls, inclusive, exclusive) in list(stats.calls.items()):
+                    record = result.setdefault(key, [0, 0.0, 0.0])
+                    record[0] += calls
+                    record[1] += inclusive
+                    record[2] += exclusive
+        return result
+
+    def table(self) -> str:
+        """Actions sorted by exclusive time"""
+        rows = sorted(self.totals().items(), key=lambda item: -item[1][2])
+        message = f"{'action':24}{'robot':>6}{'calls':>8}{'incl, ms':>10}{'excl, ms':>10}{'excl/call, us':>15}\n"
+        for (name, robot), (calls, inclusive, exclusive) in rows:
+            message += (
+                f"{name:24}{robot:>6}{calls:>8.0f}{inclusive * 1e3:>10.2f}{exclusive * 1e3:>10.2f}"
+                f"{exclusive / calls * 1e6:>15.1f}\n"
+            )
+        return message
+
+    def folded(self) -> str:
+        """Folded stacks with exclusive time in microseconds"""
+        paths: dict[tuple[str, ...], float] = {}
+        with self._lock:
+            for stats in self._threads:
+                for path, exclusive in list(stats.stacks.items()):
+                    paths[path] = paths.get(path, 0.0) + exclusive
+        return "".join(f"{';'.join(path)} {round(exclusive * 1e6)}\n" for path, exclusive in sorted(paths.items()))
+
+
+def install(profiler: Optional[ActionProfiler]) -> None:
+    """Profile Action.process with the profiler, None - restore the original method"""
+    if profiler is None:
+        Action.process = _ORIGINAL_PROCESS  # type: ignore
+        return
+
+    def process(self: Action, domain: ActionDomain, current_action: ActionValues) -> None:
+        profiler.process(self, domain, current_action)
+
+    process.__doc__ = _ORIGINAL_PROCESS.__doc__
+    Action.process = process  # type: ignore
@@ -0,0 +1,240 @@
+"""
+Планировщик пути по графу видимости
+
+Препятствия - раздутые круги роботов (и мяча) и штрафные зоны (Goal.big_hull). Круг заменяется
+описанным правильным многоугольником, вершины многоугольников и big_hull внутри поля - вершины графа.
+Для каждого ребра хранится маска препятствий, которые его перекрывают (бит на препятствие),
+поэтому граф строится один раз на кадр для всей команды: каждый робот только исключает своё
+препятствие (и штрафную зону, если он вратарь) и ищет путь A*.
+
+Рёбра вершины считаются, когда A* впервые раскрывает её, и остаются для остальных роботов команды:
+полный граф (N^2 рёбер) на кадр не нужен, A* обычно раскрывает малую часть вершин.
+"""
+
+import heapq
+import math
+import threading
+import weakref
+from typing import Optional
+
+import numpy as np
+
+from bridge import const
+from bridge.auxiliary import aux, fld, rbt
+
+CIRCLE_VERTICES = 8
+MARGIN = 0.25 * const.ROBOT_R  # [mm] gap between the robot and an obstacle
+EPS = 1e-3  # [mm]
+ALL_BITS = (1 << 64) - 1
+
+
+class VisibilityGraph:
+    """Visibility graph of one frame for the robots of a team"""
+
+    def __init__(self, field: fld.Field, ball_radius: Optional[float] = None) -> None:
+        """ball_radius - distance to keep from the ball (robot center to ball center), None - ignore the ball"""
+        self.field = field
+        self.robot_bits: dict[tuple[const.Color, int], int] = {}
+
+        centers: list[tuple[float, float]] = []
+        radii: list[float] = []
+        for robot in field.active_allies(True) + field.active_enemies(True):
+            self.robot_bits[(robot.color, robot.r_id)] = 1 << len(centers)
+            centers.append((robot.get_pos().x, robot.get_pos().y))
+            radii.append(robot.get_radius() + const.ROBOT_R + MARGIN)
+        if ball_radius is not None:
+            centers.append((field.ball.get_pos().x, field.ball.get_pos().y))
+            radii.append(ball_radius + MARGIN)
+        self.centers = np.array(centers, dtype=float).reshape(-1, 2)
+        self.radii = np.array(radii, dtype=float)
+        self.circle_bits = np.exp2(np.arange(len(self.radii)))
+
+        self.polygons = [_ccw(field.ally_goal.big_hull), _ccw(field.enemy_goal.big_hull)]
+        self.polygon_boxes = [(polygon.min(axis=0) - EPS, polygon.max(axis=0) + EPS) for polygon in self.polygons]
+        self.ally_goal_bit = 1 << len(self.radii)
+        self.field_hull = _ccw(field.hull)
+
+        nodes = [self._circle_vertices(center, radius) for center, radius in zip(self.centers, self.radii)]
+        for goal in (field.ally_goal, field.enemy_goal):
+            nodes.append(np.array([(point.x, point.y) for point in goal.big_hull[1:]]))  # [0] - point behind the goal
+        self.nodes = np.concatenate(nodes)
+        self.nodes = self.nodes[np.all(_sides(self.field_hull, self.nodes) >= -EPS, axis=0)]
+
+        self.inside = self.contains(self.nodes)
+        self._edges: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+
+    @staticmethod
+    def _circle_vertices(center: np.ndarray, radius: float) -> np.ndarray:
+        """Vertices of the regular polygon around the circle"""
+        angles = np.arange(CIRCLE_VERTICES) * (2 * math.pi / CIRCLE_VERTICES)
+        outer = radius / math.cos(math.pi / CIRCLE_VERTICES) + EPS
+        return center + outer * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+
+    def blockers(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """Masks of obstacles that block segments start -> end ([..., 2] arrays, broadcast)"""
+        start, end = np.broadcast_arrays(start, end)
+        shape = start.shape[:-1]
+        start, end = start.reshape(-1, 2), end.reshape(-1, 2)
+
+        blocked = _segment_circles(start, end, self.centers, self.radii)
+        masks = (self.circle_bits @ blocked).astype(np.uint64)  # bits < 2^53 are exact in float
+        low, high = np.minimum(start, end), np.maximum(start, end)
+        for idx, (polygon, (box_low, box_high)) in enumerate(zip(self.polygons, self.polygon_boxes), len(self.radii)):
+            # a segment out of the bounding box of the convex polygon can't pass through it
+            near = np.flatnonzero((low <= box_high).all(axis=1) & (high >= box_low).all(axis=1))
+            if len(near) > 0:
+                masks[near] |= _segment_polygon(start[near], end[near], polygon).astype(np.uint64) << np.uint64(idx)
+        return masks.reshape(shape)
+
+    def edges(self, node: int) -> tuple[np.ndarray, np.ndarray]:
+        """Masks of obstacles that block edges from the node to every node and lengths of the edges"""
+        edges = self._edges.get(node)
+        if edges is None:  # robot_workers may compute it twice, the result is the same
+            # from the node with the lower index, so an edge has one mask in both directions
+            lower = (np.arange(len(self.nodes)) < node)[:, np.newaxis]
+            point = self.nodes[node]
+            masks = self.blockers(np.where(lower, self.nodes, point), np.where(lower, point, self.nodes))
+            diff = self.nodes - point
+            edges = masks, np.hypot(diff[:, 0], diff[:, 1])
+            self._edges[node] = edges
+        return edges
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """Masks of obstacles that contain points ([..., 2] array)"""
+        shape = points.shape[:-1]
+        points = points.reshape(-1, 2)
+        diff_x = points[:, 0] - self.centers[:, 0, np.newaxis]
+        diff_y = points[:, 1] - self.centers[:, 1, np.newaxis]
+        inside = diff_x * diff_x + diff_y * diff_y < ((self.radii - EPS) ** 2)[:, np.newaxis]
+        masks = (self.circle_bits @ inside).astype(np.uint64)
+        for idx, polygon in enumerate(self.polygons, len(self.radii)):
+            masks |= np.all(_sides(polygon, points) > EPS, axis=0).astype(np.uint64) << np.uint64(idx)
+        return masks.reshape(shape)
+
+    def plan(self, robot: rbt.Robot, target: aux.Point) -> Optional[tuple[list[aux.Point], float]]:
+        """
+        Shortest path of the robot to target: polyline from its position to target and its length
+
+        The robot's own obstacle, its penalty area (for the goalkeeper) and obstacles that contain
+        the robot or the target are not taken into account. None if there is no path.
+        """
+        start = np.array([robot.get_pos().x, robot.get_pos().y])
+        goal = np.array([target.x, target.y])
+        exclude = self.robot_bits.get((robot.color, robot.r_id), 0)
+        if robot.r_id == self.field.gk_id:
+            exclude |= self.ally_goal_bit
+        exclude |= int(self.contains(start)) | int(self.contains(goal))
+        keep = np.uint64(ALL_BITS & ~exclude)
+
+        if self.blockers(start, goal) & keep == 0:
+            return [robot.get_pos(), target], float(np.hypot(*(goal - start)))
+
+        usable = self.inside & keep == 0
+        from_start = usable & (self.blockers(start, self.nodes) & keep == 0)
+        to_goal = usable & (self.blockers(self.nodes, goal) & keep == 0)
+        goal_lengths = np.hypot(*(self.nodes - goal).T)
+
+        count = len(self.nodes)
+        cost = np.full(count, math.inf)
+        parent = np.full(count, -1)
+        closed = np.zeros(count, dtype=bool)
+        start_lengths = np.hypot(*(self.nodes - start).T)
+        cost[from_start] = start_lengths[from_start]
+        queue = [(cost[idx] + goal_lengths[idx], int(idx)) for idx in np.flatnonzero(from_start)]
+        heapq.heapify(queue)
+
+        best_cost, best_last = math.inf, -1
+        while queue:
+            estimate, node = heapq.heappop(queue)
+            if estimate >= best_cost:
+                break
+            if closed[node]:
+                continue
+            closed[node] = True
+            if to_goal[node] and cost[node] + goal_lengths[node] < best_cost:
+                best_cost, best_last = cost[node] + goal_lengths[node], node
+
+            masks, lengths = self.edges(node)
+            neighbours = usable & ~closed & (masks & keep == 0)
+            new_cost = cost[node] + lengths
+            better = np.flatnonzero(neighbours & (new_cost < cost))
+            cost[better] = new_cost[better]
+            parent[better] = node
+            for idx in better.tolist():
+                heapq.heappush(queue, (cost[idx] + goal_lengths[idx], idx))
+
+        if best_last < 0:
+            return None
+        path = [target]
+        node = best_last
+        while node >= 0:
+            path.append(aux.Point(*self.nodes[node]))
+            node = parent[node]
+        path.append(robot.get_pos())
+        return path[::-1], float(best_cost)
+
+
+_GRAPHS: "weakref.WeakKeyDictionary[fld.World, dict[tuple, VisibilityGraph]]" = weakref.WeakKeyDictionary()
+_GRAPHS_LOCK = threading.Lock()  # robot_workers plan robots of a team in parallel on views of one World
+
+
+def team_graph(field: fld.Field, ball_radius: Optional[float] = None) -> VisibilityGraph:
+    """Graph of the current frame for the team of the field, built once for all its robots"""
+    key = (field.ally_color, field.frame_id, ball_radius)
+    with _GRAPHS_LOCK:  # the other robots wait for the graph instead of building it too
+        graphs = _GRAPHS.setdefault(field.world, {})
+        graph = graphs.get(key)
+        if graph is None:
+            for old in [old for old in graphs if old[1] != field.frame_id]:
+                del graphs[old]
+            graph = VisibilityGraph(field, ball_radius)
+            graphs[key] = graph
+    return graph
+
+
+def plan(
+    field: fld.Field, robot: rbt.Robot, target: aux.Point, ball_radius: Optional[float] = None
+) -> Optional[tuple[list[aux.Point], float]]:
+    """Shortest path of the robot to target in this frame (see VisibilityGraph.plan)"""
+    return team_graph(field, ball_radius).plan(robot, target)
+
+
+def _ccw(polygon: list[aux.Point]) -> np.ndarray:
+    """Vertices of the convex polygon counterclockwise"""
+    points = np.array([(point.x, point.y) for point in polygon], dtype=float)
+    x, y = points[:, 0], points[:, 1]
+    area = np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y)
+    return points if area > 0 else points[::-1]
+
+
+def _sides(polygon: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Cross products of edges of the ccw polygon with points ([M, 2] -> [edges, M]), > 0 - inner side"""
+    edges = np.concatenate((polygon[1:], polygon[:1])) - polygon  # np.roll(polygon, -1, axis=0), without its overhead
+    rel_x = points[:, 0] - polygon[:, 0, np.newaxis]
+    rel_y = points[:, 1] - polygon[:, 1, np.newaxis]
+    return edges[:, 0, np.newaxis] * rel_y - edges[:, 1, np.newaxis] * rel_x
+
+
+def _segment_circles(start: np.ndarray, end: np.ndarray, centers: np.ndarray, radii: np.ndarray) -> np.ndarray:
+    """Segments ([M, 2]) that pass inside the circles ([circles, M], long inner axis is faster)"""
+    seg_x = end[:, 0] - start[:, 0]
+    seg_y = end[:, 1] - start[:, 1]
+    len2 = seg_x * seg_x + seg_y * seg_y
+    len2[len2 == 0] = 1
+    rel_x = centers[:, 0, np.newaxis] - start[:, 0]
+    rel_y = centers[:, 1, np.newaxis] - start[:, 1]
+    t = np.clip((rel_x * seg_x + rel_y * seg_y) / len2, 0, 1)
+    rel_x -= seg_x * t
+    rel_y -= seg_y * t
+    return rel_x * rel_x + rel_y * rel_y < ((radii - EPS) ** 2)[:, np.newaxis]
+
+
+def _segment_polygon(start: np.ndarray, end: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Segments ([M, 2]) that pass through the interior of the convex ccw polygon"""
+    by_edge = ((_sides(polygon, start) <= EPS) & (_sides(polygon, end) <= EPS)).any(axis=0)
+
+    seg_x = end[:, 0] - start[:, 0]
+    seg_y = end[:, 1] - start[:, 1]
+    cross = seg_x * (polygon[:, 1, np.newaxis] - start[:, 1]) - seg_y * (polygon[:, 0, np.newaxis] - start[:, 0])
+    by_line = (cross >= -EPS).all(axis=0) | (cross <= EPS).all(axis=0)
+    return ~(by_edge | by_line)
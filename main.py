@@ -2,29 +2,77 @@
 Точка входа в стратегию
 """
 
-from strategy_bridge.runner import Runner
-
 from bridge import const
+from bridge.auxiliary import clock
 from bridge.processors.drawing_processor import Drawer
 from bridge.processors.field_creator import FieldCreator
 from bridge.processors.python_controller import SSLController
 from bridge.processors.router_processor import CommandSink
+from bridge.processors.topology import ProcessGroup, TopologyRunner
 
 if __name__ == "__main__":
     # config.init_logging("./logs")
 
+    # WallClock - real time, ReplayClock - time of the replayed log (taken from the received fields)
+    clock.set_clock(clock.WallClock())
+
     PROCESSORS = [
         FieldCreator(
             debug_mode=True,  # True => ignore commands from referee
             debug_game_state=const.State.RUN,  # for other states (except STOP and HALT) add "debug_active_team" param
             # debug_active_team=const.Color.ALL,
+            # record_path="match.ssllog",  # save vision and referee packets
+            # replay_path="match.ssllog",  # replay saved packets instead of ZMQ
+            # replay_speed=0,  # 1 - real time, N - N times faster, 0 - as fast as possible
+            # blocking_receive=True,  # wake up only when vision or referee packets arrive
+            # field_shm=const.FIELD_SHM_NAME,  # share the field through shared memory (set it for all processors)
         ),
         SSLController(
             ally_color=const.COLOR,
+            # field_shm=const.FIELD_SHM_NAME,
+        ),
+        Drawer(
+            # wake_on_write=True,  # redraw only when a new field arrives
+        ),
+        CommandSink(
+            # wake_on_write=True,  # send commands as soon as a new field or command arrives
+            # robot_workers=4,  # evaluate actions of robots in parallel threads
+            # colors=(const.Color.BLUE, const.Color.YELLOW),  # teams to route, default - ours (both in SELF_PLAY)
+            # command_format="binary",  # packed commands (command_codec) instead of JSON, needs a receiver that decodes them
+            # send_changed_only=True,  # send only robots whose command changed, all of them every keepalive_period
+            # max_acceleration=4000,  # [mm/s^2] limit change of commanded velocities of the team between ticks
+            # team_controller=True,  # velocity filters and angle regulators of the team in arrays (rbt.TeamController)
+            # missed_ticks=None,  # keep the last command of a robot forever (default: stop after 10 strategy ticks)
+            # profile_actions=True,  # time of actions by classes and robots in the telemetry console
+            # profile_stacks_path="actions.folded",  # the same as flame graph stacks (flamegraph.pl), written at exit
+            # record_path="router.log",  # inputs of the router for python -m bench.router_bench run router.log
+            # capture_clock_synced=True,  # SSL-Vision runs on this host, add t_capture -> received to COMMAND LATENCY
         ),
-        Drawer(),
-        CommandSink(),
     ]
 
-    RUNNER = Runner(processors=PROCESSORS)
+    FIELD_CREATOR, CONTROLLER, DRAWER, SINK = PROCESSORS
+
+    # one process per group; cpus - cores for the group (e.g. {0}, {1}, {2}, {3} on the 4-core field PC),
+    # nice < 0 needs root or CAP_SYS_NICE
+    RUNNER = TopologyRunner(
+        groups=[
+            ProcessGroup("vision", [FIELD_CREATOR]),
+            ProcessGroup("strategy", [CONTROLLER]),
+            ProcessGroup("router", [SINK]),
+            ProcessGroup("drawer", [DRAWER], nice=10),
+        ],
+        # report_period=10.0,  # log CPU usage of every processor
+    )
+
+    # all processors in one process with one scheduler (set async_receive=True for FieldCreator):
+    # from bridge.processors.async_runner import AsyncRunner, Stage
+    # RUNNER = AsyncRunner(
+    #     stages=[
+    #         Stage("vision", FIELD_CREATOR, priority=0, period=0.05),
+    #         Stage("router", SINK, priority=1, triggers=[const.FIELD_TOPIC, const.CONTROL_TOPIC], period=0.05),
+    #         Stage("strategy", CONTROLLER, priority=2, triggers=[const.FIELD_TOPIC], in_executor=True),
+    #         Stage("drawer", DRAWER, priority=3, period=1 / 60, in_executor=True),
+    #     ]
+    # )
+
     RUNNER.run()
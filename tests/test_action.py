@@ -0,0 +1,77 @@
+"""
+Tests of action trees kept between ticks
+"""
+
+from typing import Any, Optional
+
+import pytest
+
+from bench import sample
+from bridge import const
+from bridge.auxiliary import aux
+from bridge.processors import (  # noqa: F401  # pylint: disable=unused-import
+    python_controller,
+)
+from bridge.router import action as act
+from bridge.router.base_actions import Actions, KickActions
+
+
+def _tree(action: act.Action) -> list[act.Action]:
+    """The action and all its children made with node()"""
+    nodes = [action]
+    for child in (action._nodes or {}).values():  # pylint: disable=protected-access
+        nodes.extend(_tree(child))
+    return nodes
+
+
+def test_reissued_tree_keeps_its_nodes(monkeypatch: pytest.MonkeyPatch) -> None:
+    field = sample.make_field(robots_per_team=3)
+    robot = field.allies[1]
+    field.ball.set_state(robot.get_pos() + aux.Point(400, 0), aux.Point(0, 0), 0, 0, field.last_update)
+
+    def tick(kept: Optional[act.Action], target: aux.Point) -> act.Action:
+        action = act.update_action(kept, Actions.Kick(target))
+        assert action is not None
+        domain = act.ActionDomain(field, const.State.RUN, True, robot)
+        action.process(domain, act.ActionValues())
+        return action
+
+    kept = tick(None, aux.Point(2000, 0))
+    nodes = _tree(kept)[1:]
+    assert len(nodes) >= 5  # Kick -> Straight -> BallGrab, ShootAction, ControlVoltageAction, ...
+
+    created: list[type] = []
+    init = act.Action.__init__
+
+    def counting_init(self: act.Action, *args: Any, **kwargs: Any) -> None:
+        created.append(type(self))
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(act.Action, "__init__", counting_init)
+    kept = tick(kept, aux.Point(2000, 500))
+    assert _tree(kept)[1:] == nodes
+    assert all(new is old for new, old in zip(_tree(kept)[1:], nodes))
+    assert created == [Actions.Kick]  # only the new command of the strategy
+    straight = nodes[0]
+    assert isinstance(straight, KickActions.Straight)
+    assert straight.target_pos == aux.Point(2000, 500)
+
+
+def test_other_type_rebuilds_the_subtree() -> None:
+    parent = Actions.Stop()
+    first = parent.node(0, Actions.GoToPointIgnore, aux.Point(0, 0), 0.0)
+    assert parent.node(0, Actions.GoToPointIgnore, aux.Point(100, 0), 1.0) is first
+    assert first.target_pos == aux.Point(100, 0) and first.target_angle == 1.0
+    assert not first.ball_interact
+
+    second = parent.node(0, Actions.Velocity, aux.Point(0, 0), 0.0)
+    assert isinstance(second, Actions.Velocity)
+    assert parent.node(0, Actions.GoToPointIgnore, aux.Point(0, 0), 0.0) is not first
+
+
+def test_actions_are_set_up_in_setup() -> None:
+    with pytest.raises(TypeError):
+
+        class _Bad(act.Action):  # pylint: disable=unused-variable
+            def __init__(self) -> None:  # pylint: disable=super-init-not-called
+                self.x = 1
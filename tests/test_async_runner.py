@@ -0,0 +1,21 @@
+"""
+Tests of the asyncio runner
+"""
+
+from strategy_bridge.bus import DataReader, DataWriter
+
+from bridge.auxiliary import aux
+from bridge.processors.async_runner import LocalDataBus
+
+
+def test_readers_get_own_copies() -> None:
+    data_bus = LocalDataBus()
+    writer = DataWriter(data_bus, "topic", 2)
+    points = [aux.Point(1, 2)]
+    writer.write(points)
+    points.append(aux.Point(3, 4))  # e.g. images cleared right after they were written
+
+    first = DataReader(data_bus, "topic").read_new()
+    second = DataReader(data_bus, "topic").read_new()
+    assert [record.content for record in first] == [[aux.Point(1, 2)]]
+    assert first[0].content is not second[0].content
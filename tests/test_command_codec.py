@@ -0,0 +1,73 @@
+"""
+Tests of the binary team command format
+"""
+
+import numpy as np
+import pytest
+import zmq
+
+from bridge.auxiliary import command_codec
+from bridge.auxiliary.command_codec import DecoderCommand, DecoderTeamCommand
+
+
+def make_team(count: int, isteamyellow: bool = True) -> DecoderTeamCommand:
+    commands = [
+        DecoderCommand(
+            robot_id=r_id,
+            kick_up=r_id % 2 == 0,
+            kick_forward=r_id % 3 == 0,
+            auto_kick_up=r_id % 4 == 1,
+            auto_kick_forward=r_id % 5 == 2,
+            kicker_setting=r_id,
+            dribbler_setting=15 - r_id,
+            forward_vel=1.5 * r_id - 3.25,
+            left_vel=-0.125 * r_id,
+            angular_vel=0.5 * r_id if r_id % 2 else None,
+            angle=None if r_id % 2 else -0.25 * r_id,
+        )
+        for r_id in range(count)
+    ]
+    return DecoderTeamCommand(robot_commands=commands, isteamyellow=isteamyellow)
+
+
+@pytest.mark.parametrize("count", [0, 1, 6, 16])
+def test_round_trip(count: int) -> None:
+    team = make_team(count)
+    message = command_codec.encode(team)
+    assert len(message) == command_codec.message_size(count)
+    assert command_codec.decode(bytes(message)) == team
+
+
+def test_reused_record_keeps_only_new_commands() -> None:
+    record = np.zeros(1, dtype=command_codec.TEAM_DTYPE)
+    command_codec.encode(make_team(6), record)
+    team = make_team(2, isteamyellow=False)
+    assert command_codec.decode(bytes(command_codec.encode(team, record))) == team
+
+
+def test_rejects_other_messages() -> None:
+    with pytest.raises(ValueError):
+        command_codec.decode(b'{"control": "actuate_robot"}')
+    message = bytearray(command_codec.encode(make_team(1)))
+    message[1] = command_codec.FORMAT_VERSION + 1
+    with pytest.raises(ValueError):
+        command_codec.decode(message)
+
+
+def test_sender_round_trip() -> None:
+    context = zmq.Context()
+    receiver = context.socket(zmq.PAIR)
+    receiver.bind("inproc://test_command_codec")
+    sender_socket = context.socket(zmq.PAIR)
+    sender_socket.connect("inproc://test_command_codec")
+    sender = command_codec.CommandSender()
+    teams = [make_team(count) for count in (3, 16, 1)]
+    try:
+        for team in teams:
+            assert sender.send(sender_socket, team) == command_codec.message_size(len(team.robot_commands))
+        for team in teams:
+            assert command_codec.decode(receiver.recv()) == team
+    finally:
+        sender_socket.close(linger=0)
+        receiver.close(linger=0)
+        context.term()
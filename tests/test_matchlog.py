@@ -0,0 +1,59 @@
+"""
+Tests of the binary match log
+"""
+
+import pathlib
+
+from bridge.auxiliary import matchlog
+
+
+def test_replay_written_log(tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / "match.ssllog")
+    writer = matchlog.LogWriter(path)
+    writer.write(matchlog.Channel.VISION, b"frame 1", t=10.0)
+    writer.write(matchlog.Channel.REFEREE, b"stop", t=10.5)
+    writer.write(matchlog.Channel.VISION, b"frame 2", t=11.0)
+    writer.close()
+
+    reader = matchlog.LogReader(path)
+    assert len(reader) == 3
+    assert reader.duration() == 1.0
+    assert bytes(reader.payload(2)) == b"frame 2"
+
+    source = matchlog.ReplaySource(reader, speed=0)
+    messages: list[tuple[matchlog.Channel, bytes]] = []
+    for _ in range(4):  # a batch per vision frame and the calls that find it drained
+        for channel in matchlog.Channel:
+            message = source.receiver(channel).next_message()
+            if message is not None:
+                messages.append((channel, message))
+    assert source.is_finished()
+    assert messages == [
+        (matchlog.Channel.VISION, b"frame 1"),
+        (matchlog.Channel.VISION, b"frame 2"),
+        (matchlog.Channel.REFEREE, b"stop"),
+    ]
+
+
+def test_empty_log(tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / "match.ssllog")
+    matchlog.LogWriter(path)  # opened, never written, never flushed
+    for _ in range(2):
+        reader = matchlog.LogReader(path)
+        assert len(reader) == 0
+        assert reader.duration() == 0.0
+        assert matchlog.ReplaySource(reader, speed=0).is_finished()
+        matchlog.LogWriter(path).close()  # only MAGIC in the data, empty index
+
+
+def test_index_rebuilt_without_idx(tmp_path: pathlib.Path) -> None:
+    path = str(tmp_path / "match.ssllog")
+    writer = matchlog.LogWriter(path)
+    writer.write(matchlog.Channel.VISION, b"frame", t=1.0)
+    writer.close()
+    with open(path + ".idx", "r+b") as index:
+        index.truncate(matchlog.INDEX_DTYPE.itemsize - 1)
+
+    reader = matchlog.LogReader(path)
+    assert len(reader) == 1
+    assert bytes(reader.payload(0)) == b"frame"
@@ -0,0 +1,62 @@
+"""
+Tests of the bounded path planner against calc_next_point
+"""
+
+import random
+from typing import Optional
+
+from bench import sample
+from bridge import const
+from bridge.auxiliary import aux, entity, fld
+from bridge.processors import (  # noqa: F401  # pylint: disable=unused-import
+    python_controller,
+)
+from bridge.router import base_actions
+
+Path = Optional[tuple[aux.Point, float]]
+
+
+def _as_tuple(path: Path) -> Optional[tuple[float, float, float]]:
+    return None if path is None else (path[0].x, path[0].y, path[1])
+
+
+def _plan(field: fld.Field, obstacles: list[entity.Entity], target: aux.Point, max_nodes: int) -> tuple[Path, bool]:
+    planner = base_actions.BoundedPlanner(field, field.allies[0], obstacles, max_nodes, None)
+    return planner.solve(aux.Point(0, 0), target, 0, len(obstacles)), planner.exhausted
+
+
+def test_bounded_equals_recursive() -> None:
+    rnd = random.Random(7)
+    field = sample.make_field(robots_per_team=3)
+    for _ in range(200):
+        obstacles = [
+            entity.Entity(aux.Point(rnd.uniform(200, 2500), rnd.uniform(-800, 800)), 0, const.ROBOT_R)
+            for _ in range(rnd.randint(1, 8))
+        ]
+        obstacles.sort(key=lambda obstacle: obstacle.get_pos().mag())
+        target = aux.Point(rnd.uniform(2000, 3000), rnd.uniform(-1000, 1000))
+
+        bounded, exhausted = _plan(field, obstacles, target, max_nodes=10**6)
+        assert not exhausted
+        expected = base_actions.calc_next_point(field, aux.Point(0, 0), target, field.allies[0], obstacles)
+        assert _as_tuple(bounded) == _as_tuple(expected)
+
+
+def test_budget_prefers_explored_paths() -> None:
+    field = sample.make_field(robots_per_team=3)
+    # the way below the first obstacle is shorter, but the second one blocks it after the tangent
+    obstacles = [
+        entity.Entity(aux.Point(1000, 50), 0, const.ROBOT_R),
+        entity.Entity(aux.Point(2000, -250), 0, const.ROBOT_R),
+    ]
+    target = aux.Point(3000, 0)
+    expected = _as_tuple(base_actions.calc_next_point(field, aux.Point(0, 0), target, field.allies[0], obstacles))
+
+    explored = 0
+    for max_nodes in range(1, 20):
+        path, exhausted = _plan(field, obstacles, target, max_nodes)
+        assert path is not None
+        if path[1] < const.PLANNER_UNEXPLORED_PENALTY:  # the path does not go through cut sub-problems
+            assert _as_tuple(path) == expected
+            explored += exhausted
+    assert explored > 0  # some budgets were hit after the way around was explored
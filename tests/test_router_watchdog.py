@@ -0,0 +1,79 @@
+"""
+Tests of expiry of commands in the router
+"""
+
+import pytest
+
+from bench import sample
+from bridge import const
+from bridge.auxiliary import aux, clock
+from bridge.processors import python_controller
+from bridge.processors.router_processor import TeamRouter
+from bridge.router.base_actions import Actions
+
+R_ID = 1
+
+
+@pytest.fixture(name="sim_clock")
+def fixture_sim_clock(monkeypatch: pytest.MonkeyPatch) -> clock.SimClock:
+    sim_clock = clock.SimClock(100.0)
+    monkeypatch.setattr(clock, "_CLOCK", sim_clock)
+    return sim_clock
+
+
+def _command() -> python_controller.RobotCommand:
+    return python_controller.RobotCommand(R_ID, const.COLOR, Actions.GoToPoint(aux.Point(1000, 0), 0))
+
+
+def test_command_expires(sim_clock: clock.SimClock) -> None:
+    router = TeamRouter({const.COLOR: sample.make_field(robots_per_team=3)}, strategy_period=0.02, missed_ticks=10)
+    router.update_command(_command())
+
+    sim_clock.advance(0.19)
+    router.expire_commands(const.COLOR)
+    assert isinstance(router.actions[const.COLOR][R_ID], Actions.GoToPoint)
+    assert router.stale_commands == 0
+
+    sim_clock.advance(0.02)
+    router.expire_commands(const.COLOR)
+    assert isinstance(router.actions[const.COLOR][R_ID], Actions.Stop)
+    assert router.stale_commands == 1
+
+    router.expire_commands(const.COLOR)  # the stop never expires
+    assert router.stale_commands == 1
+
+
+def test_deadline_follows_command_period(sim_clock: clock.SimClock) -> None:
+    router = TeamRouter({const.COLOR: sample.make_field(robots_per_team=3)}, strategy_period=0.02, missed_ticks=10)
+    for _ in range(100):  # the strategy is 3 times slower than strategy_period
+        router.update_command(_command())
+        sim_clock.advance(0.06)
+    assert router.command_period(const.COLOR) == pytest.approx(0.06, rel=0.01)
+
+    router.update_command(_command())
+    sim_clock.advance(0.5)  # a command of the slow strategy lives 10 of its ticks
+    router.expire_commands(const.COLOR)
+    assert router.stale_commands == 0
+    sim_clock.advance(0.11)
+    router.expire_commands(const.COLOR)
+    assert router.stale_commands == 1
+
+
+def test_period_ignores_stalls_and_bursts(sim_clock: clock.SimClock) -> None:
+    router = TeamRouter({const.COLOR: sample.make_field(robots_per_team=3)}, strategy_period=0.02, missed_ticks=10)
+    router.update_command(_command())
+    sim_clock.advance(5.0)  # the strategy stalled, the interval is not its period
+    router.update_command(_command())
+    assert router.command_periods[const.COLOR] == 0.02
+
+    for _ in range(100):  # commands of several ticks read at once
+        router.update_command(_command())
+    assert router.command_period(const.COLOR) == 0.02
+
+
+def test_commands_never_expire(sim_clock: clock.SimClock) -> None:
+    router = TeamRouter({const.COLOR: sample.make_field(robots_per_team=3)}, missed_ticks=None)
+    router.update_command(_command())
+    sim_clock.advance(1e6)
+    router.expire_commands(const.COLOR)
+    assert router.stale_commands == 0
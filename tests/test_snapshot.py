@@ -0,0 +1,99 @@
+"""
+Tests of the shared-memory field snapshot
+"""
+
+import os
+from typing import Iterator
+
+import numpy as np
+import pytest
+
+from bench import sample
+from bridge import const
+from bridge.auxiliary import aux, fld, snapshot
+
+
+@pytest.fixture(name="writer")
+def fixture_writer() -> Iterator[snapshot.SnapshotWriter]:
+    writer = snapshot.SnapshotWriter(f"test_snapshot_{os.getpid()}")
+    yield writer
+    writer.close()
+
+
+def test_read_published_field(writer: snapshot.SnapshotWriter) -> None:
+    field = sample.make_field(robots_per_team=3)
+    writer.write(field)
+
+    reader = snapshot.SnapshotReader(writer.shm.name)
+    copy = fld.Field(const.COLOR)
+    assert reader.read_into(copy)
+    assert copy.frame_id == field.frame_id
+    assert copy.b_team[1].get_pos() == field.b_team[1].get_pos()
+    assert not reader.read_into(copy)
+    reader.close()
+
+
+class _OverwritingSlots:
+    """Slots of the reader that let the writer reuse the slot while it is being read"""
+
+    def __init__(self, records: list[np.ndarray], writer: snapshot.SnapshotWriter, field: fld.Field) -> None:
+        self.records = records
+        self.writer = writer
+        self.field = field
+
+    def __getitem__(self, slot: int) -> np.ndarray:
+        for _ in range(2):  # version + 2 goes to the same slot
+            self.field.frame_id += 1
+            self.field.b_team[0].set_state(aux.Point(self.field.frame_id, 0), aux.Point(0, 0), 0, 0, 0)
+            self.writer.write(self.field)
+        return self.records[slot]
+
+
+def test_torn_read_is_not_applied(writer: snapshot.SnapshotWriter) -> None:
+    field = sample.make_field(robots_per_team=3)
+    writer.write(field)
+
+    reader = snapshot.SnapshotReader(writer.shm.name)
+    assert reader.latest_version() == 1
+    slots = _OverwritingSlots(reader._records, writer, field)  # pylint: disable=protected-access
+    reader._records = slots  # type: ignore  # pylint: disable=protected-access
+
+    copy = fld.Field(const.COLOR)
+    pos = copy.b_team[0].get_pos()
+    assert not reader.read_into(copy)
+    assert copy.frame_id == 0
+    assert copy.b_team[0].get_pos() == pos
+    assert not copy.b_team[0].is_used()
+    assert reader.version == 0
+    reader.close()
+
+
+def test_reader_follows_recreated_segment() -> None:
+    name = f"test_snapshot_recreated_{os.getpid()}"
+    crashed = snapshot.SnapshotWriter(name)
+    old_field = sample.make_field(robots_per_team=3)
+    for _ in range(3):
+        crashed.write(old_field)
+
+    reader = snapshot.SnapshotReader(name)
+    copy = fld.Field(const.COLOR)
+    assert reader.read_into(copy)
+    assert copy.frame_id == old_field.frame_id
+
+    writer = snapshot.SnapshotWriter(name)  # the next run replaces the segment left by the crashed one
+    crashed.shm.close()
+    try:
+        assert not reader.read_into(copy)
+        new_field = sample.make_field(robots_per_team=3)
+        new_field.frame_id = old_field.frame_id
+        new_field.ball.version = old_field.ball.version
+        new_field.ball.set_state(aux.Point(123, 456), aux.Point(0, 0), 0, 0, 0)
+        new_field.ball.version = old_field.ball.version  # same stamp, but another run
+        writer.write(new_field)
+
+        assert reader.read_into(copy)
+        assert reader.version == 1
+        assert copy.ball.get_pos() == aux.Point(123, 456)
+    finally:
+        reader.close()
+        writer.close()
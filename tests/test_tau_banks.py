@@ -0,0 +1,92 @@
+"""
+Tests of the banks of regulators against the single regulators
+"""
+
+import numpy as np
+import pytest
+
+from bridge import const
+from bridge.auxiliary import aux, rbt, tau
+
+SIZE = 4
+TICKS = 200
+
+
+def _inputs(seed: int, count: int) -> np.ndarray:
+    return np.random.default_rng(seed).uniform(-5, 5, (TICKS, count, SIZE))
+
+
+def test_folp_bank_equals_folp() -> None:
+    bank = tau.FOLPBank(0.1, const.Ts, SIZE)
+    singles = [tau.FOLP(0.1, const.Ts) for _ in range(SIZE)]
+    for (x,) in _inputs(0, 1):
+        out = bank.process(x).tolist()
+        assert out == [single.process(float(x_i)) for single, x_i in zip(singles, x)]
+
+
+def test_folp_bank_process_dt() -> None:
+    bank = tau.FOLPBank(0.1, const.Ts, SIZE)
+    singles = [tau.FOLP(0.1, const.Ts) for _ in range(SIZE)]
+    for x, d_t in _inputs(1, 2):
+        d_t = np.abs(d_t) * const.Ts
+        out = bank.process_(x, d_t).tolist()
+        # np.power may differ from math.pow in the last bit
+        assert out == pytest.approx([single.process_(float(a), float(b)) for single, a, b in zip(singles, x, d_t)])
+
+
+@pytest.mark.parametrize("is_angle", [False, True])
+def test_fod_bank_equals_fod(is_angle: bool) -> None:
+    bank = tau.FODBank(0.15, const.Ts, SIZE, is_angle)
+    singles = [tau.FOD(0.15, const.Ts, is_angle) for _ in range(SIZE)]
+    for (x,) in _inputs(2, 1):
+        out = bank.process(x).tolist()
+        assert out == [single.process(float(x_i)) for single, x_i in zip(singles, x)]
+
+
+def test_pisd_bank_equals_pisd() -> None:
+    gains = rbt.angle_reg_gains()
+    bank = tau.PISDBank(const.Ts, *gains, size=SIZE)
+    singles = [tau.PISD(const.Ts, *gains) for _ in range(SIZE)]
+    for tick, (xerr, x_i, d_t) in enumerate(_inputs(3, 3)):
+        if tick % 50 == 25:
+            mode = tau.Mode.SOFT if tick % 100 == 25 else tau.Mode.NORMAL
+            bank.select_mode(mode, 1)
+            singles[1].select_mode(mode)
+        if tick % 2:
+            out = bank.process(xerr, x_i).tolist()
+            expected = [single.process(float(a), float(b)) for single, a, b in zip(singles, xerr, x_i)]
+        else:
+            d_t = np.abs(d_t) * const.Ts
+            out = bank.process_(xerr, x_i, d_t).tolist()
+            expected = [single.process_(float(a), float(b), float(c)) for single, a, b, c in zip(singles, xerr, x_i, d_t)]
+        assert out == expected
+
+
+def test_channel_equals_single() -> None:
+    bank = tau.PISDBank(const.Ts, *rbt.pos_reg_gains(), size=SIZE)
+    channel = tau.Channel(bank, 2)
+    single = tau.PISD(const.Ts, *rbt.pos_reg_gains())
+    for xerr, x_i, d_t in _inputs(4, 3)[:, :, 0]:
+        assert channel.process_(xerr, x_i, d_t * const.Ts) == single.process_(xerr, x_i, d_t * const.Ts)
+        assert channel.get_val() == single.get_val()
+    assert bank.get_val()[[0, 1, 3]].tolist() == [0.0, 0.0, 0.0]
+
+
+def test_team_controller_equals_robot_regulators() -> None:
+    robots = [rbt.Robot(aux.Point(0, 0), 0, const.ROBOT_R, const.Color.BLUE, r_id) for r_id in range(SIZE)]
+    controller = rbt.TeamController(SIZE)
+    bound = [rbt.Robot(aux.Point(0, 0), 0, const.ROBOT_R, const.Color.BLUE, r_id) for r_id in range(SIZE)]
+    controller.bind(bound)
+    assert isinstance(bound[0].angle_reg, tau.Channel) and isinstance(bound[0].pos_reg_x, tau.PISD)
+
+    regulated = np.array([True, False, True, True])
+    for vel_x, vel_y, aerr, anglevel in _inputs(5, 4):
+        filtered_x, filtered_y = controller.filter_vel(np.stack([vel_x, vel_y], axis=1), regulated)
+        ang_vel = controller.regulate_angle(aerr, anglevel, regulated)
+        for robot in robots:
+            if regulated[robot.r_id]:
+                assert filtered_x[robot.r_id] == robot.xx_flp.process(float(vel_x[robot.r_id]))
+                assert filtered_y[robot.r_id] == robot.yy_flp.process(float(vel_y[robot.r_id]))
+                expected = robot.angle_reg.process(float(aerr[robot.r_id]), -float(anglevel[robot.r_id]))
+                assert ang_vel[robot.r_id] == expected
+    assert filtered_x[1] == filtered_y[1] == ang_vel[1] == 0.0
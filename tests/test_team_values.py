@@ -0,0 +1,83 @@
+"""
+Tests of team-wide action values against the per-robot code they replace
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from bridge import const
+from bridge.auxiliary import aux, rbt
+from bridge.processors import (  # noqa: F401  # pylint: disable=unused-import
+    python_controller,
+)
+from bridge.router import action as act
+
+ROBOTS = const.TEAM_ROBOTS_MAX_COUNT
+
+
+@pytest.fixture(name="rng")
+def fixture_rng() -> np.random.Generator:
+    return np.random.default_rng(2024)
+
+
+def random_team(rng: np.random.Generator, scale: float) -> tuple[act.TeamActionValues, list[act.ActionValues]]:
+    """Team values and the same values of every robot"""
+    team = act.TeamActionValues()
+    values = []
+    for r_id in range(ROBOTS):
+        robot_values = act.ActionValues()
+        robot_values.vel = aux.Point(*(rng.normal(size=2) * scale).tolist())
+        robot_values.angle = float(rng.uniform(-math.pi, math.pi))
+        values.append(robot_values)
+        if rng.random() < 0.8:
+            team.store(r_id, robot_values)
+    return team, values
+
+
+@pytest.mark.parametrize("scale", [100.0, const.MAX_SPEED, 10 * const.MAX_SPEED])
+def test_limit_speed_as_limit_action(rng: np.random.Generator, scale: float) -> None:
+    for _ in range(50):
+        team, values = random_team(rng, scale)
+        before = team.vel.copy()
+        team.limit_speed()
+        for r_id, robot_values in enumerate(values):
+            if not team.used[r_id]:
+                assert tuple(team.vel[r_id]) == tuple(before[r_id])
+                continue
+            act.limit_action(None, robot_values)  # type: ignore
+            assert tuple(team.vel[r_id]) == (robot_values.vel.x, robot_values.vel.y)
+
+
+def test_limit_acceleration(rng: np.random.Generator) -> None:
+    dt, acceleration = const.Ts, 4000.0
+    for _ in range(50):
+        team, _ = random_team(rng, const.MAX_SPEED)
+        prev = rng.normal(size=(ROBOTS, 2)) * const.MAX_SPEED
+        before = team.vel.copy()
+        team.limit_acceleration(prev, dt, acceleration)
+        for r_id in range(ROBOTS):
+            vel, prev_vel = aux.Point(*before[r_id]), aux.Point(*prev[r_id])
+            expected = vel
+            if team.used[r_id] and (vel - prev_vel).mag() > acceleration * dt:
+                expected = prev_vel + (vel - prev_vel).unity() * acceleration * dt
+            assert team.vel[r_id] == pytest.approx((expected.x, expected.y), rel=1e-12, abs=1e-9)
+
+
+def test_body_frame_as_update_vel_xy(rng: np.random.Generator) -> None:
+    vel = rng.normal(size=(ROBOTS, 2)) * const.MAX_SPEED
+    angles = rng.uniform(-math.pi, math.pi, ROBOTS)
+    speed_x, speed_y = act.body_frame(vel, angles)
+    for r_id in range(ROBOTS):
+        robot = rbt.Robot(aux.Point(0, 0), float(angles[r_id]), const.ROBOT_R, const.Color.BLUE, r_id)
+        robot.xx_flp, robot.yy_flp = _Pass(), _Pass()  # type: ignore  # body_frame gets filtered velocities
+        robot.update_vel_xy(aux.Point(*vel[r_id]))
+        assert (speed_x[r_id], speed_y[r_id]) == (robot.speed_x, robot.speed_y)
+
+
+class _Pass:
+    """Velocity filter that lets the value through"""
+
+    def process(self, value: float) -> float:
+        return value
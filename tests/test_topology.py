@@ -0,0 +1,20 @@
+"""
+Tests of the process topology
+"""
+
+import logging
+
+import pytest
+
+from bridge.processors import topology
+
+
+def test_report_is_shown_without_logging_config(capsys: pytest.CaptureFixture[str]) -> None:
+    logger = logging.getLogger("test_topology.report")
+    logger.propagate = False  # as if the root logger had no handlers and the WARNING level
+    topology.show_info(logger)
+    logger.info("cpu %d%%", 42)
+    assert "cpu 42%" in capsys.readouterr().err
+
+    topology.show_info(logger)
+    assert len(logger.handlers) == 1
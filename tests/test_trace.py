@@ -0,0 +1,57 @@
+"""
+Tests of the latency tracing
+"""
+
+import pytest
+
+from bridge.auxiliary import trace
+
+
+def test_percentile() -> None:
+    histogram = trace.LatencyHistogram()
+    assert histogram.percentile(50) == 0.0
+
+    for _ in range(99):
+        histogram.add(1e-3)
+    histogram.add(0.1)
+    bin_width = 10 ** (1 / trace.LatencyHistogram.BINS_PER_DECADE)
+    assert 1e-3 <= histogram.percentile(50) <= 1e-3 * bin_width * (1 + 1e-9)  # upper edge of the bin of 1 ms
+    assert histogram.percentile(99) == histogram.percentile(50)
+    assert histogram.percentile(100) == 0.1  # never above the largest value
+
+
+def test_percentile_out_of_range() -> None:
+    histogram = trace.LatencyHistogram()
+    histogram.add(1e-7)
+    assert histogram.percentile(50) == 1e-7
+    histogram.add(100.0)
+    assert histogram.percentile(100) == 100.0
+
+    histogram.reset()
+    assert histogram.count == 0 and histogram.percentile(50) == 0.0
+
+
+def test_record() -> None:
+    context = trace.TraceContext(1, capture_time=9.99).stamp(trace.RECEIVED, 10.0).stamp(trace.FIELD, 10.002)
+    context = context.stamp(trace.SENT, 10.005)
+
+    recorder = trace.LatencyRecorder(with_capture=True)
+    recorder.record(context)
+    recorder.record(trace.TraceContext(2))  # no stamps, nothing to record
+
+    assert set(recorder.histograms) == {trace.CAPTURE, "received -> field", "field -> sent", trace.AGE}
+    assert all(histogram.count == 1 for histogram in recorder.histograms.values())
+    assert recorder.histograms[trace.CAPTURE].max == pytest.approx(0.01)
+    assert recorder.histograms["received -> field"].max == pytest.approx(0.002)
+    assert recorder.histograms["field -> sent"].max == pytest.approx(0.003)
+    assert recorder.histograms[trace.AGE].max == pytest.approx(0.005)
+    assert "field -> sent: p50 3.00" in recorder.report()
+
+    recorder.reset()
+    assert recorder.report() == ""
+
+
+def test_record_without_capture() -> None:
+    recorder = trace.LatencyRecorder()
+    recorder.record(trace.TraceContext(1, capture_time=0.0).stamp(trace.RECEIVED, 1.0))
+    assert set(recorder.histograms) == {trace.AGE}
@@ -0,0 +1,125 @@
+"""
+Tests of the visibility graph planner
+"""
+
+import heapq
+import math
+
+import numpy as np
+import pytest
+
+from bridge import const
+from bridge.auxiliary import aux, fld
+from bridge.processors import (  # noqa: F401  # pylint: disable=unused-import
+    python_controller,
+)
+from bridge.router import action as act
+from bridge.router import visibility
+from bridge.router.base_actions import Actions
+
+START = aux.Point(-1300, 100)
+TARGET = aux.Point(1300, 0)
+WALL = [aux.Point(0, -400), aux.Point(0, 0), aux.Point(0, 400)]  # blue 1..3, yellow 0 - beside them
+
+
+def _scene() -> fld.Field:
+    field = fld.Field(const.COLOR)
+    for frame in range(3):
+        t = 1.0 + frame * const.Ts
+        field.update_blu_robot(0, START, 0, t)
+        for r_id, pos in enumerate(WALL, 1):
+            field.update_blu_robot(r_id, pos, 0, t)
+        field.update_yel_robot(0, aux.Point(600, 800), 0, t)
+        field.update_ball(aux.Point(-1000, -1200), t)
+    for robot in field.all_bots[:4] + field.y_team[:1]:
+        robot.used(1)
+    field.world.update_roster()
+    field.last_update = 1.0 + 3 * const.Ts
+    field.frame_id = 3
+    return field
+
+
+def _shortest(graph: visibility.VisibilityGraph, start: np.ndarray, goal: np.ndarray, keep: np.uint64) -> float:
+    """Dijkstra over all edges of the graph, every mask computed at once"""
+    points = np.concatenate([graph.nodes, [start, goal]])
+    usable = np.concatenate([graph.inside & keep == 0, [True, True]])
+    count = len(points)
+    first, second = np.triu_indices(count, 1)
+    free = np.zeros((count, count), dtype=bool)
+    free[first, second] = graph.blockers(points[first], points[second]) & keep == 0
+    free |= free.T
+
+    cost = np.full(count, math.inf)
+    cost[count - 2] = 0.0
+    queue = [(0.0, count - 2)]
+    while queue:
+        node_cost, node = heapq.heappop(queue)
+        if node_cost > cost[node]:
+            continue
+        for other in np.flatnonzero(free[node] & usable).tolist():
+            other_cost = node_cost + float(np.hypot(*(points[other] - points[node])))
+            if other_cost < cost[other]:
+                cost[other] = other_cost
+                heapq.heappush(queue, (other_cost, other))
+    return float(cost[count - 1])
+
+
+def test_path_is_valid_and_shortest() -> None:
+    field = _scene()
+    robot = field.allies[0]
+    graph = visibility.VisibilityGraph(field)
+    result = graph.plan(robot, TARGET)
+    assert result is not None
+    path, length = result
+    assert path[0] == robot.get_pos() and path[-1] == TARGET and len(path) > 2
+
+    assert length == pytest.approx(sum(aux.dist(begin, end) for begin, end in zip(path, path[1:])))
+    for begin, end in zip(path, path[1:]):
+        for other in field.active_allies(True)[1:] + field.active_enemies(True):
+            closest = aux.closest_point_on_line(begin, end, other.get_pos(), "S")
+            assert aux.dist(closest, other.get_pos()) >= other.get_radius() + const.ROBOT_R + visibility.MARGIN - 1
+
+    keep = np.uint64(visibility.ALL_BITS & ~graph.robot_bits[(robot.color, robot.r_id)])
+    start = np.array([robot.get_pos().x, robot.get_pos().y])
+    shortest = _shortest(graph, start, np.array([TARGET.x, TARGET.y]), keep)
+    assert length == pytest.approx(shortest)
+
+
+def test_straight_path() -> None:
+    field = _scene()
+    path = visibility.plan(field, field.allies[0], aux.Point(-1000, 1200))
+    assert path is not None
+    assert path[0] == [field.allies[0].get_pos(), aux.Point(-1000, 1200)]
+
+
+def test_goalkeeper_may_cross_its_penalty_area() -> None:
+    field = _scene()
+    graph = visibility.team_graph(field)
+    assert visibility.team_graph(field) is graph  # one graph for the team in a frame
+
+    inside = field.ally_goal.center + field.ally_goal.eye_forw * 200
+    outside = field.ally_goal.center + field.ally_goal.eye_forw * 1500 + field.ally_goal.eye_up * 1000
+    goalkeeper = field.allies[field.gk_id]
+    assert goalkeeper.r_id == const.GK
+    gk_path = graph.plan(goalkeeper, inside)
+    assert gk_path is not None and gk_path[0][-1] == inside
+
+    field_player = field.allies[2]
+    path = graph.plan(field_player, outside)
+    assert path is not None
+    for begin, end in zip(path[0], path[0][1:]):
+        for step in np.linspace(0, 1, 50):
+            assert not aux.is_point_inside_poly(begin + (end - begin) * float(step), field.ally_goal.hull)
+
+
+def test_go_to_point_planned_follows_the_path() -> None:
+    field = _scene()
+    robot = field.allies[0]
+    action = Actions.GoToPointPlanned(TARGET, 0, ignore_ball=True)
+    domain = act.ActionDomain(field, const.State.RUN, True, robot)
+    nodes = action.use_behavior_of(domain, act.ActionValues())
+
+    path = visibility.plan(field, robot, TARGET)
+    assert path is not None
+    assert isinstance(nodes[0], Actions.GoToPointIgnore)
+    assert nodes[0].target_pos == path[0][1]
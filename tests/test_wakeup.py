@@ -0,0 +1,40 @@
+"""
+Tests of waking processors up on DataBus writes
+"""
+
+import multiprocessing
+
+import pytest
+
+from bridge import const
+from bridge.auxiliary import wakeup
+
+
+def _notify_field(signals: wakeup.Signals) -> None:
+    wakeup.install(signals)
+    wakeup.notify(const.FIELD_TOPIC)
+
+
+@pytest.mark.parametrize("method", multiprocessing.get_all_start_methods())
+def test_wake_up_from_another_process(method: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(wakeup, "_SIGNALS", None)
+    context = multiprocessing.get_context(method)
+    signals = wakeup.Signals(context)
+    wakeup.install(signals)
+    waiter = wakeup.TopicWaiter([const.FIELD_TOPIC])
+    control_waiter = wakeup.TopicWaiter([const.CONTROL_TOPIC])
+
+    process = context.Process(target=_notify_field, args=(signals,))  # type: ignore
+    process.start()
+    assert waiter.wait(10.0)
+    process.join()
+    assert process.exitcode == 0
+    assert not waiter.poll()
+    assert not control_waiter.poll()
+
+
+def test_waiter_needs_signals(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(wakeup, "_SIGNALS", None)
+    wakeup.notify(const.FIELD_TOPIC)  # nobody can wait, nothing to do
+    with pytest.raises(RuntimeError):
+        wakeup.TopicWaiter([const.FIELD_TOPIC])